@@ -1,49 +1,102 @@
 # app.py
+import time
+
+IMPORT_STARTED = time.perf_counter()
+
 import hashlib
+import logging
 import os
+import re
 from dotenv import load_dotenv
 
 load_dotenv()  # Load environment variables from .env file
 
+import logs
+
+logs.configure()
+logger = logging.getLogger(__name__)
+
 from pathlib import Path
-from sandbox import DockerSandbox
-from flask import Flask, request, jsonify, render_template
+from sandbox import create_sandbox, LazySandbox, EXECUTION_TIMEOUT, HOST_SLOT_TIMEOUT
+from jobs import JobQueue, QueueFull, FINISHED
+from result_cache import ResultCache, submission_key, vectors_digest
+from preflight import Preflight, PreflightError
+from puzzle_registry import PuzzleRegistry
+from page_cache import PageCache
+from db import migrate
+from leaderboard import Leaderboard, puzzle_level
+from pubsub import Hub
+from submission_writer import SubmissionWriter
+from flask import Flask, request, jsonify, render_template, Response, g
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+import shared_state  # Registers the sqlite:// rate-limit storage
+import metrics
 from datetime import datetime
-import docker
 import tempfile
-import sqlite3
+import json
 
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'default_secret_key')
 
-# After creating the Flask app
+# After creating the Flask app. Counters live in a SQLite file by default so all
+# gunicorn workers share them; any flask-limiter storage URI works (memory://, redis://...)
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    storage_uri=os.getenv('RATELIMIT_STORAGE_URI', 'sqlite:///rate_limits.db')
+)
+
+DB_PATH = 'puzzle_bench.db'
+
+# How long the puzzle page waits for a submission's result before giving up:
+# a few run budgets plus the longest wait for a sandbox slot
+JOB_CLIENT_TIMEOUT = 4 * EXECUTION_TIMEOUT + HOST_SLOT_TIMEOUT
+
+# Largest number of solutions accepted by /api/submit_batch
+BATCH_MAX_SOLUTIONS = int(os.getenv('SUBMISSION_BATCH_MAX', 100))
+
+# Created on first use (or by gunicorn.conf.py right after a worker boots), so
+# importing the app never waits on Docker
+sandbox_backend = create_sandbox()
+
+# Create or upgrade the schema; also runs under gunicorn (wsgi.py), not only with `python app.py`
+migrate(DB_PATH)
+
+# Results of earlier runs, keyed by submitted code + puzzle + test vectors
+result_cache_db = os.getenv('RESULT_CACHE_DB')
+if result_cache_db and result_cache_db != DB_PATH:
+    migrate(result_cache_db)
+result_cache = ResultCache(
+    max_entries=int(os.getenv('RESULT_CACHE_SIZE', 1024)),
+    ttl=int(os.getenv('RESULT_CACHE_TTL', 3600)),
+    db_path=result_cache_db
 )
 
-docker_sandbox = DockerSandbox()
-
-# Initialize SQLite database
-def init_db():
-    with sqlite3.connect('puzzle_bench.db') as conn:
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS submissions
-                    (id INTEGER PRIMARY KEY,
-                     puzzle_id TEXT,
-                     user_name TEXT,
-                     total_score REAL,
-                     visible_score REAL,
-                     hidden_score REAL,
-                     execution_time REAL,
-                     code_length INTEGER,
-                     timestamp DATETIME)''')
-        conn.commit()
+# Static checks that turn away broken submissions before they reach the sandbox
+preflight = Preflight(
+    max_code_size=int(os.getenv('SUBMISSION_MAX_CODE_SIZE', 10000)),
+    max_nodes=int(os.getenv('SUBMISSION_MAX_AST_NODES', 2000))
+)
+
+# Each user's best submission per puzzle; the top LEADERBOARD_SIZE are also kept in memory.
+# Changes are pushed to /api/leaderboard/<puzzle_id>/events subscribers through the hub.
+leaderboard_hub = Hub()
+leaderboard = Leaderboard(DB_PATH, size=int(os.getenv('LEADERBOARD_SIZE', 100)), hub=leaderboard_hub)
+leaderboard.watch()
+
+# Leaderboard streams are closed after this long; EventSource reconnects by itself
+LEADERBOARD_STREAM_SECONDS = int(os.getenv('LEADERBOARD_STREAM_SECONDS', 300))
+
+# Successful submissions are written in batches off the request path
+submission_writer = SubmissionWriter(
+    DB_PATH, leaderboard,
+    batch_size=int(os.getenv('SUBMISSION_WRITE_BATCH', 100)),
+    max_delay=int(os.getenv('SUBMISSION_WRITE_DELAY_MS', 10)) / 1000,
+    max_pending=int(os.getenv('SUBMISSION_WRITE_QUEUE', 10000))
+)
 
 # Puzzle metadata structure
 PUZZLE_METADATA = {
@@ -129,176 +182,461 @@ PUZZLE_METADATA = {
 }
 
 
-def get_available_puzzles():
-    """
-    Scan puzzle directory and combine with metadata.
-    Returns dict of available puzzles with source and level grouping.
-    """
-    puzzles = {
-        'benchmark': {},  # Will hold benchmark puzzles by level
-        'examples': {}  # Will hold example puzzles by level
-    }
-    base_dir = 'puzzles'
-
-    # Try benchmark first, then examples
-    puzzle_dirs = ['benchmark', 'examples']
-
-    for dir_name in puzzle_dirs:
-        puzzles_dir = os.path.join(base_dir, dir_name)
-        if not os.path.exists(puzzles_dir):
-            continue
-
-        for level_dir in os.listdir(puzzles_dir):
-            if not level_dir.startswith('level_'):
-                continue
+# Available puzzles, rescanned only when the puzzle tree changes
+puzzle_registry = PuzzleRegistry(PUZZLE_METADATA,
+                                 refresh_interval=float(os.getenv('PUZZLE_REFRESH_INTERVAL', 5)))
 
-            level_num = int(level_dir.split('_')[1])
-            if level_num not in PUZZLE_METADATA:
-                continue
 
-            level_path = os.path.join(puzzles_dir, level_dir)
-            if not os.path.isdir(level_path):
-                continue
+# Rendered home and puzzle pages, re-rendered when their puzzles or prompts change
+page_cache = PageCache()
 
-            # Find all transform files in this level
-            transforms = [f for f in os.listdir(level_path)
-                          if f.startswith('transform_') and f.endswith('.py')]
 
-            if transforms:  # Only add level if it has transforms
-                if level_num not in puzzles[dir_name]:
-                    puzzles[dir_name][level_num] = []
-
-                for transform in sorted(transforms):
-                    puzzle_num = int(transform.split('_')[1].split('.')[0])
-                    puzzle_id = f"{dir_name}_{level_dir}_puzzle_{puzzle_num}"
-
-                    puzzles[dir_name][level_num].append({
-                        'id': puzzle_id,
-                        'number': puzzle_num,
-                        'level': level_num,
-                        'metadata': PUZZLE_METADATA[level_num],
-                        'prompt_file': os.path.join(level_path, f'prompt_{puzzle_num}.txt'),
-                        'source_dir': dir_name
-                    })
+def cached_page_response(page):
+    """
+    Serve a cached page: 304 if the client already has it, gzip if accepted.
+    """
+    if request.accept_encodings['gzip']:
+        body, etag, encoding = page.gzipped, page.gzip_etag, 'gzip'
+    else:
+        body, etag, encoding = page.body, page.etag, None
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='text/html')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'no-cache'  # Always revalidate, usually a 304
+    return response
 
-    return puzzles
 
 @app.route('/')
 def home():
-    puzzles = get_available_puzzles()
-    return render_template('index.html', puzzles=puzzles)
+    puzzles = puzzle_registry.grouped()
+    page = page_cache.get('home', puzzle_registry.generation,
+                          lambda: render_template('index.html', puzzles=puzzles))
+    return cached_page_response(page)
 
 
 @app.route('/puzzle/<puzzle_id>')
 def get_puzzle(puzzle_id):
-    print(f"DEBUG - Looking for puzzle: {puzzle_id}")
-    puzzles = get_available_puzzles()
-
-    # Parse puzzle_id to find it in the nested structure
-    source_dir = puzzle_id.split('_')[0]  # 'benchmark' or 'examples'
-    level_num = int(puzzle_id.split('_')[2])  # get number after 'level_'
-    puzzle_num = int(puzzle_id.split('_')[-1])  # get last number
-
-    # Look for the puzzle in the correct source/level
-    if source_dir not in puzzles or level_num not in puzzles[source_dir]:
-        print(f"DEBUG - Source {source_dir} or level {level_num} not found")
+    puzzle = puzzle_registry.get(puzzle_id)
+    if not puzzle:
+        logger.debug("Puzzle not found", extra={'puzzle_id': puzzle_id})
         return jsonify({'error': 'Puzzle not found'}), 404
 
-    # Find the specific puzzle in the level
-    level_puzzles = puzzles[source_dir][level_num]
-    puzzle = next((p for p in level_puzzles if p['id'] == puzzle_id), None)
+    try:
+        st = os.stat(puzzle['prompt_file'])
+    except OSError:
+        return jsonify({'error': 'Puzzle prompt not found'}), 404
 
-    if not puzzle:
-        print(f"DEBUG - Puzzle {puzzle_num} not found in {source_dir} level {level_num}")
-        return jsonify({'error': 'Puzzle not found'}), 404
+    def render():
+        # Read puzzle prompt
+        with open(puzzle['prompt_file'], 'r') as f:
+            prompt = f.read()
 
-    # Read puzzle prompt
-    with open(puzzle['prompt_file'], 'r') as f:
-        prompt = f.read()
+        return render_template('puzzle.html',
+                               puzzle_id=puzzle_id,
+                               puzzle=puzzle,
+                               prompt=prompt,
+                               job_timeout=JOB_CLIENT_TIMEOUT)
 
-    return render_template('puzzle.html',
-                           puzzle_id=puzzle_id,
-                           puzzle=puzzle,
-                           prompt=prompt)
+    # Regenerating the prompt changes its mtime/size and re-renders the page
+    version = (puzzle_registry.generation, st.st_mtime_ns, st.st_size)
+    return cached_page_response(page_cache.get(puzzle_id, version, render))
 
 
 @app.route('/api/submit/<puzzle_id>', methods=['POST'])
 @limiter.limit("20 per minute")  # More strict limit for submissions
 def submit_solution(puzzle_id):
-    puzzles = get_available_puzzles()
-
-    # Parse puzzle_id to find it in the nested structure
-    source_dir = puzzle_id.split('_')[0]  # 'benchmark' or 'examples'
-    level_num = int(puzzle_id.split('_')[2])  # get number after 'level_'
-    puzzle_num = int(puzzle_id.split('_')[-1])  # get last number
-
-    # Look for the puzzle in the correct source/level
-    if source_dir not in puzzles or level_num not in puzzles[source_dir]:
-        return jsonify({'error': 'Puzzle not found'}), 404
-
-    # Find the specific puzzle in the level
-    level_puzzles = puzzles[source_dir][level_num]
-    puzzle = next((p for p in level_puzzles if p['id'] == puzzle_id), None)
-
-    if not puzzle:
+    if not puzzle_registry.get(puzzle_id):
         return jsonify({'error': 'Puzzle not found'}), 404
 
     data = request.get_json()
     if 'code' not in data:
         return jsonify({'error': 'No code submitted'}), 400
 
-    print(f"Received submission for {puzzle_id}")
-    result = docker_sandbox.run_submission(puzzle_id, data['code'])
-    print(f"Sandbox result: {result}")
-
     # Get user identifier from IP
     user_id = get_user_identifier(request)
 
+    code = data['code']
+    logger.info("Submission received", extra={'puzzle_id': puzzle_id, 'code_length': len(code)})
+    try:
+        preflight.check(code)
+    except PreflightError as e:
+        count_outcome(puzzle_id, e.as_result())
+        return jsonify(e.as_result()), 400
+
+    try:
+        cache_key = submission_key(puzzle_id, code,
+                                   vectors_digest(*sandbox_backend.test_vector_paths(puzzle_id),
+                                                  scoring=sandbox_backend.scoring))
+    except OSError:
+        cache_key = None  # Missing test vectors, let the sandbox report it
+
+    cached = result_cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        try:
+            record_submission(puzzle_id, user_id, cached, code, timeout=5, cached=True)
+        except QueueFull:
+            return jsonify({'error': 'Too many pending submissions, please retry shortly'}), 503
+        return jsonify(dict(cached, cached=True))
+
+    try:
+        job_id = submission_jobs.submit(run_submission_job, puzzle_id, code, user_id, cache_key)
+    except QueueFull:
+        return jsonify({'error': 'Too many pending submissions, please retry shortly'}), 503
+
+    return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+
+def run_submission_job(puzzle_id, code, user_id, cache_key=None):
+    """
+    Score a queued submission in the sandbox and record it. Runs on a job worker thread.
+    """
+    result = sandbox_backend.run_submission(puzzle_id, code)
+    logger.info("Submission scored", extra={
+        'puzzle_id': puzzle_id,
+        'outcome': metrics.outcome(result),
+        'total_score': result.get('total_score'),
+        'execution_time': result.get('execution_time'),
+        'error': logs.truncate(result['error'], 500) if 'error' in result else None
+    })
+
+    # Cache anything the runner itself produced; infrastructure errors
+    # (timeouts, missing files) may not repeat.
+    if cache_key and 'success' in result:
+        result_cache.put(cache_key, result)
+
+    record_submission(puzzle_id, user_id, result, code)
+    return result
+
+
+def record_submission(puzzle_id, user_id, result, code, timeout=None, cached=False):
+    """
+    Queue a successful submission for the background writer. Blocks while the
+    writer is backlogged; raises QueueFull if that lasts longer than `timeout`.
+
+    A `cached` result comes from an earlier run of the same code. It is ranked
+    with that run's execution time, but its per-phase timings describe that
+    run rather than this submission, so they are not stored again.
+    """
+    count_outcome(puzzle_id, result)
     # Only store in database if submission was successful
     if result.get('success', False):
-        with sqlite3.connect('puzzle_bench.db') as conn:
-            c = conn.cursor()
-            c.execute('''INSERT INTO submissions 
-                        (puzzle_id, user_name, total_score, visible_score, hidden_score,
-                         execution_time, code_length, timestamp)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
-                      (puzzle_id, user_id, result['total_score'],  # Changed from 'anonymous' to user_id
-                       result['visible_score'], result['hidden_score'],
-                       result['execution_time'], len(data['code']),
-                       datetime.utcnow()))
-            conn.commit()
-
-    return jsonify(result)
+        if cached:
+            result = dict(result, timings=None, host_timings=None)
+        submission_writer.put(puzzle_id, user_id, result, len(code),
+                              datetime.utcnow().isoformat(' '), timeout=timeout)
+
+
+def count_outcome(puzzle_id, result):
+    source, level = puzzle_level(puzzle_id)
+    metrics.SUBMISSION_OUTCOMES.labels(source, str(level), metrics.outcome(result)).inc()
+
+
+@app.route('/api/submit_batch/<puzzle_id>', methods=['POST'])
+@limiter.limit("5 per minute")
+def submit_batch(puzzle_id):
+    """
+    Score a list of solutions for one puzzle in a single sandbox run.
+    Body: {"solutions": ["def transform(data): ...", ...]}
+    """
+    if not puzzle_registry.get(puzzle_id):
+        return jsonify({'error': 'Puzzle not found'}), 404
+
+    data = request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object with a solutions list'}), 400
+    solutions = data.get('solutions')
+    if not isinstance(solutions, list) or not solutions \
+            or not all(isinstance(code, str) for code in solutions):
+        return jsonify({'error': 'Expected a non-empty list of solutions'}), 400
+    if len(solutions) > BATCH_MAX_SOLUTIONS:
+        return jsonify({'error': f'At most {BATCH_MAX_SOLUTIONS} solutions per batch'}), 400
+
+    user_id = get_user_identifier(request)
+
+    logger.info("Batch received", extra={'puzzle_id': puzzle_id, 'solutions': len(solutions)})
+    try:
+        job_id = submission_jobs.submit(run_batch_job, puzzle_id, solutions, user_id)
+    except QueueFull:
+        return jsonify({'error': 'Too many pending submissions, please retry shortly'}), 503
+
+    return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+
+def run_batch_job(puzzle_id, solutions, user_id):
+    """
+    Score a queued batch. Solutions failing pre-flight or found in the cache are
+    answered directly and the rest share one sandbox run; every solution is
+    recorded like a single submission.
+    """
+    try:
+        digest = vectors_digest(*sandbox_backend.test_vector_paths(puzzle_id),
+                                scoring=sandbox_backend.scoring)
+        keys = [submission_key(puzzle_id, code, digest) for code in solutions]
+    except OSError:
+        keys = [None] * len(solutions)  # Missing test vectors, let the sandbox report it
+
+    results = []
+    cached = []
+    for code, key in zip(solutions, keys):
+        try:
+            preflight.check(code)
+        except PreflightError as e:
+            results.append(e.as_result())
+            continue
+        results.append(result_cache.get(key) if key else None)
+        if results[-1] is not None:
+            cached.append(len(results) - 1)
+    pending = [i for i, result in enumerate(results) if result is None]
+    if pending:
+        fresh = sandbox_backend.run_batch(puzzle_id, [solutions[i] for i in pending])
+        for i, result in zip(pending, fresh):
+            results[i] = result
+            if keys[i] and 'success' in result:
+                result_cache.put(keys[i], result)
+
+    for i, (code, result) in enumerate(zip(solutions, results)):
+        record_submission(puzzle_id, user_id, result, code, cached=i in cached)
+
+    return {'results': results}
+
+
+submission_jobs = JobQueue(
+    DB_PATH,
+    workers=int(os.getenv('SUBMISSION_WORKERS', sandbox_backend.max_concurrency)),
+    max_pending=int(os.getenv('SUBMISSION_QUEUE_SIZE', 100)),
+    deadline_seconds=int(os.getenv('SUBMISSION_JOB_DEADLINE', 900))
+)
+
+
+@app.route('/api/jobs/<job_id>')
+@limiter.exempt  # Polling is bounded by the submission limit
+def get_job(job_id):
+    """
+    Submission job status. `?wait=N` long-polls up to N seconds (max 30) for the result.
+    """
+    wait = min(request.args.get('wait', 0, type=float), 30)
+    if wait > 0:
+        job = submission_jobs.wait(job_id, wait)
+    else:
+        job = submission_jobs.get(job_id)
+
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+@app.route('/api/jobs/<job_id>/events')
+@limiter.exempt
+def job_events(job_id):
+    """
+    Server-Sent Events stream: one `status` event per state change, ending with `result`.
+    """
+    job = submission_jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    def stream(job):
+        last_status = None
+        while True:
+            if job is None:
+                yield 'event: error\ndata: {"error": "Job not found"}\n\n'
+                return
+            if job['status'] in FINISHED:
+                yield f"event: result\ndata: {json.dumps(job['result'])}\n\n"
+                return
+            if job['status'] != last_status:
+                last_status = job['status']
+                yield f"event: status\ndata: {json.dumps({'status': last_status})}\n\n"
+            else:
+                yield ': keep-alive\n\n'
+            job = submission_jobs.wait(job_id, 15)
+
+    return Response(stream(job), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+
+@app.route('/api/writer/stats')
+def writer_stats():
+    return jsonify(submission_writer.stats())
+
+
+@app.route('/api/pages/stats')
+def page_stats():
+    return jsonify(page_cache.stats())
+
+
+@app.route('/api/startup/stats')
+def startup_stats():
+    """
+    How long this process took to import the app, and the state of its sandbox backend.
+    """
+    stats = {'app_import_seconds': APP_IMPORT_SECONDS}
+    if isinstance(sandbox_backend, LazySandbox):
+        stats['sandbox'] = sandbox_backend.stats()
+    return jsonify(stats)
+
+
+# Accepted as a client-supplied correlation id
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+
+@app.before_request
+def start_request():
+    g.request_started = time.perf_counter()
+    request_id = request.headers.get('X-Request-ID', '')
+    if not REQUEST_ID_PATTERN.fullmatch(request_id):
+        request_id = logs.new_correlation_id()
+    logs.set_correlation_id(request_id)
+
+
+@app.after_request
+def observe_latency(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        # The route template, not the URL, keeps label values bounded
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.REQUEST_LATENCY.labels(route, request.method, str(response.status_code)).observe(
+            time.perf_counter() - started)
+    request_id = logs.correlation_id()
+    if request_id:  # Unset if an earlier hook (e.g. the rate limiter) ended the request
+        response.headers['X-Request-ID'] = request_id
+    return response
+
+
+@app.teardown_request
+def end_request(exc):
+    logs.set_correlation_id(None)  # Worker threads serve many requests
+
+
+@app.route('/metrics')
+@limiter.exempt
+def prometheus_metrics():
+    body, content_type = metrics.render()
+    return Response(body, content_type=content_type)
+
+
+@app.route('/api/sandbox/stats')
+def sandbox_stats():
+    """
+    Host-wide sandbox slots, shared by all app processes.
+    """
+    slots = sandbox_backend.host_slots
+    if slots is None:
+        return jsonify({'host_slots': None})
+    return jsonify({'host_slots': slots.limit, 'in_use': slots.in_use()})
+
+
+@app.route('/api/preflight/stats')
+def preflight_stats():
+    return jsonify(preflight.stats())
+
+
+def rollup_args():
+    """
+    (source, offset, limit) of a global or per-level leaderboard request.
+    ?source= defaults to the benchmark puzzles, if there are any.
+    """
+    sources = puzzle_registry.grouped()
+    default = 'benchmark' if sources.get('benchmark') else 'examples'
+    source = request.args.get('source', default)
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    return source, offset, limit
+
+@app.route('/api/leaderboard/global')
+def get_global_leaderboard():
+    """
+    Users ranked by the sum of their best scores over all puzzles of a source.
+    """
+    source, offset, limit = rollup_args()
+    levels = puzzle_registry.grouped().get(source, {})
+    return jsonify({
+        'source': source,
+        'puzzles': sum(len(puzzles) for puzzles in levels.values()),
+        'entries': leaderboard.global_top(source, offset, limit)
+    })
+
+@app.route('/api/leaderboard/level/<int:level>')
+def get_level_leaderboard(level):
+    """
+    Users ranked by the sum of their best scores over one level's puzzles.
+    """
+    source, offset, limit = rollup_args()
+    return jsonify({
+        'source': source,
+        'level': level,
+        'puzzles': len(puzzle_registry.grouped().get(source, {}).get(level, [])),
+        'entries': leaderboard.level_top(source, level, offset, limit)
+    })
 
 @app.route('/api/leaderboard/<puzzle_id>')
 def get_leaderboard(puzzle_id):
-    with sqlite3.connect('puzzle_bench.db') as conn:
-        c = conn.cursor()
-        c.execute('''SELECT user_name, total_score, visible_score, hidden_score, 
-                    execution_time, code_length, timestamp
-                    FROM submissions 
-                    WHERE puzzle_id = ?
-                    ORDER BY total_score DESC, execution_time ASC
-                    LIMIT 10''', (puzzle_id,))
-        rows = c.fetchall()
-
-    leaderboard = [{
-        'user': row[0],
-        'total_score': row[1],
-        'visible_score': row[2],
-        'hidden_score': row[3],
-        'time': row[4],
-        'code_length': row[5],
-        'timestamp': row[6]
-    } for row in rows]
-
-    return jsonify(leaderboard)
+    """
+    Best submission per user, best first. Paginate with ?offset=N&limit=M (max 100).
+    """
+    offset = max(request.args.get('offset', 0, type=int), 0)
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    return jsonify(leaderboard.top(puzzle_id, offset, limit))
+
+@app.route('/api/leaderboard/<puzzle_id>/events')
+@limiter.exempt  # One long-lived stream instead of repeated polling
+def leaderboard_events(puzzle_id):
+    """
+    Server-Sent Events stream of the top `?limit=N` (max 100) entries.
+    Starts with a `snapshot` event ({version, entries}), then sends a `delta`
+    ({version, rank, entry}) for each improvement: drop the entry's user from the
+    list and insert the entry at `rank`. Another `snapshot` replaces the list.
+    A delta whose version is not the current one + 1 means updates were missed;
+    reconnect to get a new snapshot.
+    """
+    if not puzzle_registry.get(puzzle_id):
+        return jsonify({'error': 'Puzzle not found'}), 404
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+
+    # Subscribe before taking the snapshot so no change falls in between
+    subscription = leaderboard_hub.subscribe(puzzle_id)
+
+    def snapshot_event(version, entries):
+        return f"event: snapshot\ndata: {json.dumps({'version': version, 'entries': entries[:limit]})}\n\n"
+
+    def stream():
+        try:
+            yield snapshot_event(*leaderboard.snapshot(puzzle_id))
+            deadline = time.monotonic() + LEADERBOARD_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                message = subscription.get(min(15, max(deadline - time.monotonic(), 0)))
+                if subscription.pop_overflow():
+                    yield snapshot_event(*leaderboard.snapshot(puzzle_id))
+                elif message is None:
+                    yield ': keep-alive\n\n'
+                elif message['type'] == 'snapshot':
+                    yield snapshot_event(message['version'], message['entries'])
+                else:
+                    yield f"event: delta\ndata: {json.dumps(message)}\n\n"
+        finally:
+            subscription.close()
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 
 def get_user_identifier(request):
     ip = request.remote_addr
     hash_id = hashlib.md5(ip.encode()).hexdigest()[:8]
     return f"User_{hash_id}"
 
+APP_IMPORT_SECONDS = time.perf_counter() - IMPORT_STARTED
+logger.info("App imported", extra={'seconds': round(APP_IMPORT_SECONDS, 3)})
+
 if __name__ == '__main__':
-    init_db()
     app.run(debug=True)
@@ -0,0 +1,115 @@
+# batch_eval.py
+"""
+Evaluation of reference transforms (puzzles/*/level_*/transform_<n>.py) over
+buffer sets held as (N, 64) uint8 arrays.
+
+A transform module defines the scalar `hidden_transform(data: bytes) -> bytes`
+and may also define `hidden_transform_batch(buffers)`, taking and returning an
+(N, 64) uint8 NumPy array. The batch version is only used after it reproduced
+the scalar one bit for bit on a reference buffer set (`verify`); until then, on
+a mismatch, or without NumPy installed, every buffer goes through the scalar
+function.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # Batch versions are an optimization; the scalar path needs nothing
+    np = None
+
+from testvectors import RECORD_SIZE
+
+HAS_NUMPY = np is not None
+
+
+def buffer_matrix(buffers):
+    """
+    (N, 64) uint8 array of a list of 64-byte buffers.
+    """
+    return np.frombuffer(b"".join(buffers), dtype=np.uint8).reshape(-1, RECORD_SIZE)
+
+
+def matrix_records(matrix):
+    """
+    The rows of an (N, 64) uint8 array as a list of bytes.
+    """
+    data = matrix.tobytes()
+    return [data[i:i + RECORD_SIZE] for i in range(0, len(data), RECORD_SIZE)]
+
+
+class ReferenceTransform:
+    """
+    A reference transform with its optional batch version. `mode` tells which
+    one `apply` uses: 'batch', 'scalar', or why the batch version was rejected.
+    """
+
+    def __init__(self, scalar, batch=None):
+        self.scalar = scalar
+        self.batch = batch if HAS_NUMPY else None
+        self.vectorized = False
+        if batch is None:
+            self.mode = 'scalar'
+        elif not HAS_NUMPY:
+            self.mode = 'scalar (NumPy not installed)'
+        else:
+            self.mode = 'scalar (batch version not verified)'
+
+    @classmethod
+    def from_module(cls, module):
+        return cls(module.hidden_transform, getattr(module, 'hidden_transform_batch', None))
+
+    def apply_scalar(self, buffers):
+        outputs = []
+        for buf in buffers:
+            output = self.scalar(buf)
+            if not isinstance(output, bytes) or len(output) != RECORD_SIZE:
+                raise ValueError(f"hidden_transform must return {RECORD_SIZE} bytes")
+            outputs.append(output)
+        return outputs
+
+    def apply_batch(self, matrix):
+        output = self.batch(matrix.copy())  # The batch version may work in place
+        if not isinstance(output, np.ndarray) or output.dtype != np.uint8 or output.shape != matrix.shape:
+            raise ValueError(f"hidden_transform_batch must return an (N, {RECORD_SIZE}) uint8 array")
+        return output
+
+    def verify(self, buffers):
+        """
+        Compare the batch version against the scalar one on `buffers` (the full
+        reference set) and enable it if they agree on every buffer; `mode` says
+        where they first differ otherwise. Returns the outputs computed along
+        the way (the scalar ones, which an enabled batch version reproduced),
+        or None when there is no batch version to verify.
+        """
+        if self.batch is None:
+            return None
+        expected = self.apply_scalar(buffers)
+        try:
+            actual = matrix_records(self.apply_batch(buffer_matrix(buffers)))
+        except Exception as e:
+            self.vectorized = False
+            self.mode = f'scalar (batch version failed: {e})'
+            return expected
+        for i, (a, b) in enumerate(zip(actual, expected)):
+            if a != b:
+                self.vectorized = False
+                self.mode = f'scalar (batch version differs on buffer {i})'
+                return expected
+        self.vectorized = True
+        self.mode = 'batch'
+        return expected
+
+    def apply(self, buffers):
+        """
+        Outputs for a list of 64-byte buffers, as a list of bytes.
+        """
+        if self.vectorized:
+            return matrix_records(self.apply_batch(buffer_matrix(buffers)))
+        return self.apply_scalar(buffers)
+
+    def apply_matrix(self, matrix):
+        """
+        Outputs for an (N, 64) uint8 array, as an array.
+        """
+        if self.vectorized:
+            return self.apply_batch(matrix)
+        return buffer_matrix(self.apply_scalar(matrix_records(matrix)))
@@ -0,0 +1,207 @@
+# buffer_coverage.py
+"""
+What a set of 64-byte test buffers exercises, as bitsets over three feature
+spaces:
+
+    values  256 bits     byte value v occurs somewhere in the buffer
+    bits    1024 bits    bit b of byte i is 0 / 1 (for position-dependent transforms)
+    pairs   65536 bits   byte a is directly followed by byte b (for transforms
+                         mixing neighbouring bytes)
+
+`CoverageIndex` computes the features of a whole corpus in one vectorized
+pass, kept per buffer as an array of feature ids, so that union bitsets and
+coverage reports of any subset are a single indexing operation. It also picks
+buffers from a large candidate pool by greedy set cover (`select`), which is
+how buffers/generate_buffers.py builds hidden sets that cover what the
+visible set leaves out.
+
+Needs NumPy (`pip install numpy`); only the buffer tooling uses this module.
+"""
+
+import numpy as np
+
+from testvectors import RECORD_SIZE
+
+# Feature spaces, laid out one after the other in a single id range
+SPACES = {
+    'values': (0, 256),
+    'bits': (256, RECORD_SIZE * 8 * 2),
+    'pairs': (256 + RECORD_SIZE * 8 * 2, 256 * 256)
+}
+FEATURES = sum(size for _, size in SPACES.values())
+
+# Columns of each space in a row of CoverageIndex.features
+COLUMNS = {
+    'values': slice(0, RECORD_SIZE),
+    'bits': slice(RECORD_SIZE, RECORD_SIZE * 9),
+    'pairs': slice(RECORD_SIZE * 9, RECORD_SIZE * 10 - 1)
+}
+SENTINEL = FEATURES  # Stands in for duplicate ids within a buffer; always counts as covered
+
+# Gain of covering one new feature in `select`. A buffer has at most 512 new bit
+# states and 63 new pairs, so any new byte value outweighs any number of new bit
+# states, which outweigh any number of new pairs.
+WEIGHTS = {'values': 1 << 15, 'bits': 64, 'pairs': 1}
+
+
+def _dedupe(ids):
+    """
+    Rows of `ids` sorted, with repeats within a row replaced by SENTINEL.
+    """
+    ids = np.sort(ids, axis=1)
+    ids[:, 1:][ids[:, 1:] == ids[:, :-1]] = SENTINEL
+    return ids
+
+
+def buffer_matrix(buffers):
+    """
+    (N, 64) uint8 array of a list of 64-byte buffers (or the array itself).
+    """
+    if isinstance(buffers, np.ndarray):
+        return buffers
+    return np.frombuffer(b"".join(buffers), dtype=np.uint8).reshape(-1, RECORD_SIZE)
+
+
+class CoverageIndex:
+    """
+    Feature ids of every buffer of a corpus: row i of `features` lists the
+    distinct features of buffer i (padded with SENTINEL).
+    """
+
+    def __init__(self, buffers):
+        matrix = buffer_matrix(buffers).astype(np.uint32)
+        bit_numbers = np.arange(8, dtype=np.uint32)
+        bit_states = (matrix[:, :, None] >> bit_numbers) & 1  # (N, 64, 8)
+        # Bit b of byte i in state s -> (i * 8 + b) * 2 + s
+        bit_slots = (np.arange(RECORD_SIZE * 8, dtype=np.uint32) * 2).reshape(RECORD_SIZE, 8)
+
+        self.features = np.hstack([
+            _dedupe(SPACES['values'][0] + matrix),
+            (SPACES['bits'][0] + bit_slots + bit_states).reshape(len(matrix), -1),
+            _dedupe(SPACES['pairs'][0] + (matrix[:, :-1] << 8) + matrix[:, 1:])
+        ])
+
+    def __len__(self):
+        return len(self.features)
+
+    def covered(self, rows=None):
+        """
+        Union bitset (bool array over all feature ids) of the buffers at `rows`
+        (all if None).
+        """
+        covered = np.zeros(FEATURES + 1, dtype=bool)
+        covered[(self.features if rows is None else self.features[rows]).ravel()] = True
+        covered[SENTINEL] = False
+        return covered
+
+    def new_features(self, covered, space=None):
+        """
+        Per buffer, the number of its features (in `space`, or any) not in `covered`.
+        """
+        new = ~covered[self.features]
+        new &= self.features != SENTINEL
+        if space is not None:
+            start, size = SPACES[space]
+            new &= (self.features >= start) & (self.features < start + size)
+        return new.sum(axis=1)
+
+    def select(self, count, covered=None, weights=None):
+        """
+        Indices of `count` buffers picked greedily, each adding the most weighted
+        features not yet covered (by `covered`, e.g. the visible set, or by
+        earlier picks). Once nothing new is left, coverage restarts from
+        `covered` so the following picks spread over the features again. Ties
+        go to the lower index, so picks are deterministic.
+
+        Only features outside `covered` can ever add to a gain, so only those
+        are indexed (feature -> buffers containing it), and a pick just lowers
+        the gains of the buffers sharing one of its new features.
+        """
+        weights = dict(WEIGHTS, **(weights or {}))
+        weight = np.zeros(FEATURES + 1, dtype=np.int64)
+        for space, (start, size) in SPACES.items():
+            weight[start:start + size] = weights[space]
+
+        baseline = np.zeros(FEATURES + 1, dtype=bool) if covered is None else covered.copy()
+        baseline[SENTINEL] = True
+        count = min(count, len(self))
+
+        # Sorted by feature id one space at a time: ids within a space fit in
+        # 16 bits, which numpy sorts by radix
+        row_parts, id_parts = [], []
+        for space, (start, size) in SPACES.items():
+            if baseline[start:start + size].all():
+                continue  # Nothing to gain here (e.g. bit states, usually)
+            block = self.features[:, COLUMNS[space]]
+            rows, cols = np.nonzero(~baseline[block])
+            local_ids = (block[rows, cols] - start).astype(np.uint16)
+            order = np.argsort(local_ids, kind='stable')
+            row_parts.append(rows[order])
+            id_parts.append(local_ids[order].astype(np.int64) + start)
+        rows = np.concatenate(row_parts) if row_parts else np.zeros(0, dtype=np.int64)
+        ids = np.concatenate(id_parts) if id_parts else np.zeros(0, dtype=np.int64)
+        initial_gains = np.bincount(rows, weights=weight[ids], minlength=len(self)).astype(np.int64)
+        starts = np.searchsorted(ids, np.arange(FEATURES + 1))
+
+        chosen = []
+        gains = None
+        while len(chosen) < count:
+            if gains is None or gains.max() <= 0:
+                # (Re)start from the baseline
+                covered = baseline.copy()
+                gains = initial_gains.copy()
+                gains[chosen] = -1
+                if gains.max() <= 0:
+                    # Nothing left to cover even from the baseline: fill in index order
+                    chosen.extend(np.flatnonzero(gains == 0)[:count - len(chosen)].tolist())
+                    break
+
+            i = int(np.argmax(gains))
+            features = self.features[i]
+            fresh = features[~covered[features]]
+            covered[fresh] = True
+            chosen.append(i)
+
+            holders = [rows[starts[f]:starts[f + 1]] for f in fresh.tolist()]
+            if holders:
+                np.subtract.at(gains, np.concatenate(holders),
+                               np.repeat(weight[fresh], [len(h) for h in holders]))
+            gains[i] = -1
+        return chosen
+
+    def report(self, rows=None, covered=None):
+        """
+        Per feature space: features covered by the buffers at `rows` (all if
+        None), the space size and, given a baseline `covered`, how many of the
+        covered features are new relative to it.
+        """
+        union = self.covered(rows)
+        report = {}
+        for space, (start, size) in SPACES.items():
+            part = union[start:start + size]
+            entry = {'covered': int(part.sum()), 'total': size}
+            if covered is not None:
+                entry['new'] = int((part & ~covered[start:start + size]).sum())
+            report[space] = entry
+        return report
+
+
+def covered_values(covered):
+    """
+    The byte values in a covered bitset, as a set of ints.
+    """
+    start, size = SPACES['values']
+    return set(np.flatnonzero(covered[start:start + size]).tolist())
+
+
+def format_report(report):
+    """
+    One line per feature space of a `CoverageIndex.report`.
+    """
+    lines = []
+    for space, entry in report.items():
+        line = f"{space:>6}: {entry['covered']}/{entry['total']} ({entry['covered'] / entry['total']:.1%})"
+        if 'new' in entry:
+            line += f", {entry['new']} not in the baseline"
+        lines.append(line)
+    return "\n".join(lines)
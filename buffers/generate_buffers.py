@@ -1,7 +1,30 @@
 # buffers/generate_buffers.py
 
+import argparse
+import json
+import os
+import sys
 import random
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from testvectors import PackWriter, INPUTS_FILE, BUFFER_SET_FILE, RECORD_SIZE
+
+# Versions of the buffer set. A version always generates the same bytes, so
+# scores stay comparable between runs against it: to change the size, add a
+# version instead of editing one. The visible set is always the 24 buffers
+# shown in prompts. Hidden sets are the 24 structured hidden buffers extended
+# with seeded random ones, each containing bytes missing from the visible set,
+# or ('greedy') picked from those plus a seeded random pool of `pool` buffers
+# to cover as much as possible of what the visible set does not (see
+# buffer_coverage.py; needs NumPy).
+BUFFER_SETS = {
+    1: {'hidden': 24},
+    2: {'hidden': 10000, 'seed': 2},
+    3: {'hidden': 24, 'selection': 'greedy', 'pool': 100000, 'seed': 3},
+    4: {'hidden': 10000, 'selection': 'greedy', 'pool': 200000, 'seed': 4}
+}
+DEFAULT_BUFFER_SET = 1
+
 
 def generate_visible_buffers():
     """
@@ -98,10 +121,7 @@ def get_missing_bytes(visible_buffers):
     """
     Calculate missing byte values from visible buffers.
     """
-    seen_bytes = set()
-    for buf in visible_buffers:
-        seen_bytes.update(buf)
-    return set(range(256)) - seen_bytes
+    return set(range(256)) - set(b"".join(visible_buffers))
 
 def generate_hidden_buffers(missing_bytes):
     """
@@ -122,7 +142,7 @@ def generate_hidden_buffers(missing_bytes):
         buf = bytearray(64)
         pattern_length = random.randint(2, 8)
         # Ensure at least one missing byte in each pattern
-        pattern = [random.choice(list(missing_bytes))] + [random.randint(0, 255) for _ in range(pattern_length - 1)]
+        pattern = [random.choice(missing_bytes_list)] + [random.randint(0, 255) for _ in range(pattern_length - 1)]
         for i in range(64):
             buf[i] = pattern[i % pattern_length]
         buffers.append(bytes(buf))
@@ -130,7 +150,7 @@ def generate_hidden_buffers(missing_bytes):
     # 9-12) Structured random with guaranteed missing bytes
     for _ in range(4):
         buf = bytearray(64)
-        missing_byte = random.choice(list(missing_bytes))
+        missing_byte = random.choice(missing_bytes_list)
         for i in range(64):
             if i % 8 == 0:  # Insert missing byte every 8 positions
                 buf[i] = missing_byte
@@ -147,7 +167,7 @@ def generate_hidden_buffers(missing_bytes):
         # Fill rest with some missing bytes
         for i in range(len(encoded), 64):
             if i % 8 == 0:
-                buf[i] = random.choice(list(missing_bytes))
+                buf[i] = random.choice(missing_bytes_list)
             else:
                 buf[i] = random.randint(0, 255)
         buffers.append(bytes(buf))
@@ -155,7 +175,7 @@ def generate_hidden_buffers(missing_bytes):
     # 17-24) Pure random buffers with guaranteed missing bytes
     for _ in range(8):  # Increased to 8 buffers
         buf = bytearray(64)
-        missing_byte = random.choice(list(missing_bytes))
+        missing_byte = random.choice(missing_bytes_list)
         for i in range(64):
             if i % 16 == 0:  # Insert missing byte every 16 positions
                 buf[i] = missing_byte
@@ -164,26 +184,80 @@ def generate_hidden_buffers(missing_bytes):
         buffers.append(bytes(buf))
 
     # Add missing bytes at strategic positions in remaining buffers
-    for buf in buffers:
+    for i, buf in enumerate(buffers):
         # Modify first byte if no missing bytes present
-        if not any(b in missing_bytes for b in buf):
+        if missing_bytes.isdisjoint(buf):
             new_buf = bytearray(buf)
             new_buf[0] = random.choice(missing_bytes_list)
-            buffers[buffers.index(buf)] = bytes(new_buf)
+            buffers[i] = bytes(new_buf)
 
     return buffers
 
 
-def save_buffers(buffers, prefix, directory='shared'):
+def iter_hidden_buffers(missing_bytes, count, seed=None):
+    """
+    Yield `count` hidden buffers: the structured ones from generate_hidden_buffers,
+    then seeded random buffers with a missing byte at a random position. Only one
+    buffer is held at a time, so `count` is not limited by memory.
+    """
+    structured = generate_hidden_buffers(missing_bytes)
+    yield from structured[:count]
+
+    rng = random.Random(seed)
+    missing_bytes_list = sorted(missing_bytes)
+    for _ in range(count - len(structured)):
+        buf = bytearray(rng.getrandbits(8) for _ in range(RECORD_SIZE))
+        buf[rng.randrange(RECORD_SIZE)] = rng.choice(missing_bytes_list)
+        yield bytes(buf)
+
+
+def select_hidden_buffers(visible_buffers, missing_bytes, count, pool, seed):
+    """
+    `count` hidden buffers picked by greedy set cover from the structured hidden
+    buffers plus `pool` seeded random ones: each pick adds the most byte values,
+    then bit states, then adjacent byte pairs not seen in the visible set or
+    in earlier picks. In pick order, most valuable first.
+    """
+    from buffer_coverage import CoverageIndex, buffer_matrix
+    import numpy as np
+
+    candidates = np.vstack([buffer_matrix(generate_hidden_buffers(missing_bytes)),
+                            np.frombuffer(random.Random(seed).randbytes(pool * RECORD_SIZE),
+                                          dtype=np.uint8).reshape(pool, RECORD_SIZE)])
+    picks = CoverageIndex(candidates).select(count, CoverageIndex(visible_buffers).covered())
+    return [candidates[i].tobytes() for i in picks]
+
+
+def print_coverage(visible_buffers, hidden_buffers):
+    """
+    What the hidden buffers cover beyond the visible ones, if NumPy is installed.
+    """
+    try:
+        from buffer_coverage import CoverageIndex, format_report
+    except ImportError:
+        return
+    visible = CoverageIndex(visible_buffers).covered()
+    print("Hidden set coverage (new = not in the visible set):")
+    print(format_report(CoverageIndex(hidden_buffers).report(covered=visible)))
+
+
+def save_test_vectors(visible_buffers, hidden_buffers, hidden_count, version, directory='shared'):
     """
-    Save buffers with given prefix (visible/hidden).
+    Stream visible and hidden buffers (any iterable of `hidden_count` buffers)
+    into the packed test-vector file, and record the buffer set version next to it.
     """
     os.makedirs(directory, exist_ok=True)
-    for idx, buf in enumerate(buffers, start=1):
-        filename = os.path.join(directory, f'{prefix}_{idx:02d}.bin')
-        with open(filename, 'wb') as f:
-            f.write(buf)
-    print(f"Saved {len(buffers)} {prefix} buffers to '{directory}/'.")
+    filename = os.path.join(directory, INPUTS_FILE)
+    with PackWriter(filename, {'visible': len(visible_buffers), 'hidden': hidden_count}) as writer:
+        writer.write('visible', visible_buffers)
+        writer.write('hidden', hidden_buffers)
+
+    with open(os.path.join(directory, BUFFER_SET_FILE), 'w') as f:
+        json.dump({'version': version, 'visible': len(visible_buffers), 'hidden': hidden_count,
+                   'digest': writer.digest.hex()}, f, indent=2)
+        f.write('\n')
+    print(f"Saved {len(visible_buffers)} visible and {hidden_count} hidden buffers "
+          f"(buffer set v{version}) to '{filename}'.")
 
 
 def generate_puzzle_prompt_header():
@@ -193,13 +267,13 @@ def generate_puzzle_prompt_header():
     """
     visible_buffers = generate_visible_buffers()
 
-    prompt = """Below is a puzzle involving 24 input buffers and their transformed outputs.
+    prompt = f"""Below is a puzzle involving {len(visible_buffers)} input buffers and their transformed outputs.
 Each buffer is exactly 64 bytes, shown in hex.
 
 Your task: Figure out the logic of the transformation used to go from the INPUT to the OUTPUT.
 Then, provide a Python function that, given any new 64-byte buffer, will produce the correct transformed output.
 
-Here are the 24 input (SRC) buffers in hex (one line per buffer):
+Here are the {len(visible_buffers)} input (SRC) buffers in hex (one line per buffer):
 """
 
     # Add each input buffer to the prompt
@@ -212,7 +286,11 @@ Here are the 24 input (SRC) buffers in hex (one line per buffer):
 
 
 if __name__ == "__main__":
-    import os
+    parser = argparse.ArgumentParser(description="Generate the test buffers and prompt header")
+    parser.add_argument("--version", type=int, default=DEFAULT_BUFFER_SET, choices=sorted(BUFFER_SETS),
+                        help=f"Buffer set version (default {DEFAULT_BUFFER_SET})")
+    args = parser.parse_args()
+    buffer_set = BUFFER_SETS[args.version]
 
     # Generate and save buffers
     prompt_header, visible_buffers = generate_puzzle_prompt_header()
@@ -222,15 +300,19 @@ if __name__ == "__main__":
     print(f"Number of missing bytes in visible inputs: {len(missing_bytes)}")
     print("Missing byte values on input buffers: ")
     print([f"0x{x:02X}" for x in sorted(list(missing_bytes))])
-    # Generate hidden buffers with missing bytes information
-    hidden_buffers = generate_hidden_buffers(missing_bytes)
+    # Generate hidden buffers with missing bytes information, streamed to disk
+    if buffer_set.get('selection') == 'greedy':
+        hidden_buffers = select_hidden_buffers(visible_buffers, missing_bytes, buffer_set['hidden'],
+                                               buffer_set['pool'], buffer_set['seed'])
+        print_coverage(visible_buffers, hidden_buffers)
+    else:
+        hidden_buffers = iter_hidden_buffers(missing_bytes, buffer_set['hidden'], buffer_set.get('seed'))
+
+    # Save the buffers
+    save_test_vectors(visible_buffers, hidden_buffers, buffer_set['hidden'], args.version)
 
     # Save the prompt header for later use
     with open('shared/prompt_header.txt', 'w') as f:
         f.write(prompt_header)
 
-    # Save the buffers
-    save_buffers(visible_buffers, 'visible')
-    save_buffers(hidden_buffers, 'hidden')
-
     print("Generated prompt header and saved to 'buffers/shared/prompt_header.txt'")
\ No newline at end of file
@@ -0,0 +1,209 @@
+# db.py
+"""
+SQLite access shared by the app modules.
+
+`connect(path)` returns a connection owned by the calling thread and reused
+for every later call from that thread, instead of opening (and re-parsing the
+schema of) the database per request. Connections run in WAL mode so leaderboard
+reads never wait for submission writes.
+
+`migrate(path)` brings the schema up to date and runs once at app startup.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+
+logger = logging.getLogger(__name__)
+
+BUSY_TIMEOUT = 5  # Seconds to wait for another writer's lock
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",  # fsync at checkpoints only; safe with WAL
+    "PRAGMA cache_size=-16384",  # 16 MiB page cache per connection
+    "PRAGMA temp_store=MEMORY",
+)
+
+_local = threading.local()
+
+
+def connect(path):
+    """
+    This thread's connection to `path`, opened and configured on first use.
+    Use it as `with connect(path) as conn:` to commit (or roll back) on exit;
+    unlike a fresh sqlite3.connect() it is not closed afterwards.
+    """
+    if getattr(_local, 'pid', None) != os.getpid():
+        # First use in this thread, or inherited across a fork (gunicorn --preload)
+        _local.connections = {}
+        _local.pid = os.getpid()
+
+    conn = _local.connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+        for pragma in PRAGMAS:
+            conn.execute(pragma)
+        _local.connections[path] = conn
+    return conn
+
+
+def _submissions_table(c):
+    c.execute('''CREATE TABLE IF NOT EXISTS submissions
+                (id INTEGER PRIMARY KEY,
+                 puzzle_id TEXT,
+                 user_name TEXT,
+                 total_score REAL,
+                 visible_score REAL,
+                 hidden_score REAL,
+                 execution_time REAL,
+                 code_length INTEGER,
+                 timestamp DATETIME,
+                 timings TEXT)''')
+    # Databases created before phase timings were recorded
+    columns = [row[1] for row in c.execute('PRAGMA table_info(submissions)')]
+    if 'timings' not in columns:
+        c.execute('ALTER TABLE submissions ADD COLUMN timings TEXT')
+
+
+def _leaderboard_index(c):
+    # Serves WHERE puzzle_id = ? ORDER BY total_score DESC, execution_time ASC
+    # straight from the index, without scanning or sorting the puzzle's rows
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_submissions_leaderboard
+                ON submissions (puzzle_id, total_score DESC, execution_time ASC)''')
+
+
+def _leaderboard_table(c):
+    # Best submission per user and puzzle, kept up to date by leaderboard.py
+    c.execute('''CREATE TABLE IF NOT EXISTS leaderboard
+                (puzzle_id TEXT,
+                 user_name TEXT,
+                 total_score REAL,
+                 visible_score REAL,
+                 hidden_score REAL,
+                 execution_time REAL,
+                 code_length INTEGER,
+                 timestamp DATETIME,
+                 submission_id INTEGER,
+                 PRIMARY KEY (puzzle_id, user_name))''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_leaderboard_rank
+                ON leaderboard (puzzle_id, total_score DESC, execution_time ASC, submission_id ASC)''')
+    # Bumped whenever a puzzle's board changes, so app processes can tell
+    # whether their in-memory copy is current
+    c.execute('''CREATE TABLE IF NOT EXISTS leaderboard_versions
+                (puzzle_id TEXT PRIMARY KEY,
+                 version INTEGER)''')
+    c.execute('''INSERT OR IGNORE INTO leaderboard
+                    (puzzle_id, user_name, total_score, visible_score, hidden_score,
+                     execution_time, code_length, timestamp, submission_id)
+                SELECT puzzle_id, user_name, total_score, visible_score, hidden_score,
+                       execution_time, code_length, timestamp, id
+                FROM (SELECT *, ROW_NUMBER() OVER (
+                          PARTITION BY puzzle_id, user_name
+                          ORDER BY total_score DESC, execution_time ASC, id ASC) AS user_rank
+                      FROM submissions)
+                WHERE user_rank = 1''')
+
+
+def _rollup_tables(c):
+    # Sums of each user's best scores per level and per source (benchmark/examples),
+    # kept up to date by leaderboard.py alongside the `leaderboard` table
+    c.execute('''CREATE TABLE IF NOT EXISTS level_rollup
+                (source TEXT,
+                 level INTEGER,
+                 user_name TEXT,
+                 total_score REAL,
+                 puzzles INTEGER,
+                 execution_time REAL,
+                 PRIMARY KEY (source, level, user_name))''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_level_rollup_rank
+                ON level_rollup (source, level, total_score DESC, execution_time ASC)''')
+    c.execute('''CREATE TABLE IF NOT EXISTS global_rollup
+                (source TEXT,
+                 user_name TEXT,
+                 total_score REAL,
+                 puzzles INTEGER,
+                 execution_time REAL,
+                 PRIMARY KEY (source, user_name))''')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_global_rollup_rank
+                ON global_rollup (source, total_score DESC, execution_time ASC)''')
+
+    # Puzzle ids look like '<source>_level_<n>_puzzle_<m>'
+    c.execute('''INSERT OR REPLACE INTO level_rollup
+                SELECT substr(puzzle_id, 1, instr(puzzle_id, '_level_') - 1),
+                       CAST(substr(puzzle_id, instr(puzzle_id, '_level_') + 7) AS INTEGER),
+                       user_name, SUM(total_score), COUNT(*), SUM(execution_time)
+                FROM leaderboard
+                WHERE instr(puzzle_id, '_level_') > 0
+                GROUP BY 1, 2, user_name''')
+    c.execute('''INSERT OR REPLACE INTO global_rollup
+                SELECT source, user_name, SUM(total_score), SUM(puzzles), SUM(execution_time)
+                FROM level_rollup
+                GROUP BY source, user_name''')
+
+
+def _jobs_table(c):
+    # Submission jobs, see jobs.py
+    c.execute('''CREATE TABLE IF NOT EXISTS jobs
+                (id TEXT PRIMARY KEY,
+                 puzzle_id TEXT,
+                 status TEXT,
+                 result TEXT,
+                 created DATETIME,
+                 finished DATETIME)''')
+
+
+def _result_cache_table(c):
+    # Persistent sandbox results, see result_cache.py
+    c.execute('''CREATE TABLE IF NOT EXISTS result_cache
+                (key TEXT PRIMARY KEY,
+                 result TEXT,
+                 stored_at REAL)''')
+
+
+def _job_owners(c):
+    # Which process (on which boot of the host) runs each job, so jobs left
+    # behind by a dead worker can be failed instead of staying queued forever
+    columns = [row[1] for row in c.execute('PRAGMA table_info(jobs)')]
+    if 'owner_pid' not in columns:
+        c.execute('ALTER TABLE jobs ADD COLUMN owner_pid INTEGER')
+    if 'boot_id' not in columns:
+        c.execute('ALTER TABLE jobs ADD COLUMN boot_id TEXT')
+    c.execute('''CREATE INDEX IF NOT EXISTS idx_jobs_status
+                ON jobs (status, created)''')
+
+
+# Applied in order; PRAGMA user_version holds how many have run. Each one must
+# also work on databases created before schema versioning was introduced.
+MIGRATIONS = [
+    _submissions_table,
+    _leaderboard_index,
+    _leaderboard_table,
+    _rollup_tables,
+    _jobs_table,
+    _result_cache_table,
+    _job_owners,
+]
+
+
+def migrate(path):
+    """
+    Apply pending migrations. Safe to call from several processes at once:
+    the first one migrates, the others wait for its lock and find nothing to do.
+    """
+    conn = connect(path)
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        c = conn.cursor()
+        version = c.execute('PRAGMA user_version').fetchone()[0]
+        if version > len(MIGRATIONS):
+            logger.warning("Database schema v%d is newer than this app (v%d)", version, len(MIGRATIONS))
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            migration(c)
+            c.execute(f'PRAGMA user_version = {number}')
+            logger.info("Applied database migration %d: %s", number, migration.__name__.strip('_'))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
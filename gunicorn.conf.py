@@ -0,0 +1,44 @@
+# gunicorn.conf.py
+"""
+Picked up by gunicorn when started from the project directory.
+
+The sandbox image is prepared once in the master before any worker is forked;
+each worker then creates its own sandbox backend (Docker client, warm
+containers) in the background right after it boots, so worker (re)starts
+do not wait on Docker.
+
+With PROMETHEUS_MULTIPROC_DIR set, the master also empties that directory at
+startup and drops the live gauges of workers that exit (see metrics.py).
+"""
+
+import os
+import shutil
+
+
+def on_starting(server):
+    metrics_dir = os.getenv('PROMETHEUS_MULTIPROC_DIR')
+    if metrics_dir:
+        # Values from a previous run would otherwise be added to this one's
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+        os.makedirs(metrics_dir)
+
+    from sandbox import prepare_sandbox
+
+    try:
+        prepare_sandbox()
+    except Exception as e:
+        # Workers retry when their backend is first used
+        server.log.error(f"Error preparing sandbox: {e}")
+
+
+def post_worker_init(worker):
+    from app import sandbox_backend
+
+    if hasattr(sandbox_backend, 'warm'):
+        sandbox_backend.warm()
+
+
+def child_exit(server, worker):
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
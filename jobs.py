@@ -0,0 +1,235 @@
+# jobs.py
+
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from db import connect
+from metrics import JOBS_QUEUED, JOBS_RUNNING, JOB_WAIT, db_timer
+import logs
+
+logger = logging.getLogger(__name__)
+
+
+# Job states; a job ends up 'done' (with the handler's result) or 'failed'
+# (with an error, when its worker was lost or it overran the deadline)
+PENDING = ('queued', 'running')
+FINISHED = ('done', 'failed')
+
+
+class QueueFull(Exception):
+    pass
+
+
+def boot_id():
+    """
+    Id of the host's current boot, so pids recorded before a reboot are not
+    mistaken for live processes. Empty where the kernel does not provide one.
+    """
+    try:
+        with open('/proc/sys/kernel/random/boot_id') as f:
+            return f.read().strip()
+    except OSError:
+        return ''
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Exists, owned by someone else
+    return True
+
+
+class JobQueue:
+    """
+    Bounded queue of submission jobs processed by a fixed pool of worker threads.
+
+    Job state lives in the `jobs` table (created by db.migrate) so that any app
+    process (e.g. another gunicorn worker) can answer status requests. Waiters in
+    the process that owns the job are woken directly; other processes poll the table.
+
+    The queue itself is in memory, so each row records the pid and boot id of
+    the process that owns it. On startup, pending rows whose owner is gone are
+    marked failed; so are rows still pending `deadline_seconds` after they
+    were created. Rows are purged `retention_minutes` after finishing, or
+    after being created for rows that never finish.
+    """
+
+    def __init__(self, db_path, workers=4, max_pending=100, retention_minutes=60, deadline_seconds=900):
+        self.db_path = db_path
+        self.retention = timedelta(minutes=retention_minutes)
+        self.deadline = timedelta(seconds=deadline_seconds)
+        self.boot_id = boot_id()
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._events = {}  # job_id -> threading.Event for jobs owned by this process
+        self._lock = threading.Lock()
+
+        self.fail_orphans()
+        for i in range(workers):
+            threading.Thread(target=self._work, name=f"submission-worker-{i}", daemon=True).start()
+
+    def submit(self, handler, puzzle_id, *args):
+        """
+        Enqueue `handler(puzzle_id, *args)`. Returns the job id.
+        Raises QueueFull when `max_pending` jobs are already waiting.
+        """
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow()
+        with db_timer('job_submit'), connect(self.db_path) as conn:
+            c = conn.cursor()
+            self._expire(c, now)
+            # Drop jobs nobody asked about in a while
+            c.execute('DELETE FROM jobs WHERE finished < ? OR created < ?',
+                      (now - self.retention, now - self.retention - self.deadline))
+            c.execute('INSERT INTO jobs (id, puzzle_id, status, created, owner_pid, boot_id) '
+                      'VALUES (?, ?, ?, ?, ?, ?)',
+                      (job_id, puzzle_id, 'queued', now, os.getpid(), self.boot_id))
+            conn.commit()
+
+        with self._lock:
+            self._events[job_id] = threading.Event()
+        try:
+            # The job logs under the id of the request that queued it
+            self._queue.put_nowait((job_id, handler, puzzle_id, args, time.monotonic(),
+                                    logs.correlation_id() or job_id))
+            JOBS_QUEUED.inc()
+        except queue.Full:
+            with self._lock:
+                del self._events[job_id]
+            with connect(self.db_path) as conn:
+                conn.execute('DELETE FROM jobs WHERE id = ?', (job_id,))
+                conn.commit()
+            raise QueueFull()
+        return job_id
+
+    def get(self, job_id):
+        """
+        Current job state as a dict, or None for unknown (or expired) jobs.
+        """
+        with db_timer('job_get'), connect(self.db_path) as conn:
+            c = conn.cursor()
+            c.execute('SELECT puzzle_id, status, result, created FROM jobs WHERE id = ?', (job_id,))
+            row = c.fetchone()
+            if row is not None and row[1] in PENDING and \
+                    datetime.fromisoformat(row[3]) < datetime.utcnow() - self.deadline:
+                self._expire(c, datetime.utcnow())
+                conn.commit()
+                c.execute('SELECT puzzle_id, status, result, created FROM jobs WHERE id = ?', (job_id,))
+                row = c.fetchone()
+        if row is None:
+            return None
+
+        job = {'job_id': job_id, 'puzzle_id': row[0], 'status': row[1]}
+        if row[2] is not None:
+            job['result'] = json.loads(row[2])
+        return job
+
+    def wait(self, job_id, timeout):
+        """
+        Block until the job is done or `timeout` seconds pass, then return its state.
+        """
+        with self._lock:
+            event = self._events.get(job_id)
+        if event is not None:
+            event.wait(timeout)
+            return self.get(job_id)
+
+        deadline = time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job['status'] in FINISHED or time.monotonic() >= deadline:
+                return job
+            time.sleep(0.2)
+
+    def fail_orphans(self):
+        """
+        Fail pending jobs whose owning process is gone (or that overran the
+        deadline). Runs when the queue starts, e.g. when gunicorn replaces a
+        worker that died with jobs in its queue.
+        """
+        with connect(self.db_path) as conn:
+            c = conn.cursor()
+            c.execute('SELECT id, owner_pid, boot_id FROM jobs WHERE status IN (?, ?)', PENDING)
+            orphans = [job_id for job_id, pid, boot in c.fetchall()
+                       if pid is None or boot != self.boot_id or not _alive(pid)]
+            self._fail(c, orphans, "Submission job was lost when its worker stopped; please resubmit")
+            self._expire(c, datetime.utcnow())
+            conn.commit()
+
+    def _expire(self, c, now):
+        c.execute('SELECT id FROM jobs WHERE status IN (?, ?) AND created < ?',
+                  PENDING + (now - self.deadline,))
+        self._fail(c, [row[0] for row in c.fetchall()],
+                   f"Submission job did not finish within {int(self.deadline.total_seconds())} seconds")
+
+    def _fail(self, c, job_ids, error):
+        if not job_ids:
+            return
+        result = json.dumps({"error": error})
+        now = datetime.utcnow()
+        c.executemany('UPDATE jobs SET status = ?, result = ?, finished = ? WHERE id = ? AND status IN (?, ?)',
+                      [('failed', result, now, job_id) + PENDING for job_id in job_ids])
+        logger.warning("Failed orphaned submission jobs", extra={'jobs': len(job_ids), 'reason': error})
+        # Wake this process's waiters on jobs that were still in its queue
+        with self._lock:
+            events = [self._events.pop(job_id, None) for job_id in job_ids]
+        for event in events:
+            if event is not None:
+                event.set()
+
+    def _start(self, job_id):
+        """
+        Mark a queued job running. False if it was failed (or purged) while it waited.
+        """
+        with db_timer('job_update'), connect(self.db_path) as conn:
+            c = conn.cursor()
+            c.execute("UPDATE jobs SET status = 'running' WHERE id = ? AND status = 'queued'", (job_id,))
+            conn.commit()
+            return c.rowcount == 1
+
+    def _set_status(self, job_id, status, result):
+        """
+        Finish a running job. A job failed meanwhile (past its deadline, or its
+        worker taken for lost) keeps its failure.
+        """
+        with db_timer('job_update'), connect(self.db_path) as conn:
+            c = conn.cursor()
+            c.execute("UPDATE jobs SET status = ?, result = ?, finished = ? WHERE id = ? AND status = 'running'",
+                      (status, json.dumps(result), datetime.utcnow(), job_id))
+            conn.commit()
+        if c.rowcount == 0:
+            logger.warning("Discarded result of a job that already ended", extra={'job_id': job_id})
+
+    def _work(self):
+        while True:
+            job_id, handler, puzzle_id, args, queued_at, correlation_id = self._queue.get()
+            JOBS_QUEUED.dec()
+            JOB_WAIT.observe(time.monotonic() - queued_at)
+            JOBS_RUNNING.inc()
+            try:
+                with logs.correlation(correlation_id):
+                    if not self._start(job_id):
+                        continue
+                    try:
+                        result = handler(puzzle_id, *args)
+                    except Exception as e:
+                        logger.exception("Submission job failed", extra={'job_id': job_id})
+                        result = {"error": str(e)}
+                    self._set_status(job_id, 'done', result)
+            except Exception as e:
+                logger.error("Error updating submission job: %s", e, extra={'job_id': job_id})
+            finally:
+                with self._lock:
+                    event = self._events.pop(job_id, None)
+                if event is not None:
+                    event.set()
+                JOBS_RUNNING.dec()
+                self._queue.task_done()
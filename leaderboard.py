@@ -0,0 +1,258 @@
+# leaderboard.py
+
+import bisect
+import logging
+import threading
+import time
+
+from db import connect
+from metrics import db_timer
+
+logger = logging.getLogger(__name__)
+
+ENTRY_COLUMNS = '''user_name, total_score, visible_score, hidden_score,
+                   execution_time, code_length, timestamp, submission_id'''
+
+
+def _entry(row):
+    """
+    (sort key, API entry) for a leaderboard row: best score first, then
+    fastest, then earliest.
+    """
+    entry = {
+        'user': row[0],
+        'total_score': row[1],
+        'visible_score': row[2],
+        'hidden_score': row[3],
+        'time': row[4],
+        'code_length': row[5],
+        'timestamp': row[6]
+    }
+    return (-row[1], row[4], row[7]), entry
+
+
+def _rollup_entry(row):
+    return {
+        'user': row[0],
+        'total_score': row[1],
+        'puzzles': row[2],
+        'time': row[3]
+    }
+
+
+def puzzle_level(puzzle_id):
+    """
+    (source, level) of a '<source>_level_<n>_puzzle_<m>' puzzle id.
+    """
+    parts = puzzle_id.split('_')
+    return parts[0], int(parts[2])
+
+
+class Leaderboard:
+    """
+    Per-puzzle leaderboards holding each user's best submission.
+
+    The `leaderboard` table is updated as submissions are recorded, so it never
+    has more than one row per user and puzzle. On top of it each process keeps
+    the top `size` entries of every puzzle it has served in memory, tagged with
+    the puzzle's row in `leaderboard_versions`; a read costs one primary-key
+    lookup, plus an indexed top-`size` query if another process changed the board.
+
+    Each change is also added to the per-level and per-source sums of best
+    scores (`level_rollup`, `global_rollup`) in the same transaction.
+
+    With a `hub` (pubsub.Hub), changes are published on the puzzle's topic:
+    a `delta` for changes made by this process (the user's new entry and rank)
+    and, from `watch()`, a `snapshot` when another process changed a board
+    someone here is subscribed to.
+    """
+
+    def __init__(self, db_path, size=100, hub=None):
+        self.db_path = db_path
+        self.size = size
+        self.hub = hub
+        self._boards = {}  # puzzle_id -> (version, [(sort key, entry), ...])
+        self._lock = threading.Lock()
+
+    def record(self, conn, puzzle_id, user_name, result, code_length, timestamp, submission_id):
+        """
+        Offer a successful submission to the board, inside the caller's open
+        write transaction on `conn`. Returns a function to call once that
+        transaction has committed, which updates the in-memory board.
+        """
+        c = conn.cursor()
+        row = (user_name, result['total_score'], result['visible_score'], result['hidden_score'],
+               result['execution_time'], code_length, timestamp, submission_id)
+        c.execute('SELECT total_score, execution_time FROM leaderboard WHERE puzzle_id = ? AND user_name = ?',
+                  (puzzle_id, user_name))
+        previous = c.fetchone()
+        c.execute(f'''INSERT INTO leaderboard (puzzle_id, {ENTRY_COLUMNS})
+                      VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                      ON CONFLICT (puzzle_id, user_name) DO UPDATE SET
+                          total_score = excluded.total_score,
+                          visible_score = excluded.visible_score,
+                          hidden_score = excluded.hidden_score,
+                          execution_time = excluded.execution_time,
+                          code_length = excluded.code_length,
+                          timestamp = excluded.timestamp,
+                          submission_id = excluded.submission_id
+                      WHERE excluded.total_score > leaderboard.total_score
+                         OR (excluded.total_score = leaderboard.total_score
+                             AND excluded.execution_time < leaderboard.execution_time)''',
+                  (puzzle_id,) + row)
+        if c.rowcount == 0:
+            return lambda: None  # Not better than this user's entry
+        self._update_rollups(c, puzzle_id, user_name, previous, result)
+
+        old_version = self._version(c, puzzle_id)
+        c.execute('''INSERT INTO leaderboard_versions (puzzle_id, version) VALUES (?, 1)
+                     ON CONFLICT (puzzle_id) DO UPDATE SET version = version + 1''', (puzzle_id,))
+        new_version = old_version + 1
+
+        def apply():
+            with self._lock:
+                board = self._boards.get(puzzle_id)
+                if board is None or board[0] == new_version:
+                    return  # Not loaded, or already reloaded with this change
+                if board[0] != old_version:
+                    del self._boards[puzzle_id]  # Changed elsewhere meanwhile, reload on next read
+                    return
+                entries = [e for e in board[1] if e[1]['user'] != user_name]
+                key, entry = _entry(row)
+                rank = bisect.bisect(entries, (key, entry))
+                entries.insert(rank, (key, entry))
+                self._boards[puzzle_id] = (new_version, entries[:self.size])
+
+            if self.hub is not None and rank < self.size:
+                self.hub.publish(puzzle_id, {'type': 'delta', 'version': new_version,
+                                             'rank': rank, 'entry': entry})
+
+        return apply
+
+    def _update_rollups(self, c, puzzle_id, user_name, previous, result):
+        try:
+            source, level = puzzle_level(puzzle_id)
+        except (IndexError, ValueError):
+            return
+        if previous is None:
+            change = (result['total_score'], 1, result['execution_time'])
+        else:
+            change = (result['total_score'] - previous[0], 0, result['execution_time'] - previous[1])
+
+        c.execute('''INSERT INTO level_rollup
+                        (source, level, user_name, total_score, puzzles, execution_time)
+                     VALUES (?, ?, ?, ?, ?, ?)
+                     ON CONFLICT (source, level, user_name) DO UPDATE SET
+                         total_score = total_score + excluded.total_score,
+                         puzzles = puzzles + excluded.puzzles,
+                         execution_time = execution_time + excluded.execution_time''',
+                  (source, level, user_name) + change)
+        c.execute('''INSERT INTO global_rollup
+                        (source, user_name, total_score, puzzles, execution_time)
+                     VALUES (?, ?, ?, ?, ?)
+                     ON CONFLICT (source, user_name) DO UPDATE SET
+                         total_score = total_score + excluded.total_score,
+                         puzzles = puzzles + excluded.puzzles,
+                         execution_time = execution_time + excluded.execution_time''',
+                  (source, user_name) + change)
+
+    def level_top(self, source, level, offset=0, limit=10):
+        """
+        Users ranked by the sum of their best scores on the level's puzzles.
+        """
+        with db_timer('leaderboard_rollup'):
+            c = connect(self.db_path).cursor()
+            c.execute('''SELECT user_name, total_score, puzzles, execution_time
+                         FROM level_rollup
+                         WHERE source = ? AND level = ?
+                         ORDER BY total_score DESC, execution_time ASC
+                         LIMIT ? OFFSET ?''', (source, level, limit, offset))
+            return [_rollup_entry(row) for row in c.fetchall()]
+
+    def global_top(self, source, offset=0, limit=10):
+        """
+        Users ranked by the sum of their best scores on all of the source's puzzles.
+        """
+        with db_timer('leaderboard_rollup'):
+            c = connect(self.db_path).cursor()
+            c.execute('''SELECT user_name, total_score, puzzles, execution_time
+                         FROM global_rollup
+                         WHERE source = ?
+                         ORDER BY total_score DESC, execution_time ASC
+                         LIMIT ? OFFSET ?''', (source, limit, offset))
+            return [_rollup_entry(row) for row in c.fetchall()]
+
+    def top(self, puzzle_id, offset=0, limit=10):
+        """
+        Entries `offset` to `offset + limit` of the puzzle's board, best first.
+        """
+        if offset + limit > self.size:
+            # Beyond the in-memory part, served by the rank index
+            return [entry for _, entry in self._query(puzzle_id, offset, limit)]
+        return self.snapshot(puzzle_id)[1][offset:offset + limit]
+
+    def snapshot(self, puzzle_id):
+        """
+        (version, entries) of the in-memory part of the puzzle's board.
+        """
+        c = connect(self.db_path).cursor()
+        # Version first: a change landing between the two reads then only causes a reload later
+        with db_timer('leaderboard_version'):
+            version = self._version(c, puzzle_id)
+        with self._lock:
+            board = self._boards.get(puzzle_id)
+        if board is None or board[0] != version:
+            board = self._load(puzzle_id, version)
+        return board[0], [entry for _, entry in board[1]]
+
+    def watch(self, interval=1):
+        """
+        Start a thread that publishes a snapshot whenever a board with
+        subscribers here was changed by another process. One query per
+        `interval` covers all subscribed puzzles.
+        """
+        threading.Thread(target=self._watch, args=(interval,), name="leaderboard-watcher", daemon=True).start()
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                puzzle_ids = self.hub.topics()
+                if not puzzle_ids:
+                    continue
+                c = connect(self.db_path).cursor()
+                c.execute(f'''SELECT puzzle_id, version FROM leaderboard_versions
+                              WHERE puzzle_id IN ({', '.join('?' * len(puzzle_ids))})''', puzzle_ids)
+                versions = dict(c.fetchall())
+                for puzzle_id in puzzle_ids:
+                    version = versions.get(puzzle_id, 0)
+                    with self._lock:
+                        board = self._boards.get(puzzle_id)
+                    if board is not None and board[0] == version:
+                        continue
+                    board = self._load(puzzle_id, version)
+                    self.hub.publish(puzzle_id, {'type': 'snapshot', 'version': version,
+                                                 'entries': [entry for _, entry in board[1]]})
+            except Exception as e:
+                logger.error("Error checking leaderboard versions: %s", e)
+
+    def _load(self, puzzle_id, version):
+        board = (version, self._query(puzzle_id, 0, self.size))
+        with self._lock:
+            self._boards[puzzle_id] = board
+        return board
+
+    def _version(self, c, puzzle_id):
+        c.execute('SELECT version FROM leaderboard_versions WHERE puzzle_id = ?', (puzzle_id,))
+        row = c.fetchone()
+        return row[0] if row else 0
+
+    def _query(self, puzzle_id, offset, limit):
+        with db_timer('leaderboard_query'):
+            c = connect(self.db_path).cursor()
+            c.execute(f'''SELECT {ENTRY_COLUMNS}
+                          FROM leaderboard
+                          WHERE puzzle_id = ?
+                          ORDER BY total_score DESC, execution_time ASC, submission_id ASC
+                          LIMIT ? OFFSET ?''', (puzzle_id, limit, offset))
+            return [_entry(row) for row in c.fetchall()]
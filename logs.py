@@ -0,0 +1,143 @@
+# logs.py
+"""
+Leveled, structured logging for the app processes.
+
+`configure()` sends every record to stdout, one JSON object per line by
+default (LOG_FORMAT=text for a human-readable format), at LOG_LEVEL and
+above. Extra fields passed as `logger.info("...", extra={...})` become keys
+of the JSON object.
+
+Each record carries the correlation id of the request it was logged for
+(taken from an X-Request-ID header or generated); submission jobs keep the
+id of the request that queued them, so a submission can be followed from
+the request to the sandbox run to the database write.
+
+Sandbox output is the bulky part: it is only logged at DEBUG, for failed
+runs plus a LOG_SANDBOX_OUTPUT_SAMPLE fraction of the rest, and cut to
+LOG_MAX_OUTPUT characters like any other user-controlled text.
+"""
+
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import uuid
+from contextlib import contextmanager
+
+_correlation_id = contextvars.ContextVar('correlation_id', default=None)
+
+# Attributes every LogRecord has; anything else was passed in `extra`
+_RECORD_ATTRS = set(logging.makeLogRecord({}).__dict__) | {'message', 'asctime', 'correlation_id'}
+
+MAX_OUTPUT = 2000
+SANDBOX_OUTPUT_SAMPLE = 0.01
+
+
+def new_correlation_id():
+    return uuid.uuid4().hex[:16]
+
+
+def correlation_id():
+    """
+    Correlation id of the current request or job, or None.
+    """
+    return _correlation_id.get()
+
+
+def set_correlation_id(value):
+    _correlation_id.set(value)
+
+
+@contextmanager
+def correlation(value):
+    """
+    Log with correlation id `value` inside the block (e.g. on a worker thread).
+    """
+    token = _correlation_id.set(value)
+    try:
+        yield
+    finally:
+        _correlation_id.reset(token)
+
+
+def truncate(text, limit=None):
+    """
+    `text` cut to `limit` (LOG_MAX_OUTPUT) characters, noting how much was dropped.
+    """
+    text = str(text)
+    limit = MAX_OUTPUT if limit is None else limit
+    if len(text) <= limit:
+        return text
+    return f"{text[:limit]}... [{len(text) - limit} more characters]"
+
+
+def sample_sandbox_output():
+    """
+    Whether to log the output of a successful sandbox run.
+    """
+    return random.random() < SANDBOX_OUTPUT_SAMPLE
+
+
+class _CorrelationFilter(logging.Filter):
+    def filter(self, record):
+        record.correlation_id = _correlation_id.get()
+        return True
+
+
+def _extra_fields(record):
+    return {key: value for key, value in record.__dict__.items() if key not in _RECORD_ATTRS}
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s [%(correlation_id)s] %(message)s')
+
+    def format(self, record):
+        record.correlation_id = record.correlation_id or '-'
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value!r}" for key, value in fields.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 6),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        if record.correlation_id:
+            entry['correlation_id'] = record.correlation_id
+        entry.update(_extra_fields(record))
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure():
+    """
+    Set up the root logger from LOG_LEVEL (default INFO), LOG_FORMAT (json or
+    text), LOG_MAX_OUTPUT and LOG_SANDBOX_OUTPUT_SAMPLE. Safe to call twice.
+    """
+    global MAX_OUTPUT, SANDBOX_OUTPUT_SAMPLE
+    MAX_OUTPUT = int(os.getenv('LOG_MAX_OUTPUT', MAX_OUTPUT))
+    SANDBOX_OUTPUT_SAMPLE = float(os.getenv('LOG_SANDBOX_OUTPUT_SAMPLE', SANDBOX_OUTPUT_SAMPLE))
+
+    root = logging.getLogger()
+    root.setLevel(os.getenv('LOG_LEVEL', 'INFO').upper())
+    if any(getattr(handler, '_gta_handler', False) for handler in root.handlers):
+        return
+
+    handler = logging.StreamHandler(sys.stdout)
+    handler._gta_handler = True
+    handler.addFilter(_CorrelationFilter())
+    if os.getenv('LOG_FORMAT', 'json') == 'text':
+        handler.setFormatter(TextFormatter())
+    else:
+        handler.setFormatter(JsonFormatter())
+    root.addHandler(handler)
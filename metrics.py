@@ -0,0 +1,101 @@
+# metrics.py
+"""
+Prometheus metrics, served in text format at /metrics.
+
+Under gunicorn every worker process has its own metric values. With
+PROMETHEUS_MULTIPROC_DIR set (see gunicorn.conf.py) each process writes them
+to memory-mapped files in that directory and a scrape of any worker adds up
+all of them; without it /metrics reports the serving process only. The
+variable has to be set before this module is imported.
+"""
+
+import os
+import time
+from contextlib import contextmanager
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge,
+                               Histogram, generate_latest, multiprocess)
+
+# Sandbox phases span from sub-millisecond bookkeeping to multi-second runs
+PHASE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+DB_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5)
+
+REQUEST_LATENCY = Histogram(
+    'gta_http_request_duration_seconds', 'Time to produce a response, per route',
+    ['route', 'method', 'status'])
+
+SANDBOX_PHASE = Histogram(
+    'gta_sandbox_phase_seconds', 'Duration of each phase of a sandbox run, host and runner side',
+    ['backend', 'phase'], buckets=PHASE_BUCKETS)
+
+SANDBOX_IN_FLIGHT = Gauge(
+    'gta_sandbox_runs_in_flight', 'Sandbox runs executing right now',
+    multiprocess_mode='livesum')
+
+SUBMISSION_OUTCOMES = Counter(
+    'gta_submission_outcomes_total', 'Scored submissions by puzzle level and outcome',
+    ['source', 'level', 'outcome'])
+
+JOBS_QUEUED = Gauge(
+    'gta_jobs_queued', 'Submission jobs waiting for a worker',
+    multiprocess_mode='livesum')
+
+JOBS_RUNNING = Gauge(
+    'gta_jobs_running', 'Submission jobs being processed',
+    multiprocess_mode='livesum')
+
+JOB_WAIT = Histogram(
+    'gta_job_queue_wait_seconds', 'Time a submission job waited for a worker',
+    buckets=PHASE_BUCKETS)
+
+DB_TIME = Histogram(
+    'gta_db_seconds', 'Time spent in database operations',
+    ['operation'], buckets=DB_BUCKETS)
+
+
+def outcome(result):
+    """
+    'success', 'rejected' (by pre-flight checks), 'timeout' or 'error' for a result dict.
+    """
+    if result.get('success'):
+        return 'success'
+    if 'preflight' in result:
+        return 'rejected'
+    if 'timeout' in str(result.get('error', '')).lower():
+        return 'timeout'
+    return 'error'
+
+
+def observe_timings(backend, host_timings, runner_timings=None):
+    """
+    Record the `*_ns` phase timings of one sandbox run.
+    """
+    for key, value in host_timings.items():
+        if key.endswith('_ns'):
+            SANDBOX_PHASE.labels(backend, key[:-3]).observe(value / 1e9)
+    for key, value in (runner_timings or {}).items():
+        if key.endswith('_ns'):
+            SANDBOX_PHASE.labels(backend, f"runner_{key[:-3]}").observe(value / 1e9)
+
+
+@contextmanager
+def db_timer(operation):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        DB_TIME.labels(operation).observe(time.perf_counter() - start)
+
+
+def render():
+    """
+    (body, content type) of a scrape.
+    """
+    if os.getenv('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -0,0 +1,54 @@
+# page_cache.py
+
+import gzip
+import hashlib
+import threading
+
+
+class CachedPage:
+    """
+    A rendered page and a gzip copy, each with a strong ETag derived from the content.
+    """
+
+    def __init__(self, version, body):
+        self.version = version
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        # mtime=0 keeps the compressed bytes identical across renders
+        self.gzipped = gzip.compress(body, compresslevel=9, mtime=0)
+        self.gzip_etag = f"{self.etag}-gzip"
+
+
+class PageCache:
+    """
+    Rendered pages keyed by name. Each entry remembers the `version` of the
+    inputs it was rendered from (e.g. prompt file stat, puzzle registry
+    generation); a lookup with a different version renders it again.
+    """
+
+    def __init__(self):
+        self._pages = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.renders = 0
+
+    def get(self, key, version, render):
+        """
+        Cached page for `key` at `version`, calling `render()` (returning str)
+        to build it when missing or stale.
+        """
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None and page.version == version:
+                self.hits += 1
+                return page
+
+        page = CachedPage(version, render().encode('utf-8'))
+        with self._lock:
+            self._pages[key] = page
+            self.renders += 1
+        return page
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'renders': self.renders, 'entries': len(self._pages)}
@@ -0,0 +1,176 @@
+# preflight.py
+
+import ast
+import threading
+from collections import Counter
+
+# Modules a transform has no business importing. The sandbox would contain
+# them anyway; rejecting early just saves a sandbox run.
+FORBIDDEN_MODULES = {
+    'builtins', 'ctypes', 'gc', 'importlib', 'inspect', 'marshal', 'multiprocessing',
+    'os', 'pickle', 'pty', 'resource', 'shutil', 'signal', 'socket', 'subprocess',
+    'sys', 'threading'
+}
+FORBIDDEN_NAMES = {'__import__', 'exec', 'eval', 'compile', 'open'}
+
+
+class PreflightError(Exception):
+    """
+    A submission rejected before reaching the sandbox.
+    `check` names the failed check; `line` is the offending line, if any.
+    """
+
+    def __init__(self, check, message, line=None):
+        super().__init__(message)
+        self.check = check
+        self.line = line
+
+    def as_result(self):
+        result = {'success': False, 'error': str(self), 'preflight': {'check': self.check}}
+        if self.line is not None:
+            result['preflight']['line'] = self.line
+        return result
+
+
+def _accepts_one_argument(args):
+    positional = args.posonlyargs + args.args
+    required = len(positional) - len(args.defaults)
+    if any(default is None for default in args.kw_defaults):
+        return False  # Required keyword-only argument
+    return required <= 1 and (len(positional) >= 1 or args.vararg is not None)
+
+
+def _module_statements(body):
+    """
+    Statements of a module body, including those nested in if/try/with/for/while
+    and match blocks (but not in function or class bodies).
+    """
+    for node in body:
+        yield node
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            continue
+        for field in ('body', 'orelse', 'finalbody', 'handlers', 'cases'):
+            for child in getattr(node, field, ()):
+                if isinstance(child, ast.stmt):
+                    yield from _module_statements([child])
+                else:
+                    # except handler or match case
+                    yield from _module_statements(child.body)
+
+
+def _binds_transform(node):
+    """
+    Whether `node` may bind `transform` in a way whose signature is not checked.
+    """
+    if isinstance(node, ast.Name):
+        return node.id == 'transform' and isinstance(node.ctx, ast.Store)
+    if isinstance(node, (ast.AsyncFunctionDef, ast.ClassDef)):
+        return node.name == 'transform'
+    if isinstance(node, (ast.Global, ast.Nonlocal)):
+        return 'transform' in node.names
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return any((alias.asname or alias.name) in ('transform', '*') for alias in node.names)
+    return False
+
+
+class Preflight:
+    """
+    Cheap static checks on submitted code: size, syntax, complexity,
+    forbidden imports/builtins and a module-level one-argument `transform`.
+    Keeps per-check rejection counts.
+    """
+
+    def __init__(self, max_code_size=10000, max_nodes=2000, max_depth=50):
+        self.max_code_size = max_code_size
+        self.max_nodes = max_nodes
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.rejections = Counter()
+
+    def check(self, code):
+        """
+        Raise PreflightError if `code` should not be sent to the sandbox.
+        """
+        try:
+            self._check(code)
+        except PreflightError as e:
+            with self._lock:
+                self.checked += 1
+                self.rejections[e.check] += 1
+            raise
+        with self._lock:
+            self.checked += 1
+
+    def _check(self, code):
+        if not isinstance(code, str):
+            raise PreflightError('type', "Solution must be a string of Python code")
+        if len(code) > self.max_code_size:
+            raise PreflightError('size', f"Solution is {len(code)} characters, the limit is {self.max_code_size}")
+
+        try:
+            tree = ast.parse(code)
+        except SyntaxError as e:
+            raise PreflightError('syntax', f"Syntax error: {e.msg}", e.lineno)
+        except (ValueError, RecursionError, MemoryError):
+            raise PreflightError('syntax', "Solution could not be parsed")
+
+        self._check_nodes(tree)
+        self._check_transform(tree)
+
+    def _check_nodes(self, tree):
+        count = 0
+        stack = [(tree, 0)]
+        while stack:
+            node, depth = stack.pop()
+            count += 1
+            if count > self.max_nodes:
+                raise PreflightError('complexity', f"Solution has more than {self.max_nodes} syntax nodes")
+            if depth > self.max_depth:
+                raise PreflightError('complexity', f"Solution is nested more than {self.max_depth} levels deep",
+                                     getattr(node, 'lineno', None))
+
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                names = [node.module or '']
+            else:
+                names = []
+            for name in names:
+                if name.split('.')[0] in FORBIDDEN_MODULES:
+                    raise PreflightError('forbidden_import', f"Importing '{name}' is not allowed", node.lineno)
+            if isinstance(node, ast.Name) and node.id in FORBIDDEN_NAMES:
+                raise PreflightError('forbidden_name', f"Using '{node.id}' is not allowed", node.lineno)
+
+            stack.extend((child, depth + 1) for child in ast.iter_child_nodes(node))
+
+    def _check_transform(self, tree):
+        # Signatures of the module-level `transform` functions and lambdas. The
+        # code may bind the name in ways that cannot be checked statically as well
+        # (conditionally, by unpacking, in a loop...); those are left to the sandbox.
+        functions = []
+        checked_targets = set()
+        for node in _module_statements(tree.body):
+            if isinstance(node, ast.FunctionDef) and node.name == 'transform':
+                functions.append((node.args, node.lineno))
+            elif isinstance(node, (ast.Assign, ast.AnnAssign)) and isinstance(node.value, ast.Lambda):
+                targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                if len(targets) == 1 and isinstance(targets[0], ast.Name) and targets[0].id == 'transform':
+                    functions.append((node.value.args, node.lineno))
+                    checked_targets.add(targets[0])
+
+        if any(_accepts_one_argument(args) for args, lineno in functions):
+            return
+        if any(_binds_transform(node) for node in ast.walk(tree) if node not in checked_targets):
+            return
+        if functions:
+            raise PreflightError('signature', "transform() must take exactly one argument", functions[0][1])
+        raise PreflightError('missing_transform', "Solution does not define transform()")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'checked': self.checked,
+                'rejected': sum(self.rejections.values()),
+                'rejections': dict(self.rejections)
+            }
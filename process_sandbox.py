@@ -0,0 +1,253 @@
+# process_sandbox.py
+
+import json
+import logging
+import os
+import platform
+import selectors
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import sandbox_confine
+import testvectors
+from testvectors import INPUTS_FILE, expected_outputs_file
+from sandbox import SandboxBackend, RUNNER_SCRIPT, TIMEOUT_EXIT_CODE, RESULT_FRAME, MAX_RESULT_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Where the runner finds its files inside the sandbox root
+SANDBOX_WORKSPACE = "/workspace"
+SANDBOX_BUFFERS = "/buffers"
+SANDBOX_PUZZLE = "/puzzle"
+
+# Host directories the interpreter may load libraries from (besides its own prefix)
+SYSTEM_DIRS = ("/usr", "/lib", "/lib64", "/lib32", "/libx32")
+
+# Output kept from the runner (the rest is drained and dropped)
+MAX_OUTPUT = 64 * 1024
+
+
+def _system_entries(python_prefix):
+    """
+    (kind, host path) of what the interpreter needs inside the sandbox root:
+    'bind' for directories mounted read-only at the same path, 'link' for
+    symlinks such as /lib -> usr/lib that are recreated.
+    """
+    entries = []
+    for path in SYSTEM_DIRS:
+        if os.path.islink(path):
+            entries.append(('link', path))
+        elif os.path.isdir(path):
+            entries.append(('bind', path))
+    if not any(python_prefix == path or python_prefix.startswith(path + "/")
+               for kind, path in entries if kind == 'bind'):
+        entries.append(('bind', python_prefix))
+    if os.path.isfile("/etc/ld.so.cache"):
+        entries.append(('bind', "/etc/ld.so.cache"))
+    return entries
+
+
+class ProcessSandbox(SandboxBackend):
+    """
+    Runs the test runner in a local subprocess instead of a container.
+
+    Each run gets fresh mount, PID, network, IPC and UTS namespaces, plus a
+    user namespace unless the app runs as root. The runner is pid 1 of its
+    PID namespace, so no host process is visible or signalable. Its root is
+    a read-only tmpfs (entered with pivot_root, the host root detached)
+    holding only the workspace, the input buffer pack, the puzzle's
+    expected-output pack and the Python install, all bound read-only. It
+    runs as SANDBOX_PROCESS_UID/GID (default 65534, nobody): on the host
+    when the app is root, and as the in-namespace uid mapped onto the app's
+    otherwise, which leaves it without capabilities once it execs. rlimits
+    cap address space, CPU time, file size and process count. All of this is
+    done by sandbox_confine.py, exec'd in place of the runner, which then
+    execs the runner itself.
+
+    Set SANDBOX_PROCESS_NAMESPACES=0 on hosts without namespace support; the
+    run is then only confined by rlimits and must not face untrusted code.
+    """
+
+    @staticmethod
+    def configured_concurrency():
+        return int(os.getenv('SANDBOX_PROCESS_CONCURRENCY', os.cpu_count() or 1))
+
+    def __init__(self, memory_mb=None, pids_limit=None, concurrency=None, use_namespaces=None):
+        super().__init__()
+        self.memory_limit = (memory_mb or int(os.getenv('SANDBOX_PROCESS_MEMORY_MB', 256))) << 20
+        self.pids_limit = pids_limit or int(os.getenv('SANDBOX_PROCESS_PIDS', 100))
+        self.max_concurrency = concurrency or self.configured_concurrency()
+        if use_namespaces is None:
+            use_namespaces = os.getenv('SANDBOX_PROCESS_NAMESPACES', '1') != '0'
+        self.use_namespaces = use_namespaces
+
+        self.uid = int(os.getenv('SANDBOX_PROCESS_UID', 65534))
+        self.gid = int(os.getenv('SANDBOX_PROCESS_GID', 65534))
+
+        self._slots = threading.BoundedSemaphore(self.max_concurrency)
+        # The real interpreter binary (not a venv symlink), with its stdlib next to it
+        self.python = os.path.realpath(getattr(sys, '_base_executable', None) or sys.executable)
+        if use_namespaces:
+            if platform.machine() not in sandbox_confine.SYS_PIVOT_ROOT:
+                raise RuntimeError(f"Process sandbox namespaces are not supported on {platform.machine()}")
+            self._system_entries = _system_entries(sys.base_prefix)
+
+        logger.info("Initialized process sandbox", extra={'namespaces': use_namespaces})
+
+    def _confine_spec(self, timeout, root, binds):
+        """
+        What sandbox_confine.py must set up before it execs the runner: rlimits,
+        and with namespaces the sandbox root at `root` holding the Python install
+        plus `binds` ((host path, path inside) pairs), all read-only.
+        """
+        spec = {
+            'namespaces': self.use_namespaces,
+            'limits': {
+                'RLIMIT_AS': self.memory_limit,
+                'RLIMIT_CPU': int(timeout) + 1,
+                'RLIMIT_FSIZE': 0,
+                'RLIMIT_NPROC': self.pids_limit,
+                'RLIMIT_CORE': 0,
+            },
+        }
+        if self.use_namespaces:
+            spec.update({
+                'root': str(root),
+                'mounts': [(path, path) for kind, path in self._system_entries if kind == 'bind'] + binds,
+                'links': [(path, os.readlink(path)) for kind, path in self._system_entries if kind == 'link'],
+                'workdir': SANDBOX_WORKSPACE,
+                'uid': self.uid,
+                'gid': self.gid,
+            })
+        return spec
+
+    def _execute(self, files, puzzle_subdir, environment, timeout):
+        start = time.perf_counter_ns()
+        self._slots.acquire()
+        acquired = time.perf_counter_ns()
+        # Private to the app; only the workspace inside is readable by the sandbox uid
+        sandbox_dir = Path(tempfile.mkdtemp(prefix="gta-sandbox-"))
+        workspace = sandbox_dir / "workspace"
+        root = sandbox_dir / "root"
+        try:
+            workspace.mkdir(mode=0o755)
+            root.mkdir()
+            with open(workspace / "runner.py", "w") as f:
+                f.write(RUNNER_SCRIPT)
+            shutil.copy(testvectors.__file__, workspace / "testvectors.py")
+            for name, content in files.items():
+                with open(workspace / name, "w") as f:
+                    f.write(content)
+            for path in workspace.iterdir():
+                path.chmod(0o644)
+
+            puzzle_num = environment["PUZZLE_NUM"]
+            inputs_file = os.path.join(self.buffers_path, INPUTS_FILE)
+            expected_file = os.path.join(self.puzzles_path, puzzle_subdir, expected_outputs_file(puzzle_num))
+            if self.use_namespaces:
+                # The runner sees only these, read-only
+                binds = [(str(workspace), SANDBOX_WORKSPACE),
+                         (inputs_file, f"{SANDBOX_BUFFERS}/{INPUTS_FILE}"),
+                         (expected_file, f"{SANDBOX_PUZZLE}/{expected_outputs_file(puzzle_num)}")]
+                paths = {"WORKSPACE": SANDBOX_WORKSPACE, "PUZZLE_DIR": SANDBOX_PUZZLE,
+                         "BUFFERS_DIR": SANDBOX_BUFFERS}
+            else:
+                binds = []
+                paths = {"WORKSPACE": str(workspace),
+                         "PUZZLE_DIR": os.path.join(self.puzzles_path, puzzle_subdir),
+                         "BUFFERS_DIR": self.buffers_path}
+            runner = f"{paths['WORKSPACE']}/runner.py"
+            prepared = time.perf_counter_ns()
+
+            result_r, result_w = os.pipe()
+            try:
+                # Confinement happens in the exec'd helper, not in a preexec_fn: this
+                # process runs other threads, so its forked child must only exec
+                spec = self._confine_spec(timeout, root, binds)
+                proc = subprocess.Popen(
+                    [self.python, "-I", "-S", sandbox_confine.__file__, json.dumps(spec),
+                     self.python, "-E", "-s", "-u", runner],
+                    cwd=workspace,
+                    env=dict(environment,
+                             PATH=os.defpath,
+                             RESULT_FD=str(result_w),
+                             **paths),
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    pass_fds=(result_w,),
+                    start_new_session=True
+                )
+            finally:
+                os.close(result_w)
+            spawned = time.perf_counter_ns()
+
+            exit_code, result_frame, output = self._collect(proc, result_r, timeout)
+            finished = time.perf_counter_ns()
+            if exit_code == sandbox_confine.SETUP_FAILED_EXIT_CODE and not result_frame:
+                message = output.decode('utf-8', errors='replace').strip().splitlines()
+                raise RuntimeError(f"Sandbox setup failed: {message[-1] if message else exit_code}")
+        finally:
+            shutil.rmtree(sandbox_dir, ignore_errors=True)
+            self._slots.release()
+
+        timings = {
+            "acquire_ns": acquired - start,
+            "prepare_ns": prepared - acquired,
+            "spawn_ns": spawned - prepared,
+            "run_ns": finished - spawned
+        }
+        return exit_code, result_frame, output.decode('utf-8', errors='replace').strip(), timings
+
+    def _collect(self, proc, result_r, timeout):
+        """
+        Read the result channel and output until the runner exits or the time
+        budget runs out, then kill whatever is left of its process group.
+        """
+        deadline = time.monotonic() + timeout
+        output_r = proc.stdout.fileno()
+        streams = {result_r: bytearray(), output_r: bytearray()}
+        limits = {result_r: RESULT_FRAME.size + MAX_RESULT_SIZE, output_r: MAX_OUTPUT}
+        timed_out = False
+
+        with selectors.DefaultSelector() as selector:
+            for fd in streams:
+                selector.register(fd, selectors.EVENT_READ)
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    timed_out = True
+                    break
+                for key, _ in selector.select(min(remaining, 0.1)):
+                    chunk = os.read(key.fd, 65536)
+                    if not chunk:
+                        selector.unregister(key.fd)
+                    elif len(streams[key.fd]) < limits[key.fd]:
+                        streams[key.fd] += chunk
+                if proc.poll() is not None and not selector.select(0):
+                    break
+
+        if not timed_out:
+            # Streams close when the runner exits, a moment before its status is passed on
+            try:
+                proc.wait(max(deadline - time.monotonic(), 0))
+            except subprocess.TimeoutExpired:
+                timed_out = True
+
+        # Stragglers (and a timed-out runner) share the runner's process group
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        proc.wait()
+        os.close(result_r)
+        proc.stdout.close()
+
+        exit_code = TIMEOUT_EXIT_CODE if timed_out else proc.returncode
+        return exit_code, bytes(streams[result_r]), bytes(streams[output_r])
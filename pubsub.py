@@ -0,0 +1,98 @@
+# pubsub.py
+
+import threading
+from collections import deque
+
+
+class Subscription:
+    """
+    One subscriber's inbox. Holds at most `max_pending` messages; a subscriber
+    that falls further behind loses them and is flagged `overflowed` instead,
+    so a slow reader never holds up publishers.
+    """
+
+    def __init__(self, hub, topic, max_pending):
+        self.hub = hub
+        self.topic = topic
+        self.max_pending = max_pending
+        self.overflowed = False
+        self._messages = deque()
+        self._cond = threading.Condition()
+
+    def _deliver(self, message):
+        with self._cond:
+            if len(self._messages) >= self.max_pending:
+                self._messages.clear()
+                self.overflowed = True
+            else:
+                self._messages.append(message)
+            self._cond.notify()
+
+    def get(self, timeout):
+        """
+        Next message, or None after `timeout` seconds (or on overflow; check `overflowed`).
+        """
+        with self._cond:
+            if not self._messages and not self.overflowed:
+                self._cond.wait(timeout)
+            if self._messages:
+                return self._messages.popleft()
+            return None
+
+    def pop_overflow(self):
+        """
+        True (once) if messages were dropped since the last call.
+        """
+        with self._cond:
+            overflowed, self.overflowed = self.overflowed, False
+            return overflowed
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class Hub:
+    """
+    In-process publish/subscribe: every message published on a topic is
+    delivered to all current subscribers of that topic.
+    """
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._topics = {}  # topic -> set of Subscription
+        self._lock = threading.Lock()
+
+    def subscribe(self, topic):
+        subscription = Subscription(self, topic, self.max_pending)
+        with self._lock:
+            self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._topics.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[subscription.topic]
+
+    def publish(self, topic, message):
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+        for subscription in subscribers:
+            subscription._deliver(message)
+        return len(subscribers)
+
+    def topics(self):
+        """
+        Topics that currently have subscribers.
+        """
+        with self._lock:
+            return list(self._topics)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'topics': len(self._topics),
+                'subscribers': sum(len(s) for s in self._topics.values())
+            }
@@ -0,0 +1,139 @@
+# puzzle_registry.py
+
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Written by scripts/apply_transforms.py after regenerating puzzles
+MANIFEST_FILE = "manifest.json"
+
+
+class PuzzleRegistry:
+    """
+    In-memory index of the available puzzles.
+
+    Built once by scanning `base_dir`, then rebuilt only when the mtime of a
+    puzzle directory or of the manifest changes. Those are checked at most every
+    `refresh_interval` seconds, so most lookups never touch the filesystem.
+    """
+
+    def __init__(self, metadata, base_dir='puzzles', sources=('benchmark', 'examples'), refresh_interval=5):
+        self.metadata = metadata
+        self.base_dir = base_dir
+        self.sources = sources
+        self.refresh_interval = refresh_interval
+        self._lock = threading.Lock()
+        self._checked_at = 0
+        self._signature = None
+        self.generation = 0  # Bumped on every rebuild
+        self._by_id = {}
+        self._by_source = {source: {} for source in sources}
+        self._refresh()
+
+    def get(self, puzzle_id):
+        """
+        Puzzle dict for `puzzle_id`, or None if there is no such puzzle.
+        """
+        self._maybe_refresh()
+        return self._by_id.get(puzzle_id)
+
+    def grouped(self):
+        """
+        Puzzles grouped by source and level: {source: {level: [puzzle, ...]}}.
+        """
+        self._maybe_refresh()
+        return self._by_source
+
+    def _maybe_refresh(self):
+        if time.monotonic() - self._checked_at < self.refresh_interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._checked_at >= self.refresh_interval:
+                self._refresh()
+
+    def _refresh(self):
+        signature = self._scan_signature()
+        self._checked_at = time.monotonic()
+        if signature == self._signature:
+            return
+        by_id, by_source = self._scan()
+        # Swap in complete indexes; readers never see a half-built one
+        self._by_id, self._by_source = by_id, by_source
+        self._signature = signature
+        self.generation += 1
+        logger.info("Loaded puzzles", extra={'puzzles': len(by_id)})
+
+    def _scan_signature(self):
+        """
+        mtimes of the manifest and of every source and level directory.
+        Adding or removing a puzzle changes its level directory's mtime.
+        """
+        paths = [self.base_dir, os.path.join(self.base_dir, MANIFEST_FILE)]
+        for source in self.sources:
+            source_path = os.path.join(self.base_dir, source)
+            paths.append(source_path)
+            if os.path.isdir(source_path):
+                paths.extend(os.path.join(source_path, d) for d in sorted(os.listdir(source_path))
+                             if d.startswith('level_'))
+
+        signature = []
+        for path in paths:
+            try:
+                signature.append((path, os.stat(path).st_mtime_ns))
+            except OSError:
+                signature.append((path, None))
+        return tuple(signature)
+
+    def _scan(self):
+        by_id = {}
+        by_source = {source: {} for source in self.sources}
+
+        for dir_name in self.sources:
+            puzzles_dir = os.path.join(self.base_dir, dir_name)
+            if not os.path.exists(puzzles_dir):
+                continue
+
+            for level_dir in os.listdir(puzzles_dir):
+                if not level_dir.startswith('level_'):
+                    continue
+
+                try:
+                    level_num = int(level_dir.split('_')[1])
+                except ValueError:
+                    continue
+                if level_num not in self.metadata:
+                    continue
+
+                level_path = os.path.join(puzzles_dir, level_dir)
+                if not os.path.isdir(level_path):
+                    continue
+
+                # Find all transform files in this level
+                puzzle_nums = []
+                for f in os.listdir(level_path):
+                    if f.startswith('transform_') and f.endswith('.py'):
+                        try:
+                            puzzle_nums.append(int(f[len('transform_'):-len('.py')]))
+                        except ValueError:
+                            continue
+
+                if not puzzle_nums:  # Only add level if it has transforms
+                    continue
+
+                level_puzzles = by_source[dir_name][level_num] = []
+                for puzzle_num in sorted(puzzle_nums):
+                    puzzle = {
+                        'id': f"{dir_name}_{level_dir}_puzzle_{puzzle_num}",
+                        'number': puzzle_num,
+                        'level': level_num,
+                        'metadata': self.metadata[level_num],
+                        'prompt_file': os.path.join(level_path, f'prompt_{puzzle_num}.txt'),
+                        'source_dir': dir_name
+                    }
+                    level_puzzles.append(puzzle)
+                    by_id[puzzle['id']] = puzzle
+
+        return by_id, by_source
@@ -1,3 +1,8 @@
 def hidden_transform(data: bytes) -> bytes:
     # Single XOR (simplest bitwise op)
-    return bytes([b ^ 0xA5 for b in data])
\ No newline at end of file
+    return bytes([b ^ 0xA5 for b in data])
+
+
+def hidden_transform_batch(data):
+    # Same transform over an (N, 64) uint8 array
+    return data ^ 0xA5
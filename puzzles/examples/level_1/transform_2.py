@@ -1,3 +1,8 @@
 def hidden_transform(data: bytes) -> bytes:
     # Simple AND then addition (introduces AND)
-    return bytes([((b & 0xF5) + 0x0B) % 256 for b in data])
\ No newline at end of file
+    return bytes([((b & 0xF5) + 0x0B) % 256 for b in data])
+
+
+def hidden_transform_batch(data):
+    # Same transform over an (N, 64) uint8 array
+    return (data & 0xF5) + 0x0B  # uint8 arithmetic wraps like % 256
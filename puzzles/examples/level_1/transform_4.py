@@ -1,3 +1,9 @@
 def hidden_transform(data: bytes) -> bytes:
     # Conditional transform (introduces branching)
-    return bytes([b ^ 0x55 if b & 0x40 else b ^ 0xAA for b in data])
\ No newline at end of file
+    return bytes([b ^ 0x55 if b & 0x40 else b ^ 0xAA for b in data])
+
+
+def hidden_transform_batch(data):
+    # Same transform over an (N, 64) uint8 array
+    import numpy as np
+    return np.where(data & 0x40, data ^ 0x55, data ^ 0xAA).astype(np.uint8)
@@ -1,3 +1,8 @@
 def hidden_transform(data: bytes) -> bytes:
     # Multiple ops combining previous concepts
     return bytes([(((b << 3) & 0xEF) + 0x13) % 256 ^ (b >> 4) for b in data])
+
+
+def hidden_transform_batch(data):
+    # Same transform over an (N, 64) uint8 array
+    return (((data << 3) & 0xEF) + 0x13) ^ (data >> 4)  # uint8 shifts and adds wrap like % 256
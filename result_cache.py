@@ -0,0 +1,149 @@
+# result_cache.py
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from db import connect
+from metrics import db_timer
+
+
+def normalize_code(code):
+    """
+    Canonical form of submitted code for cache keys: unified line endings,
+    no trailing whitespace and no leading/trailing blank lines.
+    """
+    lines = code.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return '\n'.join(line.rstrip() for line in lines).strip('\n')
+
+
+def submission_key(puzzle_id, code, vectors_digest):
+    """
+    Content address of a submission: normalized code + puzzle + test-vector digest.
+    """
+    h = hashlib.sha256()
+    h.update(hashlib.sha256(normalize_code(code).encode('utf-8')).digest())
+    h.update(puzzle_id.encode('utf-8'))
+    h.update(vectors_digest)
+    return h.hexdigest()
+
+
+_file_digests = {}
+_file_digests_lock = threading.Lock()
+
+
+def file_digest(path):
+    """
+    SHA-256 of a file, recomputed only when its size or mtime changes.
+    """
+    st = os.stat(path)
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _file_digests_lock:
+        cached = _file_digests.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).digest()
+    with _file_digests_lock:
+        _file_digests[path] = (stamp, digest)
+    return digest
+
+
+def vectors_digest(*paths, scoring=None):
+    """
+    Combined digest of the test-vector files a submission is scored against,
+    and of the `scoring` settings (hidden-set sampling) if given.
+    Regenerating any of them (e.g. via scripts/apply_transforms.py) or changing
+    the settings changes the digest, so earlier cache entries simply stop matching.
+    """
+    h = hashlib.sha256()
+    for path in paths:
+        h.update(file_digest(path))
+    if scoring:
+        h.update(json.dumps(scoring, sort_keys=True).encode('utf-8'))
+    return h.digest()
+
+
+class ResultCache:
+    """
+    LRU + TTL cache of sandbox results keyed by `submission_key`.
+
+    With `db_path` set, entries are also written to a SQLite table (created by
+    db.migrate) so they survive restarts and are shared between app processes;
+    memory misses fall through to it and hits are promoted back into memory.
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, db_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self._entries = OrderedDict()  # key -> (stored_at, result)
+        self._lock = threading.Lock()
+        self._puts = 0
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if now - entry[0] < self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        if self.db_path:
+            with db_timer('result_cache_get'), connect(self.db_path) as conn:
+                c = conn.cursor()
+                c.execute('SELECT result, stored_at FROM result_cache WHERE key = ? AND stored_at > ?',
+                          (key, now - self.ttl))
+                row = c.fetchone()
+            if row is not None:
+                result = json.loads(row[0])
+                self._remember(key, result, row[1])
+                with self._lock:
+                    self.hits += 1
+                    self.persistent_hits += 1
+                return result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, result):
+        now = time.time()
+        self._remember(key, result, now)
+
+        if self.db_path:
+            with db_timer('result_cache_put'), connect(self.db_path) as conn:
+                c = conn.cursor()
+                c.execute('INSERT OR REPLACE INTO result_cache (key, result, stored_at) VALUES (?, ?, ?)',
+                          (key, json.dumps(result), now))
+                self._puts += 1
+                if self._puts % 100 == 0:
+                    c.execute('DELETE FROM result_cache WHERE stored_at <= ?', (now - self.ttl,))
+                conn.commit()
+
+    def _remember(self, key, result, stored_at):
+        with self._lock:
+            self._entries[key] = (stored_at, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'persistent_hits': self.persistent_hits,
+                'misses': self.misses,
+                'entries': len(self._entries),
+                'persistent': bool(self.db_path)
+            }
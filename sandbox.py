@@ -1,248 +1,1072 @@
 # sandbox.py
+"""
+Sandbox backends that score submissions by running the test runner
+(RUNNER_SCRIPT) somewhere isolated from the app.
+
+DockerSandbox keeps a pool of warm containers, and each one scores up to
+`max_uses` submissions, from any users, before it is replaced. Between two
+runs in the same container, every process left in it is killed and the
+writable mounts (/dev/shm, /dev/mqueue, and /tmp if the image makes it
+writable) are emptied; the root filesystem, /workspace and the test vectors
+are read-only. Anything else a run can change in the container's kernel
+state (e.g. SysV IPC objects) is not reset and is visible to the next run
+in that container. Set SANDBOX_WORKER_MAX_USES=1 for a fresh container per run.
+ProcessSandbox (process_sandbox.py) starts every run from scratch.
+"""
 
-import docker
+import abc
+import hashlib
+import logging
 import tempfile
+import threading
+import time
+import shutil
+import atexit
 import os
 from pathlib import Path
 import json
+import signal
+import struct
+import testvectors
+from testvectors import INPUTS_FILE, expected_outputs_file
+from shared_state import host_semaphore
+import logs
+import metrics
 
+logger = logging.getLogger(__name__)
 
-class DockerSandbox:
-    def __init__(self):
-        self.client = docker.from_env()
-        self.image_name = "python:3.9-slim"
-        # Store project root at initialization
-        self.project_root = os.path.abspath(os.getcwd())
-
-        print("Initializing Docker sandbox...")
-        try:
-            self.client.images.pull(self.image_name)
-            print(f"Successfully pulled {self.image_name}")
-        except Exception as e:
-            print(f"Error pulling Docker image: {e}")
-            raise
 
-    def run_submission(self, puzzle_id: str, user_code: str) -> dict:
-        print(f"Running submission for puzzle {puzzle_id}")
-
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmp_path = Path(tmpdir)
-
-            # Save user code
-            with open(tmp_path / "solution.py", "w") as f:
-                f.write(user_code)
-            print("Saved user solution")
-
-            # Create runner script
-            runner_script = """
+# Test runner executed inside the sandbox for every submission.
+# It reads the puzzle location from the environment so a single warm
+# container can score submissions for any puzzle.
+RUNNER_SCRIPT = """
 import sys
 import json
+import math
 import time
 import os
+import random
+import select
+import signal
+import struct
+import types
 from pathlib import Path
 
-def load_buffers(prefix):
-    buffers = []
-    for i in range(1, 25):  # Load all 24 buffers
-        with open(f"/buffers/shared/{prefix}_{i:02d}.bin", "rb") as f:
-            buffers.append(f.read())
-    return buffers
-
-def load_expected_outputs(puzzle_dir, puzzle_num):
-    visible_outputs = []
-    hidden_outputs = []
-    
-    # Load visible outputs
-    with open(f"{puzzle_dir}/visible_outputs_{puzzle_num}.bin", "rb") as f:
-        for _ in range(24):  # 24 buffers
-            visible_outputs.append(f.read(64))
-            
-    # Load hidden outputs
-    with open(f"{puzzle_dir}/hidden_outputs_{puzzle_num}.bin", "rb") as f:
-        for _ in range(24):  # 24 buffers
-            hidden_outputs.append(f.read(64))
-            
-    return visible_outputs, hidden_outputs
+# The runner may live outside the workspace (baked into the sandbox image) and run
+# under `python -I`, which drops the script directory from sys.path, so both the
+# runner's own directory and the workspace holding solution.py are added here.
+RUNNER_DIR = os.path.dirname(os.path.abspath(__file__))
+WORKSPACE = os.environ.get("WORKSPACE", RUNNER_DIR)
+sys.path[:0] = [RUNNER_DIR, WORKSPACE]
 
-def run_tests():
+from testvectors import TestVectorPack, INPUTS_FILE, expected_outputs_file
+
+# Input buffers; mounted (or baked in) here by the Docker backend
+BUFFERS_DIR = os.environ.get("BUFFERS_DIR", "/buffers/shared")
+
+# Result channel: the host connects fd 3 (or RESULT_FD) to its result stream, separate from
+# stdout. Exactly one frame is written: magic + length + JSON payload.
+# Must match RESULT_FRAME / RESULT_MAGIC / MAX_RESULT_SIZE in sandbox.py.
+RESULT_FD = int(os.environ.get("RESULT_FD", 3))
+RESULT_FRAME = struct.Struct("<4sI")
+RESULT_MAGIC = b"GTAR"
+MAX_RESULT_SIZE = 1 << 20
+
+# Move the channel off the well-known fd. Solution code only ever runs in forked
+# children (see run_solution), which close it before loading the solution.
+result_fd = os.dup(RESULT_FD)
+os.close(RESULT_FD)
+
+# Keep those children (same uid) from ptracing this process or reaching its
+# memory and descriptors through /proc
+try:
+    import ctypes
+    ctypes.CDLL(None).prctl(4, 0, 0, 0, 0)  # PR_SET_DUMPABLE
+except (ImportError, OSError, AttributeError):
+    pass
+
+def emit_result(result):
+    payload = json.dumps(result).encode()
+    if len(payload) > MAX_RESULT_SIZE:
+        payload = json.dumps({"success": False, "error": "Result too large"}).encode()
+    os.write(result_fd, RESULT_FRAME.pack(RESULT_MAGIC, len(payload)) + payload)
+    os.close(result_fd)
+
+def sample_indices(total):
+    # Hidden buffers to score: all of them, or SCORING_SAMPLE of them picked with
+    # SCORING_SEED. The host adds the puzzle id to the seed, so every submission
+    # to a puzzle is scored on the same sample.
+    size = int(os.environ.get("SCORING_SAMPLE", 0))
+    if size <= 0 or size >= total:
+        return range(total)
+    return sorted(random.Random(os.environ.get("SCORING_SEED", "")).sample(range(total), size))
+
+def confidence_interval(correct, sampled, total, z=1.96):
+    # 95% Wilson score interval for the fraction of all `total` hidden buffers
+    # passed, from `correct` of `sampled` drawn without replacement (the finite
+    # population correction shrinks it to a point when the sample is everything)
+    if sampled == 0:
+        return 0.0, 1.0
+    p = correct / sampled
+    z2 = z * z * (total - sampled) / max(total - 1, 1)
+    denominator = 1 + z2 / sampled
+    centre = (p + z2 / (2 * sampled)) / denominator
+    margin = math.sqrt(z2 * (p * (1 - p) / sampled + z2 / (4 * sampled * sampled))) / denominator
+    return max(0.0, centre - margin), min(1.0, centre + margin)
+
+def load_cases(puzzle_dir, puzzle_num, timings):
+    # Map the packed input buffers and expected outputs
     try:
-        start_time = time.time()
-        
-        print("Current directory contents:", flush=True)
-        os.system("ls -la /puzzle")  # Let's see what files we actually have
-        
-        # Import the user's transform function
-        from solution import transform
-        print("Successfully imported user solution", flush=True)
-        
-        # Load inputs
+        print("Loading test vectors...", flush=True)
+        start = time.perf_counter_ns()
+        inputs = TestVectorPack(os.path.join(BUFFERS_DIR, INPUTS_FILE))
+        hidden_total = inputs.count('hidden')
+        hidden_indices = sample_indices(hidden_total)
+        # Transforms receive real bytes; expected outputs stay zero-copy views
+        visible_inputs = [bytes(buf) for buf in inputs.records('visible')]
+        hidden_inputs = [bytes(inputs.record('hidden', i)) for i in hidden_indices]
+        loaded_inputs = time.perf_counter_ns()
+
+        expected = TestVectorPack(os.path.join(puzzle_dir, expected_outputs_file(puzzle_num)))
+        if expected.digest != inputs.digest:
+            raise ValueError("Expected outputs were generated from a different buffer set")
+        visible_outputs = expected.records('visible')
+        hidden_outputs = [expected.record('hidden', i) for i in hidden_indices]
+        loaded_outputs = time.perf_counter_ns()
+
+        timings["load_inputs_ns"] = loaded_inputs - start
+        timings["load_outputs_ns"] = loaded_outputs - loaded_inputs
+        print(f"Loaded {len(visible_inputs)} visible and {len(hidden_inputs)} of {hidden_total} hidden inputs",
+              flush=True)
+    except Exception as e:
+        print(f"Error loading test vectors: {e}", flush=True)
+        raise
+    return visible_inputs, hidden_inputs, visible_outputs, hidden_outputs, hidden_total
+
+def apply_transform(transform, inputs, durations):
+    results = []
+    for buf in inputs:
         try:
-            print("Loading input buffers...", flush=True)
-            visible_inputs = load_buffers('visible')
-            hidden_inputs = load_buffers('hidden')
-            print(f"Loaded {len(visible_inputs)} visible and {len(hidden_inputs)} hidden inputs", flush=True)
+            start = time.perf_counter_ns()
+            result = transform(buf)
+            durations.append(time.perf_counter_ns() - start)
+            if not isinstance(result, bytes) or len(result) != 64:
+                raise ValueError("Transform must return 64 bytes")
+            results.append(result)
         except Exception as e:
-            print(f"Error loading inputs: {e}", flush=True)
+            print(f"Error running transform: {e}", flush=True)
             raise
-            
-        # Load expected outputs
+    return results
+
+def write_all(fd, data):
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+def solution_child(load_transform, cases, write_fd):
+    # Runs in the forked child: the only process that ever executes solution code.
+    # It holds no result channel and reports just its raw outputs (plus
+    # diagnostics), so whatever it does it cannot claim a score it did not earn.
+    visible_inputs, hidden_inputs = cases[0], cases[1]
+    report = {}
+    outputs = b""
+    try:
+        import_start = time.perf_counter_ns()
+        transform = load_transform()
+        if not callable(transform):
+            raise ValueError("Solution does not define transform()")
+        report["import_ns"] = time.perf_counter_ns() - import_start
+        print("Successfully imported user solution", flush=True)
+
+        durations = []
+        loop_start = time.perf_counter_ns()
+        visible_results = apply_transform(transform, visible_inputs, durations)
+        visible_done = time.perf_counter_ns()
+        hidden_results = apply_transform(transform, hidden_inputs, durations)
+        hidden_done = time.perf_counter_ns()
+
+        durations.sort()
+        report.update({
+            "visible_loop_ns": visible_done - loop_start,
+            "hidden_loop_ns": hidden_done - visible_done,
+            "buffer_min_ns": durations[0],
+            "buffer_median_ns": durations[len(durations) // 2],
+            "buffer_max_ns": durations[-1]
+        })
+        outputs = b"".join(visible_results + hidden_results)
+    except SystemExit:
+        report = {"error": "Solution called sys.exit()"}
+    except BaseException as e:
+        report = {"error": str(e) or type(e).__name__}
+    header = json.dumps(report).encode()
+    write_all(write_fd, struct.pack("<I", len(header)) + header + outputs)
+
+def run_solution(load_transform, cases, load_timings, timeout=None):
+    # Score one solution: fork a child to run it and score the outputs it sends
+    # back here. Loading the test vectors (done once, before forking) counts
+    # towards the execution time, so single and batch runs measure the same thing.
+    visible_inputs, hidden_inputs, visible_outputs, hidden_outputs, hidden_total = cases
+    read_fd, write_fd = os.pipe()
+    start_ns = time.perf_counter_ns()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        os.close(result_fd)
         try:
-            print("Loading expected outputs...", flush=True)
-            print("Files in /puzzle:", os.listdir("/puzzle"), flush=True)
-            puzzle_num = os.environ["PUZZLE_NUM"]  # Get puzzle number from environment
-            
-            with open(os.path.join("/puzzle", f"visible_outputs_{puzzle_num}.bin"), "rb") as f:
-                visible_outputs = []
-                for _ in range(24):
-                    visible_outputs.append(f.read(64))
-            print("Loaded visible outputs", flush=True)
-                    
-            with open(os.path.join("/puzzle", f"hidden_outputs_{puzzle_num}.bin"), "rb") as f:
-                hidden_outputs = []
-                for _ in range(24):
-                    hidden_outputs.append(f.read(64))
-            print("Loaded hidden outputs", flush=True)
-        except Exception as e:
-            print(f"Error loading outputs: {e}", flush=True)
-            raise
-                                
-        # Run transform on all inputs
-        visible_results = []
-        hidden_results = []
+            solution_child(load_transform, cases, write_fd)
+        finally:
+            os._exit(0)
 
-        for buf in visible_inputs:
-            try:
-                result = transform(buf)
-                if not isinstance(result, bytes) or len(result) != 64:
-                    raise ValueError("Transform must return 64 bytes")
-                visible_results.append(result)
-            except Exception as e:
-                print(f"Error running transform: {e}", flush=True)
-                raise
+    os.close(write_fd)
+    data = bytearray()
+    deadline = None if timeout is None else time.monotonic() + timeout
+    timed_out = False
+    while True:
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            timed_out = True
+            break
+        ready, _, _ = select.select([read_fd], [], [], remaining)
+        if not ready:
+            continue
+        chunk = os.read(read_fd, 1 << 20)
+        if not chunk:
+            break
+        data += chunk
+    end_ns = time.perf_counter_ns()
+    os.close(read_fd)
 
-        for buf in hidden_inputs:
-            try:
-                result = transform(buf)
-                if not isinstance(result, bytes) or len(result) != 64:
-                    raise ValueError("Transform must return 64 bytes")
-                hidden_results.append(result)
-            except Exception as e:
-                print(f"Error running transform: {e}", flush=True)
-                raise
+    if timed_out:
+        os.kill(pid, signal.SIGKILL)
+    _, status = os.waitpid(pid, 0)
+    if timed_out:
+        return {"success": False,
+                "error": f"Execution timeout - solution took longer than {timeout} seconds"}
+
+    # Length-prefixed JSON report, then 64 bytes per visible and hidden input
+    try:
+        (header_size,) = struct.unpack_from("<I", data)
+        report = json.loads(bytes(data[4:4 + header_size]))
+        outputs = bytes(data[4 + header_size:])
+        if not isinstance(report, dict):
+            raise ValueError("report is not an object")
+    except (struct.error, ValueError):
+        return {"success": False, "error": exit_status_error(os.waitstatus_to_exitcode(status))}
+    if "error" in report:
+        return {"success": False, "error": str(report["error"])}
+    visible_total = len(visible_inputs)
+    hidden_sampled = len(hidden_inputs)
+    if len(outputs) != 64 * (visible_total + hidden_sampled):
+        return {"success": False, "error": "Solution returned an incomplete set of outputs"}
 
-        # Calculate scores
-        visible_correct = sum(1 for a, b in zip(visible_results, visible_outputs) if a == b)
-        hidden_correct = sum(1 for a, b in zip(hidden_results, hidden_outputs) if a == b)
+    records = [outputs[i:i + 64] for i in range(0, len(outputs), 64)]
+    visible_correct = sum(1 for a, b in zip(records[:visible_total], visible_outputs) if a == b)
+    hidden_correct = sum(1 for a, b in zip(records[visible_total:], hidden_outputs) if a == b)
 
-        end_time = time.time()
-        execution_time = end_time - start_time
+    load_ns = load_timings["load_inputs_ns"] + load_timings["load_outputs_ns"]
+    total_ns = load_ns + end_ns - start_ns
+    # Diagnostics from the child are kept only if they are plain numbers
+    timings = {key: value for key, value in report.items()
+               if key in CHILD_TIMINGS and type(value) is int}
+    timings.update(load_timings, total_ns=total_ns)
 
-        result = {
-            "success": True,
-            "visible_score": visible_correct / 24,
-            "hidden_score": hidden_correct / 24,
-            "total_score": (visible_correct + hidden_correct) / 48,
-            "execution_time": execution_time,
-            "visible_correct": visible_correct,
-            "hidden_correct": hidden_correct
-        }
+    hidden_score = hidden_correct / hidden_sampled if hidden_sampled else 0.0
+    result = {
+        "success": True,
+        "visible_score": visible_correct / visible_total,
+        "hidden_score": hidden_score,
+        "total_score": (visible_correct + hidden_correct) / (visible_total + hidden_total),
+        "execution_time": total_ns / 1e9,
+        "visible_correct": visible_correct,
+        "hidden_correct": hidden_correct,
+        "visible_total": visible_total,
+        "hidden_total": hidden_total,
+        "timings": timings
+    }
 
-        print(json.dumps(result), flush=True)
-        return result
+    if hidden_sampled < hidden_total:
+        # Scores are estimates for the whole hidden set
+        low, high = confidence_interval(hidden_correct, hidden_sampled, hidden_total)
+        total = visible_total + hidden_total
+        result.update({
+            "total_score": (visible_correct + hidden_score * hidden_total) / total,
+            "hidden_sampled": hidden_sampled,
+            "hidden_score_ci": [low, high],
+            "total_score_ci": [(visible_correct + low * hidden_total) / total,
+                               (visible_correct + high * hidden_total) / total]
+        })
+    return result
 
+CHILD_TIMINGS = ("import_ns", "visible_loop_ns", "hidden_loop_ns",
+                 "buffer_min_ns", "buffer_median_ns", "buffer_max_ns")
+
+def import_solution():
+    from solution import transform
+    return transform
+
+def compiled_solution(index, code):
+    def load():
+        module = types.ModuleType(f"solution_{index}")
+        exec(compile(code, f"solution_{index}.py", "exec"), module.__dict__)
+        return getattr(module, "transform", None)
+    return load
+
+def run_tests():
+    try:
+        puzzle_dir = os.environ["PUZZLE_DIR"]  # Puzzle directory inside /puzzles
+        puzzle_num = os.environ["PUZZLE_NUM"]  # Get puzzle number from environment
+
+        load_timings = {}
+        cases = load_cases(puzzle_dir, puzzle_num, load_timings)
+        # The host enforces the time budget of a single run
+        result = run_solution(import_solution, cases, load_timings)
     except Exception as e:
         result = {
             "success": False,
-            "error": str(e)
+            "error": str(e) or type(e).__name__
         }
-        print(json.dumps(result), flush=True)
-        return result
+    emit_result(result)
+    return result
+
+def exit_status_error(exit_code):
+    # Mirrors exit_status_error() in sandbox.py
+    if exit_code < 0:
+        try:
+            name = signal.Signals(-exit_code).name
+        except ValueError:
+            name = str(-exit_code)
+        return f"Solution was killed by signal {name}"
+    return f"Solution exited with code {exit_code} without reporting a result"
+
+def run_batch():
+    try:
+        puzzle_dir = os.environ["PUZZLE_DIR"]
+        puzzle_num = os.environ["PUZZLE_NUM"]
+        timeout = float(os.environ["SOLUTION_TIMEOUT"])
+        with open(os.path.join(WORKSPACE, "batch.json")) as f:
+            solutions = json.load(f)
+
+        # Test vectors are loaded once and shared with every child
+        load_timings = {}
+        cases = load_cases(puzzle_dir, puzzle_num, load_timings)
+        results = [run_solution(compiled_solution(i, code), cases, load_timings, timeout)
+                   for i, code in enumerate(solutions)]
+        result = {"success": True, "results": results}
+    except Exception as e:
+        result = {"success": False, "error": str(e)}
+
+    emit_result(result)
+    return result
 
 if __name__ == "__main__":
-    run_tests()
+    if os.environ.get("BATCH"):
+        run_batch()
+    else:
+        run_tests()
 """
-            with open(tmp_path / "runner.py", "w") as f:
-                f.write(runner_script)
-            print("Created test runner")
 
+# Per-submission time budget in seconds, enforced by the sandbox backend
+EXECUTION_TIMEOUT = 3
+
+# Extra time allowed for a batch run on top of the per-solution budgets
+BATCH_OVERHEAD = 5
+
+# Exit status reported by `timeout` when the time budget is exceeded
+TIMEOUT_EXIT_CODE = 124
+
+# Longest a run waits for a host-wide sandbox slot (see shared_state.HostSemaphore)
+HOST_SLOT_TIMEOUT = 60
+
+# Result channel written by the runner on fd 3 (see RUNNER_SCRIPT)
+RESULT_FRAME = struct.Struct("<4sI")
+RESULT_MAGIC = b"GTAR"
+MAX_RESULT_SIZE = 1 << 20
+
+
+
+def exit_status_error(exit_code):
+    """
+    Error for a runner that ended with `exit_code` (negative: killed by that
+    signal) without reporting a result. Mirrored in RUNNER_SCRIPT for the
+    forked processes that run solutions.
+    """
+    if exit_code < 0:
+        try:
+            name = signal.Signals(-exit_code).name
+        except ValueError:
+            name = str(-exit_code)
+        return f"Solution was killed by signal {name}"
+    return f"Solution exited with code {exit_code} without reporting a result"
+
+# Label used to find (and clean up) sandbox workers started by this app, and the
+# pid of the app process that owns each worker
+WORKER_LABEL = "gta-benchmark.sandbox"
+OWNER_LABEL = "gta-benchmark.owner"
+
+# Stock image, and the runner image built on top of it from sandbox.Dockerfile
+BASE_IMAGE = "python:3.9-slim"
+RUNNER_IMAGE = "gta-benchmark-sandbox"
+DOCKERFILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox.Dockerfile")
+
+# How the runner is started: from source in the workspace (stock image), or from
+# its baked-in bytecode in isolated mode without the site module (runner image)
+STOCK_RUNNER_COMMAND = "python -u /workspace/runner.py"
+
+# Empties the container paths a run can write to, once its processes are gone
+WRITABLE_PATHS = ("/dev/shm", "/dev/mqueue", "/tmp", "/var/tmp")
+WIPE_COMMAND = "rm -rf " + " ".join(f"{path}/* {path}/.[!.]* {path}/..?*" for path in WRITABLE_PATHS) + " 2>/dev/null"
+PREBUILT_RUNNER_COMMAND = "python -I -S -u /opt/runner/runner.pyc"
+
+
+def build_runner_image(client, bake_vectors_from=None):
+    """
+    Tag of the runner image for the current runner code, built first if it is
+    not present locally. With `bake_vectors_from` (a buffers directory) its input
+    pack is copied into the image and its buffer-set digest is part of the tag.
+    """
+    from docker.errors import ImageNotFound
+
+    h = hashlib.sha256()
+    with open(DOCKERFILE, 'rb') as f:
+        h.update(f.read())
+    with open(testvectors.__file__, 'rb') as f:
+        h.update(f.read())
+    h.update(RUNNER_SCRIPT.encode('utf-8'))
+    h.update(BASE_IMAGE.encode('utf-8'))
+    tag = f"{RUNNER_IMAGE}:{h.hexdigest()[:12]}"
+    if bake_vectors_from:
+        with testvectors.TestVectorPack(os.path.join(bake_vectors_from, INPUTS_FILE)) as pack:
+            tag += f"-vectors-{pack.digest.hex()[:12]}"
+
+    try:
+        client.images.get(tag)
+        return tag
+    except ImageNotFound:
+        pass
+
+    logger.info("Building sandbox image", extra={'image': tag})
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(prefix="gta-sandbox-build-") as context:
+        shutil.copy(DOCKERFILE, os.path.join(context, "Dockerfile"))
+        with open(os.path.join(context, "runner.py"), "w") as f:
+            f.write(RUNNER_SCRIPT)
+        shutil.copy(testvectors.__file__, os.path.join(context, "testvectors.py"))
+        os.mkdir(os.path.join(context, "vectors"))
+        if bake_vectors_from:
+            shutil.copy(os.path.join(bake_vectors_from, INPUTS_FILE), os.path.join(context, "vectors"))
+        client.images.build(path=context, tag=tag, buildargs={"BASE_IMAGE": BASE_IMAGE},
+                            labels={WORKER_LABEL: "image"}, rm=True)
+    logger.info("Built sandbox image", extra={'image': tag, 'seconds': round(time.perf_counter() - start, 1)})
+    return tag
+
+
+def ensure_image(client, image_name):
+    """
+    Make sure `image_name` is present locally, pulling it only if it is not.
+    """
+    from docker.errors import ImageNotFound
+
+    try:
+        client.images.get(image_name)
+        return
+    except ImageNotFound:
+        pass
+    try:
+        client.images.pull(image_name)
+        logger.info("Pulled sandbox image", extra={'image': image_name})
+    except Exception:
+        logger.exception("Error pulling sandbox image", extra={'image': image_name})
+        raise
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # Exists, owned by another user
+    return True
+
+
+def remove_stale_workers(client):
+    """
+    Remove sandbox workers whose owning app process is gone. Workers of other
+    live app processes (e.g. sibling gunicorn workers) are left alone.
+    """
+    try:
+        for container in client.containers.list(all=True, filters={"label": WORKER_LABEL}):
+            if container.labels.get(WORKER_LABEL) != "worker":
+                continue
+            owner = container.labels.get(OWNER_LABEL, "")
+            if owner.isdigit() and _process_alive(int(owner)):
+                continue
+            container.remove(force=True)
+    except Exception as e:
+        logger.warning("Failed to remove stale sandbox workers: %s", e)
+
+
+class SandboxWorker:
+    """
+    A pre-started, locked-down container that scores submissions via `docker exec`.
+
+    Each worker owns a host temp dir bind-mounted read-only at /workspace where
+    `solution.py` is rewritten per submission. On the stock image the runner is
+    written there too; the runner image (`prebuilt`) already contains it, and
+    with `baked_vectors` also the input buffers.
+    """
+
+    def __init__(self, client, image_name, buffers_path, puzzles_path, prebuilt=False, baked_vectors=False):
+        self.workspace = Path(tempfile.mkdtemp(prefix="gta-sandbox-"))
+        if prebuilt:
+            self.command = PREBUILT_RUNNER_COMMAND
+        else:
+            with open(self.workspace / "runner.py", "w") as f:
+                f.write(RUNNER_SCRIPT)
+            # The runner reads packed test vectors with the same module the build scripts use
+            shutil.copy(testvectors.__file__, self.workspace / "testvectors.py")
+            self.command = STOCK_RUNNER_COMMAND
+
+        self.environment = {"WORKSPACE": "/workspace"}
+        volumes = {
+            str(self.workspace): {"bind": "/workspace", "mode": "ro"},
+            puzzles_path: {"bind": "/puzzles", "mode": "ro"}
+        }
+        if baked_vectors:
+            self.environment["BUFFERS_DIR"] = "/opt/vectors"
+        else:
+            volumes[buffers_path] = {"bind": "/buffers/shared", "mode": "ro"}
+
+        self.uses = 0
+        self.container = client.containers.run(
+            image_name,
+            ["sleep", "infinity"],
+            detach=True,
+            labels={WORKER_LABEL: "worker", OWNER_LABEL: str(os.getpid())},
+            volumes=volumes,
+            working_dir="/workspace",
+            mem_limit="64m",
+            network_disabled=True,
+            read_only=True,
+            pids_limit=100
+        )
+
+    def run(self, files, environment, timeout=EXECUTION_TIMEOUT):
+        """
+        Write `files` (name -> text) into the workspace and run the test runner.
+        Returns (exit_code, result_frame, output, timings).
+        """
+        self.uses += 1
+        for name, content in files.items():
+            with open(self.workspace / name, "w") as f:
+                f.write(content)
+
+        # The runner's result channel (fd 3) becomes the exec's stdout and all
+        # other output goes to stderr. Afterwards, kill anything the solution
+        # left behind and empty the writable mounts, so the next submission
+        # (possibly another user's) starts without its processes or files.
+        command = (f"timeout -k 1 {timeout} {self.command} 3>&1 1>&2; "
+                   f"rc=$?; kill -9 -1 2>/dev/null; {WIPE_COMMAND}; exit $rc")
+        # Same calls as Container.exec_run, split up so each step can be timed
+        api = self.container.client.api
+        started = time.perf_counter_ns()
+        exec_id = api.exec_create(self.container.id, ["sh", "-c", command],
+                                  environment=dict(self.environment, **environment),
+                                  workdir="/workspace")['Id']
+        created = time.perf_counter_ns()
+        result, output = api.exec_start(exec_id, demux=True)
+        finished = time.perf_counter_ns()
+        exit_code = api.exec_inspect(exec_id)['ExitCode']
+        inspected = time.perf_counter_ns()
+
+        timings = {
+            "exec_create_ns": created - started,
+            "exec_run_ns": finished - created,  # Start, wait and output fetch
+            "exec_inspect_ns": inspected - finished
+        }
+        output = (output or b"").decode('utf-8', errors='replace').strip()
+        return exit_code, result or b"", output, timings
+
+    def destroy(self):
+        try:
+            self.container.remove(force=True)
+        except Exception as e:
+            logger.warning("Failed to remove sandbox container: %s", e)
+        shutil.rmtree(self.workspace, ignore_errors=True)
+
+
+class ContainerPool:
+    """
+    Pool of warm sandbox workers.
+
+    - size: maximum number of workers alive at once (bounds concurrent runs)
+    - min_idle: idle workers kept pre-started in the background
+    - max_idle: idle workers above this are retired instead of returned
+    - max_uses: a worker is recycled after this many submissions
+    Workers are also recycled after any failed or timed-out run.
+    """
+
+    def __init__(self, spawn, size=4, min_idle=1, max_idle=2, max_uses=50):
+        self.spawn = spawn
+        self.size = size
+        self.min_idle = min(min_idle, size)
+        self.max_idle = max(max_idle, self.min_idle)
+        self.max_uses = max_uses
+
+        self._idle = []
+        self._total = 0  # Live workers, including ones being started
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._replenish()
+
+    def acquire(self, timeout=None):
+        """
+        Take an idle worker, starting a new one if the pool has room.
+        Blocks while all `size` workers are busy.
+        """
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Sandbox pool is shut down")
+                if self._idle:
+                    worker = self._idle.pop()
+                    break
+                if self._total < self.size:
+                    self._total += 1
+                    worker = None
+                    break
+                if not self._cond.wait(timeout):
+                    raise TimeoutError("No sandbox worker available")
+
+        if worker is None:
+            try:
+                worker = self.spawn()
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+
+        self._replenish()
+        return worker
+
+    def release(self, worker, healthy=True):
+        """
+        Return a worker after use. Unhealthy, worn-out or surplus workers are destroyed.
+        """
+        with self._cond:
+            keep = (healthy and not self._closed
+                    and worker.uses < self.max_uses
+                    and len(self._idle) < self.max_idle)
+            if keep:
+                self._idle.append(worker)
+            else:
+                self._total -= 1
+            self._cond.notify()
+
+        if not keep:
+            worker.destroy()
+            self._replenish()
+
+    def _replenish(self):
+        """
+        Start background workers until `min_idle` are warm (within `size`).
+        """
+        with self._cond:
+            if self._closed:
+                return
+            missing = min(self.min_idle - len(self._idle), self.size - self._total)
+            if missing <= 0:
+                return
+            self._total += missing
+
+        for _ in range(missing):
+            threading.Thread(target=self._spawn_idle, daemon=True).start()
+
+    def _spawn_idle(self):
+        try:
+            worker = self.spawn()
+        except Exception as e:
+            logger.error("Error starting sandbox worker: %s", e)
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            return
+
+        with self._cond:
+            if self._closed:
+                self._total -= 1
+            else:
+                self._idle.append(worker)
+                self._cond.notify()
+                return
+        worker.destroy()
+
+    def shutdown(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+        for worker in idle:
+            worker.destroy()
+
+
+class SandboxBackend(abc.ABC):
+    """
+    Base class for sandbox backends.
+
+    Puzzle lookup, batching and result parsing live here; a backend only has to
+    run the test runner somewhere isolated (`_execute`) and hand back its exit
+    code, result frame, output and host-side timings.
+    """
+
+    # Runs the backend can handle at once; sizes the submission worker pool
+    max_concurrency = 1
+
+    @classmethod
+    def configured_concurrency(cls):
+        """
+        `max_concurrency` an instance created with the current settings will have.
+        """
+        return cls.max_concurrency
+
+    def __init__(self):
+        # Store project root at initialization
+        self.project_root = os.path.abspath(os.getcwd())
+        self.buffers_path = os.path.join(self.project_root, "buffers", "shared")
+        self.puzzles_path = os.path.join(self.project_root, "puzzles")
+        # Runs in flight across all app processes on this host
+        self.host_slots = host_semaphore()
+        # Hidden-set scoring: every buffer (0), or a seeded sample of this many
+        self.scoring = {'sample': int(os.getenv('SCORING_SAMPLE', 0)),
+                        'seed': os.getenv('SCORING_SEED', '0')}
+
+    def test_vector_paths(self, puzzle_id):
+        """
+        Host paths of the input buffer pack and the puzzle's expected-output pack.
+        """
+        puzzle_parts = puzzle_id.split('_')
+        level_dir = f"{puzzle_parts[1]}_{puzzle_parts[2]}"
+        return (os.path.join(self.buffers_path, INPUTS_FILE),
+                os.path.join(self.puzzles_path, puzzle_parts[0], level_dir,
+                             expected_outputs_file(puzzle_parts[-1])))
+
+    def scoring_environment(self, puzzle_id):
+        """
+        Runner environment selecting how the hidden set is scored for a puzzle.
+        """
+        return {"SCORING_SAMPLE": str(self.scoring['sample']),
+                "SCORING_SEED": f"{self.scoring['seed']}:{puzzle_id}"}
+
+    def run_submission(self, puzzle_id: str, user_code: str) -> dict:
+        logger.debug("Running submission", extra={'puzzle_id': puzzle_id})
+        return self._run(puzzle_id, {"solution.py": user_code}, {}, EXECUTION_TIMEOUT)
+
+    def run_batch(self, puzzle_id: str, solutions: list) -> list:
+        """
+        Score several solutions in a single sandbox run. Each one runs in its own
+        forked process and module namespace with the usual time budget.
+        Returns one result dict per solution, in order.
+        """
+        logger.debug("Running batch", extra={'puzzle_id': puzzle_id, 'solutions': len(solutions)})
+        result = self._run(puzzle_id,
+                           {"batch.json": json.dumps(solutions)},
+                           {"BATCH": "1", "SOLUTION_TIMEOUT": str(EXECUTION_TIMEOUT)},
+                           EXECUTION_TIMEOUT * len(solutions) + BATCH_OVERHEAD)
+        if 'results' not in result:
+            # The run as a whole failed, so every solution gets its error
+            return [result] * len(solutions)
+
+        # Host-side phases cover the whole batch
+        host_timings = dict(result.get('host_timings', {}), batch_size=len(solutions))
+        for solution_result in result['results']:
+            solution_result['host_timings'] = host_timings
+        return result['results']
+
+    @abc.abstractmethod
+    def _execute(self, files, puzzle_subdir, environment, timeout):
+        """
+        Run the test runner with `files` in its workspace and the puzzle at
+        `puzzle_subdir` (relative to puzzles/). Returns
+        (exit_code, result_frame, output, timings); a timeout is reported
+        as TIMEOUT_EXIT_CODE.
+        """
+
+    def _run(self, puzzle_id, files, environment, timeout):
+        try:
+            # Parse puzzle ID components
+            puzzle_parts = puzzle_id.split('_')
+            source_dir = puzzle_parts[0]  # 'benchmark' or 'examples'
+            level_dir = f"{puzzle_parts[1]}_{puzzle_parts[2]}"  # already includes 'level_'
+            puzzle_num = puzzle_parts[-1]  # Get last part as puzzle number
+
+            puzzle_dir = os.path.join(self.puzzles_path, source_dir, level_dir)
+
+            if not os.path.exists(os.path.join(self.buffers_path, INPUTS_FILE)):
+                return {"error": "Test vectors not found"}
+            if not os.path.exists(puzzle_dir):
+                return {"error": f"Puzzle directory not found: {puzzle_dir}"}
+
+            if not os.path.exists(os.path.join(puzzle_dir, expected_outputs_file(puzzle_num))):
+                return {"error": "Expected outputs not found for this puzzle"}
+
+            start = time.perf_counter_ns()
+            if self.host_slots is not None and not self.host_slots.acquire(HOST_SLOT_TIMEOUT):
+                return {"error": "Sandbox busy, please try again later"}
+            slot_acquired = time.perf_counter_ns()
+            metrics.SANDBOX_IN_FLIGHT.inc()
             try:
-                # Parse puzzle ID components
-                puzzle_parts = puzzle_id.split('_')
-                source_dir = puzzle_parts[0]  # 'benchmark' or 'examples'
-                level_dir = f"{puzzle_parts[1]}_{puzzle_parts[2]}"  # already includes 'level_'
-                puzzle_num = puzzle_parts[-1]  # Get last part as puzzle number
-
-                buffers_path = os.path.join(self.project_root, "buffers", "shared")
-                puzzle_dir = os.path.join(self.project_root, "puzzles", source_dir, level_dir)
-
-                if not os.path.exists(buffers_path):
-                    return {"error": "Buffer path not found"}
-                if not os.path.exists(puzzle_dir):
-                    return {"error": f"Puzzle directory not found: {puzzle_dir}"}
-
-                print(f"DEBUG - Mounting buffers from: {buffers_path}")
-                print(f"DEBUG - Mounting puzzle dir from: {puzzle_dir}")
-                print(f"DEBUG - Looking for outputs with number: {puzzle_num}")
-
-                # Create container with configuration
-                container = self.client.containers.create(
-                    self.image_name,
-                    ["python", "-u", "/workspace/runner.py"],
-                    environment={
-                        "PUZZLE_NUM": puzzle_num
-                    },
-                    volumes={
-                        str(tmp_path): {"bind": "/workspace", "mode": "ro"},
-                        buffers_path: {"bind": "/buffers/shared", "mode": "ro"},
-                        puzzle_dir: {"bind": "/puzzle", "mode": "ro"}
-                    },
-                    mem_limit="64m",
-                    network_disabled=True,
-                    read_only=True,
-                    pids_limit=100
-                )
+                exit_code, result_frame, output, timings = self._execute(
+                    files, f"{source_dir}/{level_dir}",
+                    dict(environment, PUZZLE_NUM=puzzle_num, **self.scoring_environment(puzzle_id)),
+                    timeout)
+            finally:
+                metrics.SANDBOX_IN_FLIGHT.dec()
+                if self.host_slots is not None:
+                    self.host_slots.release()
+
+            # Output is user-controlled and can be large: failed runs plus a sample of the rest
+            if logger.isEnabledFor(logging.DEBUG) and (exit_code != 0 or logs.sample_sandbox_output()):
+                logger.debug("Sandbox output", extra={'puzzle_id': puzzle_id, 'exit_code': exit_code,
+                                                      'output': logs.truncate(output)})
+
+            parse_start = time.perf_counter_ns()
+            result_dict = self._parse_result(exit_code, result_frame, timeout)
+            finished = time.perf_counter_ns()
+
+            timings["slot_wait_ns"] = slot_acquired - start
+            timings["parse_ns"] = finished - parse_start
+            timings["total_ns"] = finished - start
+            result_dict["host_timings"] = timings
+            metrics.observe_timings(type(self).__name__, timings, result_dict.get("timings"))
+            return result_dict
+
+        except Exception as e:
+            logger.exception("Sandbox error", extra={'puzzle_id': puzzle_id})
+            return {"error": str(e)}
+
+    def _parse_result(self, exit_code, result_frame, timeout):
+        # Process exit code
+        if exit_code == TIMEOUT_EXIT_CODE:
+            return {
+                "error": f"Execution timeout - solution took longer than {timeout} seconds"
+            }
+        if exit_code != 0:
+            return {"error": exit_status_error(exit_code)}
+
+        # Exactly one frame from the result channel
+        if not result_frame:
+            return {"error": exit_status_error(exit_code)}
+        if len(result_frame) < RESULT_FRAME.size:
+            return {"error": "No valid result found in output"}
+        magic, length = RESULT_FRAME.unpack_from(result_frame)
+        if magic != RESULT_MAGIC or length > MAX_RESULT_SIZE \
+                or len(result_frame) != RESULT_FRAME.size + length:
+            return {"error": "No valid result found in output"}
+        try:
+            result_dict = json.loads(result_frame[RESULT_FRAME.size:])
+        except ValueError:
+            return {"error": "No valid result found in output"}
+        if not isinstance(result_dict, dict):
+            return {"error": "No valid result found in output"}
+
+        return result_dict
+
+
+class DockerSandbox(SandboxBackend):
+    """
+    Runs submissions in a pool of warm containers.
+
+    By default the containers use the runner image (see build_runner_image),
+    which is built locally on first use and falls back to the stock image if
+    the build fails. The stock image is only pulled when it is not present
+    locally.
+    """
 
+    @staticmethod
+    def configured_concurrency():
+        return int(os.getenv('SANDBOX_POOL_SIZE', 4))
+
+    def __init__(self, pool_size=None, min_idle=None, max_idle=None, max_uses=None,
+                 prebuilt=None, bake_vectors=None):
+        import docker  # Only needed by this backend
+
+        super().__init__()
+        self.client = docker.from_env()
+        if prebuilt is None:
+            prebuilt = os.getenv('SANDBOX_PREBUILT_IMAGE', '1') != '0'
+        if bake_vectors is None:
+            bake_vectors = os.getenv('SANDBOX_BAKE_VECTORS', '0') == '1'
+
+        logger.info("Initializing Docker sandbox")
+        self.image_name = BASE_IMAGE
+        self.prebuilt = self.baked_vectors = False
+        if prebuilt:
+            try:
+                self.image_name = build_runner_image(
+                    self.client, bake_vectors_from=self.buffers_path if bake_vectors else None)
+                self.prebuilt, self.baked_vectors = True, bake_vectors
+                logger.info("Using sandbox image", extra={'image': self.image_name})
+            except Exception as e:
+                logger.error("Error building sandbox image, falling back to %s: %s", BASE_IMAGE, e)
+
+        if not self.prebuilt:
+            ensure_image(self.client, self.image_name)
+
+        self.remove_stale_workers()
+        self.pool = ContainerPool(
+            self._spawn_worker,
+            size=pool_size or self.configured_concurrency(),
+            min_idle=min_idle if min_idle is not None else int(os.getenv('SANDBOX_POOL_MIN_IDLE', 1)),
+            max_idle=max_idle if max_idle is not None else int(os.getenv('SANDBOX_POOL_MAX_IDLE', 2)),
+            max_uses=max_uses or int(os.getenv('SANDBOX_WORKER_MAX_USES', 50))
+        )
+        self.max_concurrency = self.pool.size
+        atexit.register(self.pool.shutdown)
+
+    def _spawn_worker(self):
+        return SandboxWorker(self.client, self.image_name, self.buffers_path, self.puzzles_path,
+                             prebuilt=self.prebuilt, baked_vectors=self.baked_vectors)
+
+    def remove_stale_workers(self):
+        """
+        Remove workers left behind by a previous process that did not shut down cleanly.
+        """
+        remove_stale_workers(self.client)
+
+    def _execute(self, files, puzzle_subdir, environment, timeout):
+        start = time.perf_counter_ns()
+        worker = self.pool.acquire()
+        acquired = time.perf_counter_ns()
+        healthy = False
+        try:
+            exit_code, result_frame, output, timings = worker.run(
+                files, dict(environment, PUZZLE_DIR=f"/puzzles/{puzzle_subdir}"), timeout)
+            healthy = exit_code == 0
+        finally:
+            # Any failure recycles the worker
+            release_start = time.perf_counter_ns()
+            self.pool.release(worker, healthy=healthy)
+            released = time.perf_counter_ns()
+
+        # Pool wait, plus container create/start if no warm worker was idle
+        timings["acquire_ns"] = acquired - start
+        timings["release_ns"] = released - release_start
+        return exit_code, result_frame, output, timings
+
+
+class LazySandbox(SandboxBackend):
+    """
+    Stands in for a sandbox backend and creates it on first use, so importing
+    the app (e.g. a gunicorn worker booting) never waits on Docker. `warm()`
+    starts creating it in the background instead.
+
+    Test vector paths and `max_concurrency` come from the configuration and
+    are available before the backend exists.
+    """
+
+    def __init__(self, backend):
+        super().__init__()
+        self.backend = backend
+        self.max_concurrency = _backend_class(backend).configured_concurrency()
+        self.init_seconds = None
+        self.init_error = None
+        self._sandbox = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """
+        The real backend, created now if it does not exist yet.
+        """
+        sandbox = self._sandbox
+        if sandbox is not None:
+            return sandbox
+        with self._lock:
+            if self._sandbox is None:
+                start = time.perf_counter()
                 try:
-                    # Start container and wait for result
-                    container.start()
-                    result = container.wait(timeout=3)
-
-                    # Get container output
-                    output = container.logs().decode('utf-8').strip()
-                    print("\nDEBUG - Container Output lines:")
-                    print("-" * 50)
-                    lines = output.split('\n')
-                    for i, line in enumerate(lines):
-                        print(f"Line {i}: {repr(line)}")
-                    print("-" * 50)
-
-                    # Process exit code
-                    if result['StatusCode'] != 0:
-                        return {"error": "Solution failed with non-zero exit code"}
-
-                    # Look for the last JSON line as our result
-                    for line in reversed(lines):
-                        line = line.strip()
-                        try:
-                            result_dict = json.loads(line)
-                            print("DEBUG - Successfully parsed JSON:", result_dict)
-                            return result_dict
-                        except json.JSONDecodeError:
-                            continue
-
-                    return {"error": "No valid result found in output"}
-
-                except requests.exceptions.ReadTimeout:
-                    return {
-                        "error": "Execution timeout - solution took longer than 3 seconds"
-                    }
-                finally:
-                    # Always clean up container
-                    try:
-                        container.remove(force=True)
-                    except Exception as e:
-                        print(f"Warning: Failed to remove container: {e}")
+                    self._sandbox = _backend_class(self.backend)()
+                except Exception as e:
+                    self.init_error = str(e)
+                    raise
+                self.init_seconds = time.perf_counter() - start
+                self.init_error = None
+                logger.info("Sandbox backend ready", extra={'backend': self.backend,
+                                                            'seconds': round(self.init_seconds, 3)})
+            return self._sandbox
 
+    def warm(self):
+        """
+        Create the backend in a background thread.
+        """
+        def create():
+            try:
+                self.get()
             except Exception as e:
-                print(f"Container error: {e}")
-                return {"error": str(e)}
\ No newline at end of file
+                logger.error("Error initializing sandbox backend: %s", e)
+
+        threading.Thread(target=create, name="sandbox-init", daemon=True).start()
+
+    def stats(self):
+        return {
+            'backend': self.backend,
+            'initialized': self._sandbox is not None,
+            'init_seconds': self.init_seconds,
+            'init_error': self.init_error
+        }
+
+    def run_submission(self, puzzle_id: str, user_code: str) -> dict:
+        try:
+            sandbox = self.get()
+        except Exception as e:
+            return {"error": f"Sandbox unavailable: {e}"}
+        return sandbox.run_submission(puzzle_id, user_code)
+
+    def run_batch(self, puzzle_id: str, solutions: list) -> list:
+        try:
+            sandbox = self.get()
+        except Exception as e:
+            return [{"error": f"Sandbox unavailable: {e}"}] * len(solutions)
+        return sandbox.run_batch(puzzle_id, solutions)
+
+    def _execute(self, files, puzzle_subdir, environment, timeout):
+        return self.get()._execute(files, puzzle_subdir, environment, timeout)
+
+
+def _backend_class(backend):
+    if backend == 'docker':
+        return DockerSandbox
+    if backend == 'process':
+        from process_sandbox import ProcessSandbox
+        return ProcessSandbox
+    raise ValueError(f"Unknown sandbox backend: {backend}")
+
+
+def create_sandbox(backend=None, lazy=None):
+    """
+    Create the sandbox backend named by `backend` or SANDBOX_BACKEND:
+    'docker' (default) or 'process' (local subprocess, see process_sandbox.py).
+    Unless `lazy` (SANDBOX_LAZY_INIT) is off, returns a LazySandbox that
+    creates it on first use.
+    """
+    backend = backend or os.getenv('SANDBOX_BACKEND', 'docker')
+    if lazy is None:
+        lazy = os.getenv('SANDBOX_LAZY_INIT', '1') != '0'
+    if lazy:
+        return LazySandbox(backend)
+    return _backend_class(backend)()
+
+
+def prepare_sandbox(backend=None):
+    """
+    One-time host setup for the backend, meant to run once before app workers
+    start (see gunicorn.conf.py). For Docker this builds the runner image (or
+    makes sure the stock image is present) and removes workers left over from
+    earlier runs, so the app workers find everything in place and create their
+    backends in milliseconds.
+    """
+    backend = backend or os.getenv('SANDBOX_BACKEND', 'docker')
+    if backend == 'docker':
+        DockerSandbox(min_idle=0).pool.shutdown()
@@ -0,0 +1,190 @@
+# sandbox_confine.py
+"""
+Confinement helper for the process sandbox (process_sandbox.py).
+
+Run as `python -I -S sandbox_confine.py <spec> <command...>`: it locks itself
+down as described by the JSON `spec` and then execs `command` (the test
+runner). This happens in a fresh single-threaded interpreter rather than in a
+preexec_fn, which is unsafe in the multi-threaded app process. Only the
+standard library is used, since the helper runs isolated from the app's
+sys.path.
+
+With namespaces, the helper unshares mount, PID, network, IPC and UTS
+namespaces (plus a user namespace unless it runs as root), forks so the
+command becomes pid 1 of the new PID namespace, builds a read-only tmpfs root
+from the spec's bind mounts and symlinks, pivots into it and detaches the host
+root, sets the rlimits and no_new_privs and switches to the sandbox uid/gid.
+The first process stays outside, waits for the command and exits the same way.
+Without namespaces it only sets the rlimits.
+"""
+
+import ctypes
+import json
+import os
+import platform
+import resource
+import sys
+
+# unshare(2) / mount(2) / umount2(2) / prctl(2) flags
+CLONE_NEWNS = 0x00020000
+CLONE_NEWUTS = 0x04000000
+CLONE_NEWIPC = 0x08000000
+CLONE_NEWUSER = 0x10000000
+CLONE_NEWPID = 0x20000000
+CLONE_NEWNET = 0x40000000
+MS_RDONLY = 1
+MS_NOSUID = 2
+MS_NODEV = 4
+MS_REMOUNT = 32
+MS_BIND = 4096
+MS_REC = 16384
+MS_PRIVATE = 1 << 18
+MS_RELATIME = 1 << 21
+MNT_DETACH = 2
+PR_SET_NO_NEW_PRIVS = 38
+
+# pivot_root(2) has no libc wrapper
+SYS_PIVOT_ROOT = {'x86_64': 155, 'aarch64': 41, 'riscv64': 41, 's390x': 217, 'ppc64le': 203}
+
+# Per-mount flags that are locked in a user namespace and must be kept on remount
+# (statvfs flag -> mount flag)
+LOCKED_MOUNT_FLAGS = {
+    os.ST_NOSUID: os.ST_NOSUID,
+    os.ST_NODEV: os.ST_NODEV,
+    os.ST_NOEXEC: os.ST_NOEXEC,
+    os.ST_NOATIME: os.ST_NOATIME,
+    os.ST_NODIRATIME: os.ST_NODIRATIME,
+    os.ST_RELATIME: MS_RELATIME,
+}
+
+# Exit status when the helper itself fails, before the command runs
+# (as for env(1) and timeout(1))
+SETUP_FAILED_EXIT_CODE = 125
+
+libc = ctypes.CDLL(None, use_errno=True)
+
+
+def check(result, what):
+    if result != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"{what} failed: {os.strerror(errno)}")
+
+
+def write_file(path, data):
+    fd = os.open(path, os.O_WRONLY)
+    try:
+        os.write(fd, data)
+    finally:
+        os.close(fd)
+
+
+def locked_flags(path):
+    """
+    Flags of the mount holding `path` that a read-only bind of it must keep
+    (they are locked when the bind is made inside a user namespace).
+    """
+    st_flags = os.statvfs(path).f_flag
+    flags = 0
+    for st_flag, ms_flag in LOCKED_MOUNT_FLAGS.items():
+        if st_flags & st_flag:
+            flags |= ms_flag
+    return flags
+
+
+def wait_and_exit(pid):
+    """
+    Outside the PID namespace: wait for its init (the command) and end the same way.
+    Closing every descriptor first leaves the output pipes to the command alone.
+    """
+    os.closerange(0, os.sysconf('SC_OPEN_MAX'))
+    _, status = os.waitpid(pid, 0)
+    code = os.waitstatus_to_exitcode(status)
+    if code < 0:
+        os.kill(os.getpid(), -code)
+    os._exit(code if code >= 0 else 128 - code)
+
+
+def build_root(root, mounts, links):
+    """
+    Mount a tmpfs at `root` holding read-only binds of `mounts` ((host path,
+    path inside) pairs) and the symlinks in `links`, then make it the root.
+    """
+    # Stat the sources while the host root is still there
+    mounts = [(source, root + target, os.path.isdir(source), locked_flags(source))
+              for source, target in mounts]
+
+    check(libc.mount(b"none", b"/", None, MS_REC | MS_PRIVATE, None), "making mounts private")
+    check(libc.mount(b"tmpfs", root.encode(), b"tmpfs", MS_NOSUID | MS_NODEV, b"size=1m,mode=0755"),
+          "mounting the sandbox root")
+    for source, target, is_dir, locked in mounts:
+        if is_dir:
+            os.makedirs(target, exist_ok=True)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.close(os.open(target, os.O_WRONLY | os.O_CREAT, 0o644))
+        check(libc.mount(source.encode(), target.encode(), None, MS_BIND | MS_REC, None),
+              f"bind mount of {source}")
+        check(libc.mount(None, target.encode(), None, MS_REMOUNT | MS_BIND | MS_RDONLY | MS_NOSUID | locked, None),
+              f"read-only remount of {source}")
+    for target, text in links:
+        os.symlink(text, root + target)
+
+    # Swap roots and drop the host's
+    os.chdir(root)
+    check(libc.syscall(SYS_PIVOT_ROOT[platform.machine()], b".", b"."), "pivot_root")
+    check(libc.umount2(b".", MNT_DETACH), "detaching the host root")
+    os.chdir("/")
+    check(libc.mount(None, b"/", None, MS_REMOUNT | MS_RDONLY | MS_NOSUID | MS_NODEV, None),
+          "read-only root")
+
+
+def confine(spec):
+    """
+    Lock this process down as `spec` says. With namespaces, returns in the
+    forked pid 1 of the new PID namespace; the original process never returns.
+    """
+    if spec['namespaces']:
+        as_root = os.geteuid() == 0
+        flags = CLONE_NEWNS | CLONE_NEWPID | CLONE_NEWNET | CLONE_NEWIPC | CLONE_NEWUTS
+        if not as_root:
+            flags |= CLONE_NEWUSER
+        uid_map = f"{spec['uid']} {os.geteuid()} 1".encode()
+        gid_map = f"{spec['gid']} {os.getegid()} 1".encode()
+
+        check(libc.unshare(flags), "unshare")
+        if not as_root:
+            # The sandbox uid is mapped onto ours
+            write_file('/proc/self/setgroups', b"deny")
+            write_file('/proc/self/uid_map', uid_map)
+            write_file('/proc/self/gid_map', gid_map)
+
+        pid = os.fork()
+        if pid != 0:
+            wait_and_exit(pid)
+
+        build_root(spec['root'], spec['mounts'], spec['links'])
+        os.chdir(spec['workdir'])
+
+    for name, value in spec['limits'].items():
+        resource.setrlimit(getattr(resource, name), (value, value))
+
+    if spec['namespaces']:
+        check(libc.prctl(PR_SET_NO_NEW_PRIVS, 1, 0, 0, 0), "prctl")
+        if as_root:
+            os.setgroups([])
+            os.setgid(spec['gid'])
+            os.setuid(spec['uid'])
+
+
+def main(argv):
+    spec, command = json.loads(argv[0]), argv[1:]
+    try:
+        confine(spec)
+        os.execv(command[0], command)
+    except Exception as e:
+        print(f"sandbox_confine: {e}", file=sys.stderr, flush=True)
+        os._exit(SETUP_FAILED_EXIT_CODE)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,55 +1,106 @@
 # scripts/apply_transforms.py
 
 import os
+import sys
+import json
+import time
+import hashlib
+import argparse
 import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
 from pathlib import Path
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import batch_eval
+import testvectors
+from testvectors import (TestVectorPack, write_pack, INPUTS_FILE, BUFFER_SET_FILE, RECORD_SIZE,
+                         expected_outputs_file)
+from batch_eval import ReferenceTransform, HAS_NUMPY
 
-def load_transform(module_path):
+
+def load_transform_module(module_path):
     """
-    Dynamically load the hidden_transform function from a given module path.
+    Dynamically load a transform module from a given module path.
     """
     spec = importlib.util.spec_from_file_location("transform_module", module_path)
     transform_module = importlib.util.module_from_spec(spec)
     spec.loader.exec_module(transform_module)
-    return transform_module.hidden_transform
+    return transform_module
 
 
-def load_all_buffers(shared_directory='../buffers/shared'):
+def load_transform(module_path):
     """
-    Load both visible and hidden input buffers.
-    Returns (visible_buffers, hidden_buffers)
-    """
-    visible_buffers = []
-    hidden_buffers = []
-
-    # Load visible buffers
-    seen_bytes = set()
-    for i in range(1, 25):
-        filepath = os.path.join(shared_directory, f'visible_{i:02d}.bin')
-        with open(filepath, 'rb') as f:
-            buf = f.read()
-            visible_buffers.append(buf)
-            seen_bytes.update(buf)
-
-    missing_bytes = set(range(256)) - seen_bytes
-
-    # Load hidden buffers and check which ones contain missing bytes
-    hidden_with_missing = 0
-    for i in range(1, 25):  # Changed to 24 buffers
-        filepath = os.path.join(shared_directory, f'hidden_{i:02d}.bin')
-        with open(filepath, 'rb') as f:
-            buf = f.read()
-            hidden_buffers.append(buf)
-            # Check if this buffer has any of the missing bytes
-            if any(byte in missing_bytes for byte in buf):
-                hidden_with_missing += 1
-            else:
-                print(f"\nHidden buffer #{i} contains no missing bytes!")
+    Dynamically load the hidden_transform function from a given module path.
+    """
+    return load_transform_module(module_path).hidden_transform
+
+
+def load_reference_transform(module_path, reference_buffers):
+    """
+    (reference, outputs): the ReferenceTransform for a module, with its batch
+    version (if any) verified bit for bit against hidden_transform on
+    `reference_buffers`, and its outputs for `reference_buffers`.
+    """
+    reference = ReferenceTransform.from_module(load_transform_module(module_path))
+    outputs = reference.verify(reference_buffers)
+    if outputs is None:
+        outputs = reference.apply(reference_buffers)
+    return reference, outputs
+
 
-    print(f"\nNumber of hidden buffers containing missing bytes: {hidden_with_missing} out of 24")
+def read_buffers(shared_directory='../buffers/shared'):
+    """
+    (visible_buffers, hidden_buffers, digest) from the packed test vectors.
+    """
+    with TestVectorPack(os.path.join(shared_directory, INPUTS_FILE)) as pack:
+        return ([bytes(buf) for buf in pack.records('visible')],
+                [bytes(buf) for buf in pack.records('hidden')],
+                pack.digest)
 
-    return visible_buffers, hidden_buffers
+
+def read_buffer_set(shared_directory='../buffers/shared'):
+    """
+    The buffer set description written by buffers/generate_buffers.py
+    (version and sizes), or {} for buffers generated before it was recorded.
+    """
+    try:
+        with open(os.path.join(shared_directory, BUFFER_SET_FILE)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def load_all_buffers(shared_directory='../buffers/shared'):
+    """
+    Load both visible and hidden input buffers from the packed test vectors.
+    Returns (visible_buffers, hidden_buffers, digest)
+    """
+    visible_buffers, hidden_buffers, digest = read_buffers(shared_directory)
+
+    # Check which hidden buffers contain bytes missing from the visible ones
+    if HAS_NUMPY:
+        from buffer_coverage import CoverageIndex, format_report
+        visible_coverage = CoverageIndex(visible_buffers).covered()
+        hidden_index = CoverageIndex(hidden_buffers)
+        without_missing = (hidden_index.new_features(visible_coverage, 'values') == 0).nonzero()[0] + 1
+        report = hidden_index.report(covered=visible_coverage)
+    else:
+        missing_bytes = set(range(256)) - set(b"".join(visible_buffers))
+        without_missing = [i for i, buf in enumerate(hidden_buffers, 1) if missing_bytes.isdisjoint(buf)]
+        report = None
+
+    if len(without_missing):
+        shown = ', '.join(f"#{i}" for i in without_missing[:10])
+        more = f" and {len(without_missing) - 10} more" if len(without_missing) > 10 else ""
+        print(f"\nHidden buffers containing no missing bytes: {shown}{more}")
+    print(f"\nNumber of hidden buffers containing missing bytes: "
+          f"{len(hidden_buffers) - len(without_missing)} out of {len(hidden_buffers)}")
+    if report is not None:
+        print("Hidden set coverage (new = not in the visible set):")
+        print(format_report(report))
+
+    return visible_buffers, hidden_buffers, digest
 
 def load_prompt_header(shared_directory='../buffers/shared'):
     """
@@ -59,23 +110,24 @@ def load_prompt_header(shared_directory='../buffers/shared'):
         return f.read()
 
 
-def generate_complete_prompt(visible_outputs):
+def generate_complete_prompt(visible_outputs, hidden_count, prompt_header=None):
     """
     Generate complete puzzle prompt with outputs.
     """
-    prompt_header = load_prompt_header()
+    if prompt_header is None:
+        prompt_header = load_prompt_header()
     prompt = prompt_header + "\nAnd here are the corresponding transformed outputs (DST) in hex:\n"
 
     for i, output in enumerate(visible_outputs, 1):
         hex_str = output.hex()
         prompt += f"OUTPUT #{i:02d}: {hex_str}\n"
 
-    prompt += """
+    prompt += f"""
 Instructions:
 - Return just your best possible approximation as a small python function that takes a 64 byte array as input, and returns the 64 byte array as output. 
-- Remember, the transformation is the same for all 24 buffers.
-- The function will be scored by the number of buffers that are correctly transformed (as shown in the 24 outputs).
-- And it also will be tested on another set of 24 hidden input buffers not shown in the prompt. 
+- Remember, the transformation is the same for all {len(visible_outputs)} buffers.
+- The function will be scored by the number of buffers that are correctly transformed (as shown in the {len(visible_outputs)} outputs).
+- And it also will be tested on another set of {hidden_count} hidden input buffers not shown in the prompt. 
 - Do not include anything else in your response, no introduction text or explanations.
 
 Example Output:
@@ -86,68 +138,223 @@ def transform(data: bytes) -> bytes:
     return prompt
 
 
-def apply_and_save_transforms(root_dir='../puzzles'):
+def find_transforms(root_dir):
     """
-    Recursively discover all transform modules, apply them to all buffers,
-    save outputs and generate prompts.
+    Paths of all transform_<n>.py files under root_dir, relative to it, sorted.
     """
-    visible_buffers, hidden_buffers = load_all_buffers()
-
-    # Walk through all subdirectories
+    transforms = []
     for root, dirs, files in os.walk(root_dir):
-        # Look for transform_*.py files
         for file in files:
             if file.startswith('transform_') and file.endswith('.py'):
-                transform_file = os.path.join(root, file)
+                transforms.append(os.path.relpath(os.path.join(root, file), root_dir))
+    return sorted(transforms)
 
-                # Generate output filenames based on transform file number
-                output_num = file.split('_')[1].split('.')[0]  # Extract number from transform_N.py
 
-                # Get the directory containing this transform
-                transform_dir = os.path.dirname(transform_file)
+def output_paths(transform_file):
+    """
+    (expected outputs pack, prompt) paths next to a transform_<n>.py file.
+    """
+    output_num = os.path.basename(transform_file).split('_')[1].split('.')[0]  # transform_N.py
+    transform_dir = os.path.dirname(transform_file)
+    return (os.path.join(transform_dir, expected_outputs_file(output_num)),
+            os.path.join(transform_dir, f'prompt_{output_num}.txt'))
 
-                # Generate output paths in the same directory
-                visible_output_file = os.path.join(transform_dir, f'visible_outputs_{output_num}.bin')
-                hidden_output_file = os.path.join(transform_dir, f'hidden_outputs_{output_num}.bin')
-                prompt_file = os.path.join(transform_dir, f'prompt_{output_num}.txt')
 
-                try:
-                    # Load the hidden_transform function
-                    transform = load_transform(transform_file)
+def write_text_atomic(path, text):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
 
-                    # Apply transform to all buffers
-                    visible_outputs = [transform(buf) for buf in visible_buffers]
-                    hidden_outputs = [transform(buf) for buf in hidden_buffers]
 
-                    # Save visible outputs
-                    with open(visible_output_file, 'wb') as f_out:
-                        for output in visible_outputs:
-                            f_out.write(output)
+def file_sha256(path):
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
 
-                    # Save hidden outputs
-                    with open(hidden_output_file, 'wb') as f_out:
-                        for output in hidden_outputs:
-                            f_out.write(output)
 
-                    # Generate and save complete prompt
-                    prompt = generate_complete_prompt(visible_outputs)
-                    with open(prompt_file, 'w') as f_out:
-                        f_out.write(prompt)
+# Inputs shared by every puzzle build, loaded once per worker process
+_worker_inputs = None
 
-                    print(f"Applied transform for {transform_file}:")
-                    print(f" - Saved visible outputs to {visible_output_file}")
-                    print(f" - Saved hidden outputs to {hidden_output_file}")
-                    print(f" - Generated prompt at {prompt_file}")
 
-                except Exception as e:
-                    print(f"Error applying transform for {transform_file}: {e}")
+def _init_worker(shared_directory):
+    global _worker_inputs
+    visible_buffers, hidden_buffers, digest = read_buffers(shared_directory)
+    _worker_inputs = (visible_buffers, hidden_buffers, digest, load_prompt_header(shared_directory))
+
+
+def build_puzzle(transform_file):
+    """
+    Apply one transform to all buffers and write its expected outputs and
+    prompt. Runs in a worker process. Returns (transform_file, seconds, mode, error),
+    `mode` telling whether the batch version of the transform was used.
+    """
+    visible_buffers, hidden_buffers, digest, prompt_header = _worker_inputs
+    expected_file, prompt_file = output_paths(transform_file)
+    start = time.perf_counter()
+    mode = None
+    try:
+        # Load the transform and apply it to all buffers, checking its batch
+        # version against the scalar one on the way
+        transform, outputs = load_reference_transform(transform_file, visible_buffers + hidden_buffers)
+        mode = transform.mode
+        visible_outputs = outputs[:len(visible_buffers)]
+        hidden_outputs = outputs[len(visible_buffers):]
+
+        # Save expected outputs, stamped with the input buffer set digest
+        write_pack(expected_file,
+                   {'visible': visible_outputs, 'hidden': hidden_outputs},
+                   digest=digest)
+
+        # Generate and save complete prompt
+        prompt = generate_complete_prompt(visible_outputs, len(hidden_buffers), prompt_header)
+        write_text_atomic(prompt_file, prompt)
+    except Exception as e:
+        return transform_file, time.perf_counter() - start, mode, str(e)
+    return transform_file, time.perf_counter() - start, mode, None
+
+
+def build_key(transform_file, inputs_key):
+    """
+    Content hash deciding whether a puzzle's outputs are up to date: the
+    transform source plus everything shared by all puzzles (`inputs_key`).
+    """
+    return hashlib.sha256(f"{file_sha256(transform_file)}:{inputs_key}".encode()).hexdigest()
+
+
+def apply_and_save_transforms(root_dir='../puzzles', shared_directory='../buffers/shared',
+                              jobs=None, force=False):
+    """
+    Discover all transform modules and (re)build the outputs and prompts of
+    those that changed, across a pool of `jobs` worker processes.
+
+    A puzzle is rebuilt when its transform source, the input buffer set, the
+    prompt header, this script, batch_eval.py or testvectors.py changed since
+    the build recorded in <root_dir>/manifest.json, or when its output files
+    are missing (`force` rebuilds everything). The manifest is rewritten when anything
+    changed; the running app reloads its puzzle list when it does.
+    """
+    start = time.perf_counter()
+    visible_buffers, hidden_buffers, digest = load_all_buffers(shared_directory)
+    # Besides this script, the outputs depend on how transforms are applied
+    # (batch_eval.py) and on the pack format they are written in (testvectors.py)
+    inputs_key = ':'.join((digest.hex(),
+                           file_sha256(os.path.join(shared_directory, 'prompt_header.txt')),
+                           file_sha256(os.path.abspath(__file__)),
+                           file_sha256(batch_eval.__file__),
+                           file_sha256(testvectors.__file__)))
+
+    previous = read_manifest(root_dir).get('builds', {})
+    builds = {}
+    pending = []
+    for transform in find_transforms(root_dir):
+        transform_file = os.path.join(root_dir, transform)
+        key = build_key(transform_file, inputs_key)
+        entry = previous.get(transform)
+        up_to_date = (not force and entry is not None and entry.get('key') == key
+                      and all(os.path.exists(path) for path in output_paths(transform_file)))
+        if up_to_date:
+            builds[transform] = entry
+        else:
+            pending.append((transform, key))
+
+    failed = []
+    if pending:
+        jobs = min(jobs or os.cpu_count() or 1, len(pending))
+        paths = [os.path.join(root_dir, transform) for transform, _ in pending]
+        if jobs == 1:
+            _init_worker(shared_directory)
+            results = map(build_puzzle, paths)
+        else:
+            pool = ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(shared_directory,))
+            results = pool.map(build_puzzle, paths, chunksize=max(1, len(paths) // (jobs * 4)))
+        for (transform, key), (transform_file, seconds, mode, error) in zip(pending, results):
+            if error is not None:
+                failed.append(transform)
+                print(f"Error applying transform for {transform_file}: {error}")
+                continue
+            builds[transform] = {'key': key, 'seconds': round(seconds, 4)}
+            print(f"Built {transform} in {seconds * 1000:.1f}ms [{mode}]")
+        if jobs > 1:
+            pool.shutdown()
+
+    built = len(pending) - len(failed)
+    if built or set(builds) != set(previous):
+        write_manifest(root_dir, sorted(builds), digest, builds,
+                       buffer_set=read_buffer_set(shared_directory).get('version'))
+    print(f"\n{built} built, {len(builds) - built} up to date, {len(failed)} failed "
+          f"in {time.perf_counter() - start:.2f}s")
+    return failed
+
+
+def read_manifest(root_dir):
+    try:
+        with open(os.path.join(root_dir, 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(root_dir, transforms, digest, builds=None, buffer_set=None):
+    """
+    Record what was generated in <root_dir>/manifest.json (written atomically):
+    the buffer set, the transforms, and per transform the build key and build time.
+    A running app reloads its puzzle list when this file changes.
+    """
+    manifest = {
+        'generated': datetime.utcnow().isoformat(),
+        'buffer_set': buffer_set,
+        'buffer_set_digest': digest.hex(),
+        'transforms': transforms,
+        'builds': builds or {}
+    }
+    manifest_file = os.path.join(root_dir, 'manifest.json')
+    tmp_file = f"{manifest_file}.tmp"
+    with open(tmp_file, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_file, manifest_file)
+    print(f"Wrote manifest for {len(transforms)} transforms to {manifest_file}")
+
+
+def validate_transforms(count, root_dir='../puzzles', shared_directory='../buffers/shared', seed=0):
+    """
+    Run every transform over `count` random buffers and report which
+    implementation was used and its throughput. Catches transforms that fail
+    or return malformed output on inputs beyond the test set.
+    """
+    visible_buffers, hidden_buffers, _ = read_buffers(shared_directory)
+    if HAS_NUMPY:
+        import numpy as np
+        buffers = np.random.default_rng(seed).integers(0, 256, (count, RECORD_SIZE), dtype=np.uint8)
+    else:
+        import random
+        rng = random.Random(seed)
+        buffers = [bytes(rng.getrandbits(8) for _ in range(RECORD_SIZE)) for _ in range(count)]
+
+    failed = []
+    for transform in find_transforms(root_dir):
+        start = time.perf_counter()
+        try:
+            reference = ReferenceTransform.from_module(load_transform_module(os.path.join(root_dir, transform)))
+            reference.verify(visible_buffers + hidden_buffers)
+            if HAS_NUMPY:
+                reference.apply_matrix(buffers)
+            else:
+                reference.apply(buffers)
+        except Exception as e:
+            failed.append(transform)
+            print(f"Error validating {transform}: {e}")
+            continue
+        seconds = time.perf_counter() - start
+        print(f"{transform}: {count} buffers in {seconds * 1000:.1f}ms "
+              f"({count / seconds:,.0f}/s) [{reference.mode}]")
+    return failed
 
 
 def output_transformed_buffers(root_dir='../puzzles'):
     """
     Generate a single document with all transforms outputs.
     """
-    visible_buffers, hidden_buffers = load_all_buffers()
+    visible_buffers, hidden_buffers, _ = load_all_buffers()
     all_outputs = []
 
     # Walk through all subdirectories in sorted order
@@ -190,5 +397,15 @@ def output_transformed_buffers(root_dir='../puzzles'):
     print("Generated combined output file: all_transforms_output.txt")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build expected outputs and prompts for changed puzzles")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Rebuild every puzzle")
+    parser.add_argument("--validate", type=int, metavar="N",
+                        help="Instead of building, run every transform over N random buffers")
+    args = parser.parse_args()
     #output_transformed_buffers()
-    apply_and_save_transforms()
+    if args.validate:
+        failed = validate_transforms(args.validate)
+    else:
+        failed = apply_and_save_transforms(jobs=args.jobs, force=args.force)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,154 @@
+# scripts/benchmark_startup.py
+"""
+Compare per-run startup cost of the sandbox variants:
+
+    stock     python:3.9-slim, runner written to the workspace and compiled per run
+    prebuilt  runner image with precompiled runner, started with -I -S
+    baked     prebuilt, with the input buffers baked into the image
+
+Each variant scores the same trivial submission RUNS times on one warm
+container and reports the median / p95 of the exec time seen by the host and
+of the runner's own time to import the solution and load the test vectors.
+`--local` only measures interpreter startup with and without the flags, for
+hosts without Docker. `--app` measures an app worker boot (importing app.py
+in a fresh interpreter) with the sandbox created lazily and eagerly.
+
+Safe to run next to a live app: on startup a sandbox only removes workers
+whose owning process is gone, so the app's containers are left alone and
+this script's own are shut down when it finishes. Its runs do compete with
+the app for CPU and sandbox slots, so expect noisier numbers on a busy host.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+PROJECT_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, PROJECT_ROOT)
+
+PUZZLE_ID = "examples_level_1_puzzle_1"
+SUBMISSION = "def transform(data: bytes) -> bytes:\n    return data\n"
+
+VARIANTS = {
+    "stock": {"prebuilt": False, "bake_vectors": False},
+    "prebuilt": {"prebuilt": True, "bake_vectors": False},
+    "baked": {"prebuilt": True, "bake_vectors": True},
+}
+
+
+def summarize(samples_ns):
+    """
+    (median, p95) in milliseconds.
+    """
+    samples = sorted(samples_ns)
+    p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+    return statistics.median(samples) / 1e6, p95 / 1e6
+
+
+def benchmark_variant(name, runs):
+    from sandbox import DockerSandbox
+
+    sandbox = DockerSandbox(pool_size=1, min_idle=0, max_idle=1, max_uses=runs + 1, **VARIANTS[name])
+    try:
+        sandbox.run_submission(PUZZLE_ID, SUBMISSION)  # Start the container
+        exec_ns, runner_ns = [], []
+        for _ in range(runs):
+            result = sandbox.run_submission(PUZZLE_ID, SUBMISSION)
+            if not result.get("success"):
+                raise RuntimeError(f"{name}: run failed: {result.get('error')}")
+            exec_ns.append(result["host_timings"]["exec_run_ns"])
+            timings = result["timings"]
+            runner_ns.append(timings["import_ns"] + timings["load_inputs_ns"] + timings["load_outputs_ns"])
+    finally:
+        sandbox.pool.shutdown()
+    return summarize(exec_ns), summarize(runner_ns)
+
+
+def benchmark_local(runs):
+    """
+    Interpreter startup for the runner command lines, outside any container.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        script = os.path.join(tmp, "empty.py")
+        with open(script, "w") as f:
+            f.write("pass\n")
+        subprocess.run([sys.executable, "-m", "compileall", "-b", "-q", tmp], check=True)
+
+        results = {}
+        for name, command in (("stock", [sys.executable, "-u", script]),
+                              ("prebuilt", [sys.executable, "-I", "-S", "-u", script[:-3] + ".pyc"])):
+            samples = []
+            for _ in range(runs):
+                start = time.perf_counter_ns()
+                subprocess.run(command, check=True)
+                samples.append(time.perf_counter_ns() - start)
+            results[name] = summarize(samples)
+    return results
+
+
+def benchmark_app(runs):
+    """
+    Wall time of `import app` in a fresh interpreter, per SANDBOX_LAZY_INIT setting.
+    """
+    results = {}
+    for name, lazy in (("lazy", "1"), ("eager", "0")):
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter_ns()
+            proc = subprocess.run([sys.executable, "-c", "import app"], capture_output=True,
+                                  env=dict(os.environ, SANDBOX_LAZY_INIT=lazy))
+            if proc.returncode != 0:
+                print(f"{name}: import failed:\n{proc.stderr.decode(errors='replace')[-500:]}")
+                break
+            samples.append(time.perf_counter_ns() - start)
+        if samples:
+            results[name] = summarize(samples)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--variants", default=",".join(VARIANTS))
+    parser.add_argument("--local", action="store_true", help="Interpreter startup only, no Docker")
+    parser.add_argument("--app", action="store_true", help="App worker boot, lazy vs eager sandbox")
+    args = parser.parse_args()
+    os.chdir(PROJECT_ROOT)
+
+    if args.app:
+        results = benchmark_app(args.runs)
+        print(f"\n{'sandbox':<10} {'boot med':>12} {'p95':>8}")
+        for name, (median, p95) in results.items():
+            print(f"{name:<10} {median:>10.1f}ms {p95:>6.1f}ms")
+        return
+
+    if args.local:
+        results = benchmark_local(args.runs)
+        print(f"\n{'variant':<10} {'startup med':>12} {'p95':>8}")
+        for name, (median, p95) in results.items():
+            print(f"{name:<10} {median:>10.1f}ms {p95:>6.1f}ms")
+        baseline = results["stock"][0]
+        print(f"\nprebuilt: {baseline / results['prebuilt'][0]:.2f}x faster startup (median)")
+        return
+
+    results = {}
+    for name in args.variants.split(","):
+        results[name] = benchmark_variant(name, args.runs)
+
+    print(f"\n{'variant':<10} {'exec med':>10} {'p95':>8} {'runner med':>12} {'p95':>8}")
+    for name, ((exec_med, exec_p95), (runner_med, runner_p95)) in results.items():
+        print(f"{name:<10} {exec_med:>8.1f}ms {exec_p95:>6.1f}ms {runner_med:>10.1f}ms {runner_p95:>6.1f}ms")
+
+    if "stock" in results:
+        baseline = results["stock"][0][0]
+        for name, ((exec_med, _), _) in results.items():
+            if name != "stock":
+                print(f"{name}: {baseline / exec_med:.2f}x faster than stock (median exec)")
+
+
+if __name__ == "__main__":
+    main()
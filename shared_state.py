@@ -0,0 +1,174 @@
+# shared_state.py
+"""
+State shared by all app processes on a host, without an external service.
+
+`SQLiteStorage` is a rate-limit storage for flask-limiter (the `limits`
+library) registered for `sqlite:///<path>` storage URIs, so every gunicorn
+worker counts against the same limits instead of its own copy.
+
+`HostSemaphore` bounds how many sandbox runs execute at once across every
+process on the host, using one lock file per slot. The kernel drops a
+process's locks when it exits, so a crashed worker never leaks a slot.
+"""
+
+import fcntl
+import os
+import random
+import threading
+import time
+
+from limits.storage import Storage
+
+from db import connect
+
+# Fraction of increments that also delete expired counters
+PURGE_PROBABILITY = 0.01
+
+
+class SQLiteStorage(Storage):
+    """
+    Fixed-window rate-limit counters in a SQLite table. Each hit is a single
+    upsert that resets the counter when its window has expired. Moving and
+    sliding window strategies are not supported; the Limiter default
+    (fixed window) is.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        # sqlite:///rate_limits.db is relative to the working directory, sqlite:////var/... absolute
+        self.path = uri.split("://", 1)[1][1:] if uri else "rate_limits.db"
+        conn = connect(self.path)
+        with conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS rate_limits
+                            (key TEXT PRIMARY KEY,
+                             count INTEGER,
+                             expiry REAL)''')
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        import sqlite3
+        return sqlite3.Error
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1, **kwargs):
+        """
+        Add `amount` to the counter and return it. Takes the arguments of both
+        limits 3.x, which passes `elastic_expiry` (restart the window on every
+        hit), and later versions, which do not; others are ignored.
+        """
+        now = time.time()
+        conn = connect(self.path)
+        with conn:
+            count = conn.execute('''INSERT INTO rate_limits (key, count, expiry) VALUES (?, ?, ?)
+                                    ON CONFLICT (key) DO UPDATE SET
+                                        count = CASE WHEN expiry <= ? THEN excluded.count
+                                                     ELSE count + excluded.count END,
+                                        expiry = CASE WHEN expiry <= ? OR ? THEN excluded.expiry
+                                                      ELSE expiry END
+                                    RETURNING count''',
+                                 (key, amount, now + expiry, now, now, bool(elastic_expiry))).fetchone()[0]
+            if random.random() < PURGE_PROBABILITY:
+                conn.execute('DELETE FROM rate_limits WHERE expiry <= ?', (now,))
+        return count
+
+    def get(self, key):
+        row = connect(self.path).execute('SELECT count FROM rate_limits WHERE key = ? AND expiry > ?',
+                                         (key, time.time())).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = connect(self.path).execute('SELECT expiry FROM rate_limits WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else time.time()
+
+    def clear(self, key):
+        conn = connect(self.path)
+        with conn:
+            conn.execute('DELETE FROM rate_limits WHERE key = ?', (key,))
+
+    def reset(self):
+        conn = connect(self.path)
+        with conn:
+            return conn.execute('DELETE FROM rate_limits').rowcount
+
+    def check(self):
+        try:
+            connect(self.path).execute('SELECT 1')
+            return True
+        except Exception:
+            return False
+
+
+class HostSemaphore:
+    """
+    Counting semaphore shared by every process and thread on the host: a
+    holder owns an exclusive flock() on one of `limit` files in `lock_dir`.
+    """
+
+    def __init__(self, lock_dir, limit):
+        self.lock_dir = lock_dir
+        self.limit = limit
+        os.makedirs(lock_dir, exist_ok=True)
+        self._local = threading.local()
+
+    def acquire(self, timeout=None):
+        """
+        Take a slot, waiting up to `timeout` seconds (forever if None).
+        Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = 0.001
+        while True:
+            # Random start so waiters don't all contend for slot 0
+            first = random.randrange(self.limit)
+            for i in range(self.limit):
+                slot = (first + i) % self.limit
+                fd = os.open(os.path.join(self.lock_dir, f"slot-{slot}.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue
+                self._local.fd = fd
+                return True
+
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+
+    def release(self):
+        fd = self._local.fd
+        self._local.fd = None
+        os.close(fd)  # Also drops the lock
+
+    def in_use(self):
+        """
+        Slots currently held by any process (a snapshot; probes each slot).
+        """
+        held = 0
+        for slot in range(self.limit):
+            path = os.path.join(self.lock_dir, f"slot-{slot}.lock")
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except FileNotFoundError:
+                continue
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                held += 1
+            finally:
+                os.close(fd)
+        return held
+
+
+def host_semaphore():
+    """
+    The sandbox HostSemaphore configured by SANDBOX_HOST_CONCURRENCY (default:
+    the CPU count; 0 disables it) and SANDBOX_LOCK_DIR, or None.
+    """
+    limit = int(os.getenv('SANDBOX_HOST_CONCURRENCY', os.cpu_count() or 1))
+    if limit <= 0:
+        return None
+    lock_dir = os.getenv('SANDBOX_LOCK_DIR', os.path.join('/tmp', 'gta-benchmark-sandbox'))
+    return HostSemaphore(lock_dir, limit)
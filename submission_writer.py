@@ -0,0 +1,161 @@
+# submission_writer.py
+
+import atexit
+import json
+import logging
+import queue
+import threading
+import time
+
+from db import connect
+from jobs import QueueFull
+from metrics import db_timer
+
+logger = logging.getLogger(__name__)
+
+# Attempts per batch before its records are given up (and logged)
+WRITE_ATTEMPTS = 3
+
+
+class SubmissionWriter:
+    """
+    Background writer that records successful submissions in batches.
+
+    Callers enqueue records and return immediately; a single thread commits
+    whatever has queued up (at most `batch_size` records, waiting up to
+    `max_delay` seconds for a batch to fill) in one transaction, so concurrent
+    submissions share a write lock and an fsync. When `max_pending` records are
+    waiting, `put` blocks until the writer catches up. Pending records are
+    flushed at exit.
+    """
+
+    def __init__(self, db_path, leaderboard, batch_size=100, max_delay=0.01, max_pending=10000):
+        self.db_path = db_path
+        self.leaderboard = leaderboard
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._unwritten = 0  # Queued or in a batch being committed
+        self._idle = threading.Condition()
+        self.batches = 0
+        self.written = 0
+
+        threading.Thread(target=self._work, name="submission-writer", daemon=True).start()
+        atexit.register(self.flush, 10)
+
+    def put(self, puzzle_id, user_name, result, code_length, timestamp, timeout=None):
+        """
+        Queue a successful submission for writing. Blocks while the queue is
+        full; raises QueueFull if it is still full after `timeout` seconds.
+        """
+        record = (puzzle_id, user_name, result, code_length, timestamp)
+        with self._idle:
+            self._unwritten += 1
+        try:
+            self._queue.put(record, timeout=timeout)
+        except queue.Full:
+            self._done(1)
+            raise QueueFull()
+
+    def flush(self, timeout=None):
+        """
+        Wait until everything queued so far is committed. Returns False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._unwritten:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    logger.warning("Submissions not yet written", extra={'pending': self._unwritten})
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def stats(self):
+        with self._idle:
+            return {
+                'pending': self._unwritten,
+                'written': self.written,
+                'batches': self.batches
+            }
+
+    def _done(self, count):
+        with self._idle:
+            self._unwritten -= count
+            if not self._unwritten:
+                self._idle.notify_all()
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())  # Take whatever piled up meanwhile
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        """
+        Insert the batch and update the leaderboard in one transaction.
+        Returns the in-memory leaderboard updates to apply after the commit.
+        """
+        updates = []
+        conn = connect(self.db_path)
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            c = conn.cursor()
+            for puzzle_id, user_name, result, code_length, timestamp in batch:
+                c.execute('''INSERT INTO submissions
+                            (puzzle_id, user_name, total_score, visible_score, hidden_score,
+                             execution_time, code_length, timestamp, timings)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                          (puzzle_id, user_name, result['total_score'],
+                           result['visible_score'], result['hidden_score'],
+                           result['execution_time'], code_length,
+                           timestamp,
+                           # Cache hits carry no phase timings of their own
+                           None if result.get('timings') is None and result.get('host_timings') is None else
+                           json.dumps({'runner': result.get('timings'),
+                                       'host': result.get('host_timings')})))
+                updates.append(self.leaderboard.record(conn, puzzle_id, user_name, result, code_length,
+                                                       timestamp, c.lastrowid))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return updates
+
+    def _work(self):
+        while True:
+            batch = self._next_batch()
+            for attempt in range(1, WRITE_ATTEMPTS + 1):
+                try:
+                    with db_timer('write_batch'):
+                        updates = self._write(batch)
+                except Exception as e:
+                    logger.error("Error writing submissions: %s", e,
+                                 extra={'batch': len(batch), 'attempt': attempt})
+                    if attempt == WRITE_ATTEMPTS:
+                        for record in batch:
+                            logger.error("Dropped submission", extra={'record': json.dumps(record, default=str)})
+                    else:
+                        time.sleep(0.1 * attempt)
+                    continue
+
+                # The batch is committed; a failed in-memory update only leaves
+                # that board to be reloaded from the table
+                for update in updates:
+                    try:
+                        update()
+                    except Exception as e:
+                        logger.error("Error updating leaderboard after write: %s", e)
+                with self._idle:
+                    self.batches += 1
+                    self.written += len(batch)
+                break
+            self._done(len(batch))
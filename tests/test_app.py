@@ -0,0 +1,76 @@
+# tests/test_app.py
+
+import importlib
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import ROOT
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason="needs Linux namespaces")
+
+PUZZLE = 'examples_level_1_puzzle_1'
+
+SOLUTION = '''
+def transform(data):
+    return bytes(b ^ 0xA5 for b in data)
+'''
+
+
+@pytest.fixture(scope='module')
+def app(tmp_path_factory):
+    # The app keeps its database and reads puzzles relative to the working directory
+    workdir = tmp_path_factory.mktemp('app')
+    for name in ('puzzles', 'buffers'):
+        os.symlink(os.path.join(ROOT, name), workdir / name)
+    previous = os.getcwd()
+    environment = {'SANDBOX_BACKEND': 'process', 'RATELIMIT_STORAGE_URI': 'memory://'}
+    saved = {name: os.environ.get(name) for name in environment}
+    os.environ.update(environment)
+    os.chdir(workdir)
+    try:
+        module = importlib.import_module('app')
+        yield module
+    finally:
+        os.chdir(previous)
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+def submit(client, code, address):
+    response = client.post(f'/api/submit/{PUZZLE}', json={'code': code},
+                           environ_base={'REMOTE_ADDR': address})
+    result = response.get_json()
+    if response.status_code == 202:
+        result = client.get(f"/api/jobs/{result['job_id']}?wait=10").get_json()['result']
+    return result
+
+
+def test_cached_submission_ranks_second_user(app):
+    client = app.app.test_client()
+    first = submit(client, SOLUTION, '10.0.0.1')
+    # Same code up to trailing whitespace, so it is answered from the cache
+    second = submit(client, SOLUTION.replace('data):', 'data):  ') + '\n\n', '10.0.0.2')
+    assert first['total_score'] == 1.0
+    assert second['cached'] is True
+    assert app.submission_writer.flush(5)
+
+    board = client.get(f'/api/leaderboard/{PUZZLE}').get_json()
+    times = {entry['user']: entry['time'] for entry in board}
+    users = [app.get_user_identifier(SimpleNamespace(remote_addr=address))
+             for address in ('10.0.0.1', '10.0.0.2')]
+    assert times == {user: first['execution_time'] for user in users}
+
+
+@pytest.mark.parametrize('body', ['[]', '"def transform(data): return data"', 'null', '{"solutions": []}'])
+def test_batch_rejects_malformed_body(app, body):
+    response = app.app.test_client().post(f'/api/submit_batch/{PUZZLE}', data=body,
+                                          content_type='application/json',
+                                          environ_base={'REMOTE_ADDR': '10.0.1.1'})
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
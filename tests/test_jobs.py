@@ -0,0 +1,92 @@
+# tests/test_jobs.py
+
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+
+from conftest import ROOT
+from db import migrate
+from jobs import JobQueue
+
+# Queues a job whose handler never returns, then dies with it still running
+LOST_WORKER = '''
+import os, sys, threading, time
+sys.path.insert(0, {root!r})
+from jobs import JobQueue
+queue = JobQueue({db!r}, workers=1)
+job_id = queue.submit(lambda puzzle_id: threading.Event().wait(), 'examples_level_1_puzzle_1')
+while queue.get(job_id)['status'] != 'running':
+    time.sleep(0.01)
+print(job_id, flush=True)
+os._exit(1)
+'''
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'jobs.db')
+    migrate(path)
+    return path
+
+
+def test_job_completes(db_path):
+    queue = JobQueue(db_path, workers=1)
+    job_id = queue.submit(lambda puzzle_id, code: {'puzzle': puzzle_id, 'code': code}, 'p', 'x')
+    job = queue.wait(job_id, 5)
+    assert job['status'] == 'done'
+    assert job['result'] == {'puzzle': 'p', 'code': 'x'}
+
+
+def test_lost_worker_job_fails_on_startup(db_path):
+    worker = subprocess.run([sys.executable, '-c', LOST_WORKER.format(root=ROOT, db=db_path)],
+                            capture_output=True, text=True, timeout=30)
+    job_id = worker.stdout.strip()
+    assert job_id, worker.stderr
+
+    queue = JobQueue(db_path, workers=0)
+    job = queue.get(job_id)
+    assert job['status'] == 'failed'
+    assert 'lost' in job['result']['error']
+
+
+def test_job_past_deadline_fails(db_path):
+    queue = JobQueue(db_path, workers=0, deadline_seconds=0.05)
+    job_id = queue.submit(lambda puzzle_id: {}, 'p')
+    assert queue.get(job_id)['status'] == 'queued'
+
+    time.sleep(0.1)
+    job = queue.get(job_id)
+    assert job['status'] == 'failed'
+    assert 'did not finish' in job['result']['error']
+
+
+def test_late_result_does_not_overwrite_failure(db_path):
+    started, release = threading.Event(), threading.Event()
+
+    def handler(puzzle_id):
+        started.set()
+        release.wait(5)
+        return {'total_score': 1.0}
+
+    queue = JobQueue(db_path, workers=1, deadline_seconds=0.05)
+    job_id = queue.submit(handler, 'p')
+    assert started.wait(5)
+    time.sleep(0.1)
+    assert queue.get(job_id)['status'] == 'failed'
+
+    release.set()
+    queue._queue.join()
+    job = queue.get(job_id)
+    assert job['status'] == 'failed'
+    assert 'did not finish' in job['result']['error']
+
+
+def test_never_finished_jobs_are_purged(db_path):
+    queue = JobQueue(db_path, workers=0, retention_minutes=0, deadline_seconds=0.05)
+    job_id = queue.submit(lambda puzzle_id: {}, 'p')
+    time.sleep(0.1)
+    queue.submit(lambda puzzle_id: {}, 'p')
+    assert queue.get(job_id) is None
@@ -0,0 +1,83 @@
+# tests/test_leaderboard.py
+
+import pytest
+
+from db import connect, migrate
+from leaderboard import Leaderboard
+
+PUZZLE = 'examples_level_1_puzzle_1'
+
+
+@pytest.fixture
+def board(tmp_path):
+    path = str(tmp_path / 'board.db')
+    migrate(path)
+    return Leaderboard(path)
+
+
+def record(board, user, score, time, puzzle_id=PUZZLE, submission_id=1):
+    result = {'total_score': score, 'visible_score': score, 'hidden_score': score, 'execution_time': time}
+    conn = connect(board.db_path)
+    with conn:
+        apply = board.record(conn, puzzle_id, user, result, 100, 0.0, submission_id)
+    apply()
+
+
+def test_better_submission_replaces_entry(board):
+    record(board, 'alice', 0.5, 1.0, submission_id=1)
+    record(board, 'alice', 0.75, 2.0, submission_id=2)
+    record(board, 'alice', 0.75, 1.5, submission_id=3)
+    assert [(e['user'], e['total_score'], e['time']) for e in board.top(PUZZLE)] == [('alice', 0.75, 1.5)]
+
+
+def test_worse_submission_keeps_entry(board):
+    record(board, 'alice', 0.75, 1.0, submission_id=1)
+    record(board, 'alice', 0.5, 0.1, submission_id=2)
+    record(board, 'alice', 0.75, 2.0, submission_id=3)
+    assert [(e['user'], e['total_score'], e['time']) for e in board.top(PUZZLE)] == [('alice', 0.75, 1.0)]
+
+
+def test_board_is_ranked_and_cached_copy_follows_changes(board):
+    record(board, 'alice', 0.5, 1.0, submission_id=1)
+    assert [e['user'] for e in board.top(PUZZLE)] == ['alice']  # Loads the in-memory board
+
+    record(board, 'bob', 0.75, 2.0, submission_id=2)
+    record(board, 'carol', 0.75, 1.0, submission_id=3)
+    assert [e['user'] for e in board.top(PUZZLE)] == ['carol', 'bob', 'alice']
+    # A fresh instance reads the same order from the table
+    assert Leaderboard(board.db_path).top(PUZZLE) == board.top(PUZZLE)
+
+
+def test_rollups_match_full_recompute(board):
+    submissions = [
+        ('alice', 0.5, 1.0, 'examples_level_1_puzzle_1'),
+        ('alice', 0.75, 2.0, 'examples_level_1_puzzle_1'),
+        ('alice', 0.25, 0.5, 'examples_level_1_puzzle_1'),
+        ('alice', 1.0, 3.0, 'examples_level_1_puzzle_2'),
+        ('alice', 0.5, 1.0, 'examples_level_2_puzzle_1'),
+        ('bob', 0.75, 1.0, 'examples_level_1_puzzle_1'),
+        ('bob', 0.75, 0.5, 'examples_level_1_puzzle_1'),
+        ('bob', 0.25, 1.0, 'benchmark_level_1_puzzle_1'),
+        ('bob', 0.5, 1.0, 'benchmark_level_1_puzzle_1'),
+    ]
+    for i, (user, score, time, puzzle_id) in enumerate(submissions):
+        record(board, user, score, time, puzzle_id, submission_id=i)
+
+    c = connect(board.db_path).cursor()
+    c.execute('SELECT source, level, user_name, total_score, puzzles, execution_time FROM level_rollup')
+    levels = c.fetchall()
+    c.execute('SELECT source, user_name, total_score, puzzles, execution_time FROM global_rollup')
+    sources = c.fetchall()
+
+    # Recomputed from the leaderboard table (puzzle ids are '<source>_level_<n>_puzzle_<m>')
+    c.execute('SELECT puzzle_id, user_name, total_score, execution_time FROM leaderboard')
+    expected_levels, expected_sources = {}, {}
+    for puzzle_id, user, score, time in c.fetchall():
+        source, _, level = puzzle_id.split('_')[:3]
+        for sums, key in ((expected_levels, (source, int(level), user)), (expected_sources, (source, user))):
+            total, puzzles, seconds = sums.get(key, (0, 0, 0))
+            sums[key] = (total + score, puzzles + 1, seconds + time)
+
+    assert {row[:3]: pytest.approx(row[3:]) for row in levels} == expected_levels
+    assert {row[:2]: pytest.approx(row[2:]) for row in sources} == expected_sources
+    assert expected_levels[('examples', 1, 'alice')] == pytest.approx((1.75, 2, 5.0))
@@ -0,0 +1,54 @@
+# tests/test_preflight.py
+
+import pytest
+
+from preflight import Preflight, PreflightError
+
+
+@pytest.mark.parametrize('code', [
+    "def transform(data):\n    return data[:64]\n",
+    "def transform(data, *, _cache={}):\n    return data[:64]\n",
+    "def transform(data, key=b'x'):\n    return data[:64]\n",
+    "def transform(*args):\n    return args[0][:64]\n",
+    "transform = lambda data: data[:64]\n",
+    "transform: object = lambda data: data[:64]\n",
+    "from hashlib import sha512\ntransform = lambda data: sha512(data).digest()\n",
+    "try:\n    import numpy\nexcept ImportError:\n    def transform(data):\n        return data[:64]\n",
+    "if True:\n    def transform(data):\n        return data[:64]\nelse:\n    def transform(a, b):\n        pass\n",
+    "for i in range(1):\n    def transform(data):\n        return data[:64]\n",
+    "def make():\n    return lambda data: data[:64]\ntransform, other = make(), None\n",
+    "class transform:\n    def __new__(cls, data):\n        return data[:64]\n",
+    "def _impl(data):\n    return data[:64]\ntransform = _impl\n",
+])
+def test_accepts(code):
+    Preflight().check(code)
+
+
+@pytest.mark.parametrize('code, check', [
+    (b"def transform(data): pass", 'type'),
+    ("x" * 10001, 'size'),
+    ("def transform(data)\n    return data\n", 'syntax'),
+    ("import os\ndef transform(data):\n    return data\n", 'forbidden_import'),
+    ("from subprocess import run\ndef transform(data):\n    return data\n", 'forbidden_import'),
+    ("def transform(data):\n    return eval('data')\n", 'forbidden_name'),
+    ("def transform():\n    return bytes(64)\n", 'signature'),
+    ("def transform(a, b):\n    return a\n", 'signature'),
+    ("def transform(data, *, key):\n    return data\n", 'signature'),
+    ("transform = lambda: bytes(64)\n", 'signature'),
+    ("if True:\n    def transform(a, b):\n        return a\n", 'signature'),
+    ("def solve(data):\n    return data\n", 'missing_transform'),
+    ("class Solution:\n    def transform(self, data):\n        return data\n", 'missing_transform'),
+    ("x = " + "[" * 60 + "]" * 60 + "\n", 'complexity'),
+])
+def test_rejects(code, check):
+    with pytest.raises(PreflightError) as excinfo:
+        Preflight().check(code)
+    assert excinfo.value.check == check
+
+
+def test_counts_rejections():
+    preflight = Preflight()
+    preflight.check("def transform(data):\n    return data\n")
+    with pytest.raises(PreflightError):
+        preflight.check("def solve(data):\n    return data\n")
+    assert preflight.stats() == {'checked': 2, 'rejected': 1, 'rejections': {'missing_transform': 1}}
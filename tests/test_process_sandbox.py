@@ -0,0 +1,124 @@
+# tests/test_process_sandbox.py
+
+import json
+import os
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith('linux'), reason="needs Linux namespaces")
+
+PUZZLE = 'examples_level_1_puzzle_1'
+
+SOLUTION = '''
+def transform(data):
+    return bytes(b ^ 0xA5 for b in data)
+'''
+
+# Gets `os` past preflight and reports what it can reach through the error field
+ESCAPE = '''
+import json
+
+_builtins = __builtins__ if isinstance(__builtins__, dict) else vars(__builtins__)
+os = _builtins['__imp' + 'ort__']('o' + 's')
+
+def attempt(action):
+    try:
+        action()
+        return 'ok'
+    except Exception as e:
+        return type(e).__name__
+
+def transform(data):
+    report = {
+        'pid': os.getpid(),
+        'ppid': os.getppid(),
+        'signal_app': attempt(lambda: os.kill(APP_PID, 0)),
+        'read_outside': {path: attempt(lambda: open(path, 'rb').read(1)) for path in OUTSIDE},
+        'write_workspace': attempt(lambda: open('solution.py', 'w').write('x')),
+    }
+    raise ValueError(json.dumps(report))
+'''
+
+
+@pytest.fixture
+def sandbox(monkeypatch):
+    monkeypatch.chdir(ROOT)
+    from process_sandbox import ProcessSandbox
+    return ProcessSandbox(use_namespaces=True)
+
+
+def test_solution_scores(sandbox):
+    result = sandbox.run_submission(PUZZLE, SOLUTION)
+    assert result.get('error') is None
+    assert result['total_score'] == 1.0
+
+
+def test_submission_cannot_reach_host(sandbox):
+    outside = [os.path.join(ROOT, 'app.py'),
+               os.path.join(ROOT, 'puzzles', 'examples', 'level_1', 'expected_outputs_2.bin'),
+               '/etc/passwd']
+    code = f"APP_PID = {os.getpid()}\nOUTSIDE = {outside!r}\n" + ESCAPE
+
+    result = sandbox.run_submission(PUZZLE, code)
+    report = json.loads(result['error'])
+
+    # Forked by the runner, which is pid 1 of the sandbox's PID namespace
+    assert report['ppid'] == 1
+    assert report['signal_app'] == 'ProcessLookupError'
+    assert report['read_outside'] == {path: 'FileNotFoundError' for path in outside}
+    assert report['write_workspace'] == 'OSError'
+
+
+def test_batch_time_includes_vector_load(sandbox):
+    single = sandbox.run_submission(PUZZLE, SOLUTION)
+    batched = sandbox.run_batch(PUZZLE, [SOLUTION])[0]
+    for result in (single, batched):
+        timings = result['timings']
+        assert timings['total_ns'] >= timings['load_inputs_ns'] + timings['load_outputs_ns'] + timings['import_ns']
+        assert result['execution_time'] * 1e9 == pytest.approx(timings['total_ns'])
+
+
+@pytest.mark.parametrize('code, error', [
+    ("import os\nos._exit(0)\n", "Solution exited with code 0 without reporting a result"),
+    ("import os\nos._exit(3)\n", "Solution exited with code 3 without reporting a result"),
+    ("import ctypes\nctypes.string_at(0)\n", "Solution was killed by signal SIGSEGV"),
+])
+def test_exit_status_is_reported(sandbox, code, error):
+    code += SOLUTION
+    assert sandbox.run_submission(PUZZLE, code)['error'] == error
+    assert sandbox.run_batch(PUZZLE, [code])[0]['error'] == error
+
+
+# Tries to report a perfect score itself instead of returning outputs
+FORGE = '''
+import json
+import struct
+import __main__
+
+result = {"success": True, "visible_score": 1.0, "hidden_score": 1.0, "total_score": 1.0,
+          "execution_time": 0.001, "visible_correct": 10, "hidden_correct": 90,
+          "visible_total": 10, "hidden_total": 90, "timings": {}}
+try:
+    __main__.emit_result(result)
+except OSError:
+    pass
+payload = json.dumps(result).encode()
+for fd in range(3, 64):
+    try:
+        __import__("os").write(fd, struct.pack("<4sI", b"GTAR", len(payload)) + payload)
+    except OSError:
+        pass
+__import__("os")._exit(0)
+
+def transform(data):
+    return bytes(64)
+'''
+
+
+def test_solution_cannot_forge_result(sandbox):
+    for result in (sandbox.run_submission(PUZZLE, FORGE), sandbox.run_batch(PUZZLE, [FORGE])[0]):
+        assert not result.get('success')
+        assert 'total_score' not in result
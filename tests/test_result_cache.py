@@ -0,0 +1,62 @@
+# tests/test_result_cache.py
+
+import pytest
+
+from db import migrate
+from result_cache import ResultCache, normalize_code, submission_key, vectors_digest
+
+CODE = "def transform(data):\n    return data[:64]\n"
+DIGEST = b"\x01" * 32
+
+
+@pytest.mark.parametrize('variant', [
+    CODE,
+    CODE.replace("\n", "\r\n"),
+    CODE.replace("\n", "\r"),
+    "\n\n" + CODE + "\n\n",
+    "def transform(data):   \n    return data[:64]\t\n",
+])
+def test_whitespace_variants_share_a_key(variant):
+    assert normalize_code(variant) == normalize_code(CODE)
+    assert submission_key('examples_level_1_puzzle_1', variant, DIGEST) == \
+        submission_key('examples_level_1_puzzle_1', CODE, DIGEST)
+
+
+def test_key_changes_with_code_puzzle_and_vectors():
+    key = submission_key('examples_level_1_puzzle_1', CODE, DIGEST)
+    assert submission_key('examples_level_1_puzzle_1', CODE.replace("    ", "  "), DIGEST) != key
+    assert submission_key('examples_level_1_puzzle_2', CODE, DIGEST) != key
+    assert submission_key('examples_level_1_puzzle_1', CODE, b"\x02" * 32) != key
+
+
+def test_vectors_digest_tracks_files_and_scoring(tmp_path):
+    path = tmp_path / 'expected.bin'
+    path.write_bytes(b"a" * 64)
+    digest = vectors_digest(str(path))
+    assert vectors_digest(str(path), scoring={'sample': 100}) != digest
+
+    path.write_bytes(b"b" * 128)
+    assert vectors_digest(str(path)) != digest
+
+
+def test_cache_hits_misses_and_persists(tmp_path):
+    db_path = str(tmp_path / 'cache.db')
+    migrate(db_path)
+    cache = ResultCache(db_path=db_path)
+    key = submission_key('examples_level_1_puzzle_1', CODE, DIGEST)
+    other = submission_key('examples_level_1_puzzle_1', CODE, b"\x02" * 32)
+
+    cache.put(key, {'success': True, 'total_score': 1.0})
+    assert cache.get(key) == {'success': True, 'total_score': 1.0}
+    assert cache.get(other) is None
+
+    # A fresh process only has the table
+    restarted = ResultCache(db_path=db_path)
+    assert restarted.get(key) == {'success': True, 'total_score': 1.0}
+    assert restarted.stats()['persistent_hits'] == 1
+
+
+def test_expired_entries_miss():
+    cache = ResultCache(ttl=0)
+    cache.put('key', {'success': True})
+    assert cache.get('key') is None
@@ -0,0 +1,38 @@
+# tests/test_shared_state.py
+
+import time
+
+import pytest
+
+from shared_state import SQLiteStorage
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return SQLiteStorage(f"sqlite:///{tmp_path}/rate_limits.db")
+
+
+def test_incr_accepts_limits_3_and_later_arguments(storage):
+    assert storage.incr('key', 60) == 1
+    assert storage.incr('key', 60, amount=2) == 3  # limits 4.x+
+    assert storage.incr('key', 60, elastic_expiry=False, amount=1) == 4  # limits 3.x
+    assert storage.incr('key', 60, False, 1, unknown=True) == 5
+    assert storage.get('key') == 5
+
+
+def test_elastic_expiry_restarts_window(storage):
+    storage.incr('fixed', 60)
+    storage.incr('elastic', 60)
+    fixed, elastic = storage.get_expiry('fixed'), storage.get_expiry('elastic')
+    time.sleep(0.01)
+
+    storage.incr('fixed', 60)
+    storage.incr('elastic', 60, elastic_expiry=True)
+    assert storage.get_expiry('fixed') == fixed
+    assert storage.get_expiry('elastic') > elastic
+
+
+def test_expired_window_starts_over(storage):
+    storage.incr('key', 0)
+    assert storage.get('key') == 0
+    assert storage.incr('key', 60) == 1
@@ -0,0 +1,33 @@
+# tests/test_submission_writer.py
+
+from db import connect, migrate
+from leaderboard import Leaderboard
+from submission_writer import SubmissionWriter
+
+PUZZLE = 'examples_level_1_puzzle_1'
+
+
+class BrokenHub:
+    def publish(self, topic, message):
+        raise RuntimeError("hub is down")
+
+
+def result(score):
+    return {'total_score': score, 'visible_score': score, 'hidden_score': score, 'execution_time': 1.0}
+
+
+def test_failed_leaderboard_update_does_not_stop_writer(tmp_path):
+    db_path = str(tmp_path / 'writer.db')
+    migrate(db_path)
+    board = Leaderboard(db_path, hub=BrokenHub())
+    board.top(PUZZLE)  # Loaded boards publish their changes
+    writer = SubmissionWriter(db_path, board)
+
+    writer.put(PUZZLE, 'alice', result(0.5), 100, 0.0)
+    assert writer.flush(5)
+    writer.put(PUZZLE, 'bob', result(0.75), 100, 0.0)
+    assert writer.flush(5)
+
+    assert writer.stats()['written'] == 2
+    assert [entry['user'] for entry in board.top(PUZZLE)] == ['bob', 'alice']
+    assert connect(db_path).execute('SELECT COUNT(*) FROM submissions').fetchone()[0] == 2
@@ -0,0 +1,102 @@
+# tests/test_testvectors.py
+
+import glob
+import importlib.util
+import json
+import os
+import sys
+
+import pytest
+
+from conftest import ROOT
+import testvectors
+from testvectors import HEADER, INPUTS_FILE, PackWriter, buffer_set_digest, expected_outputs_file, write_pack
+
+sys.path.insert(0, os.path.join(ROOT, 'buffers'))
+import generate_buffers  # noqa: E402
+
+SHARED = os.path.join(ROOT, 'buffers', 'shared')
+TRANSFORMS = sorted(glob.glob(os.path.join(ROOT, 'puzzles', 'examples', '*', 'transform_*.py')))
+
+
+def records(count, start=0):
+    return [bytes((start + i + j) % 256 for j in range(64)) for i in range(count)]
+
+
+def test_pack_round_trip(tmp_path):
+    sections = {'visible': records(3), 'hidden': records(5, 100)}
+    path = str(tmp_path / 'pack.bin')
+    write_pack(path, sections)
+
+    with testvectors.TestVectorPack(path) as pack:
+        assert pack.digest == buffer_set_digest(sections)
+        assert {name: pack.count(name) for name in sections} == {'visible': 3, 'hidden': 5}
+        for name, expected in sections.items():
+            assert [bytes(record) for record in pack.records(name)] == expected
+        assert bytes(pack.record('hidden', 4)) == sections['hidden'][4]
+        with pytest.raises(IndexError):
+            pack.record('hidden', 5)
+        with pytest.raises(KeyError):
+            pack.records('other')
+
+
+def test_writer_keeps_given_digest_and_checks_sections(tmp_path):
+    path = str(tmp_path / 'outputs.bin')
+    with PackWriter(path, {'visible': 2}, digest=b"\x07" * 32) as writer:
+        writer.write('visible', iter(records(2)))
+    with testvectors.TestVectorPack(path) as pack:
+        assert pack.digest == b"\x07" * 32
+
+    broken = str(tmp_path / 'broken.bin')
+    with pytest.raises(ValueError):
+        with PackWriter(broken, {'visible': 2, 'hidden': 1}) as writer:
+            writer.write('hidden', records(1))
+    with pytest.raises(ValueError):
+        with PackWriter(broken, {'visible': 2}) as writer:
+            writer.write('visible', records(1))
+    with pytest.raises(ValueError):
+        with PackWriter(broken, {'visible': 1}) as writer:
+            writer.write('visible', [b"short"])
+    assert os.listdir(tmp_path) == ['outputs.bin']
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'other.bin'
+    path.write_bytes(b"\0" * HEADER.size)
+    with pytest.raises(ValueError):
+        testvectors.TestVectorPack(str(path))
+
+
+def test_input_pack_matches_generated_buffers():
+    # The generator reproduces the buffer set the pack was built from
+    # (formerly the per-buffer visible_NN.bin / hidden_NN.bin files)
+    with open(os.path.join(SHARED, 'buffer_set.json')) as f:
+        buffer_set = json.load(f)
+    settings = generate_buffers.BUFFER_SETS[buffer_set['version']]
+    if 'selection' in settings:
+        pytest.skip("greedy buffer sets take minutes to regenerate")
+
+    visible = generate_buffers.generate_visible_buffers()
+    missing = generate_buffers.get_missing_bytes(visible)
+    hidden = list(generate_buffers.iter_hidden_buffers(missing, settings['hidden'], settings.get('seed')))
+
+    with testvectors.TestVectorPack(os.path.join(SHARED, INPUTS_FILE)) as pack:
+        assert [bytes(record) for record in pack.records('visible')] == visible
+        assert [bytes(record) for record in pack.records('hidden')] == hidden
+        assert pack.digest == buffer_set_digest({'visible': visible, 'hidden': hidden})
+        assert pack.digest.hex() == buffer_set['digest']
+
+
+@pytest.mark.parametrize('transform_file', TRANSFORMS, ids=os.path.basename)
+def test_expected_outputs_match_transform(transform_file):
+    spec = importlib.util.spec_from_file_location('transform_module', transform_file)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    puzzle_num = os.path.basename(transform_file)[len('transform_'):-len('.py')]
+
+    with testvectors.TestVectorPack(os.path.join(SHARED, INPUTS_FILE)) as inputs, \
+            testvectors.TestVectorPack(os.path.join(os.path.dirname(transform_file), expected_outputs_file(puzzle_num))) as outputs:
+        assert outputs.digest == inputs.digest
+        for section in ('visible', 'hidden'):
+            assert [bytes(record) for record in outputs.records(section)] == \
+                [module.hidden_transform(bytes(record)) for record in inputs.records(section)]
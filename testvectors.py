@@ -0,0 +1,209 @@
+# testvectors.py
+"""
+Packed test-vector files.
+
+A pack holds named sections of fixed-size records in a single file:
+
+    header  magic 'GTAV', format version, record size, section count,
+            32-byte digest of the input buffer set
+    index   one entry per section: name, data offset, record count
+    data    contiguous records, section after section
+
+`buffers/shared/test_vectors.bin` holds the input buffers ('visible' and
+'hidden' sections) and its digest identifies the buffer set; `buffer_set.json`
+next to it records which version of buffers/generate_buffers.py's buffer sets
+it holds. Packs are written as a stream (`PackWriter`), so a hidden set can be
+far larger than memory.
+`expected_outputs_N.bin` next to each transform holds that puzzle's expected
+outputs in the same sections, stamped with the digest of the inputs it was
+computed from, so stale outputs can be detected.
+
+Only the standard library is used: this module is also copied into the
+sandbox, where the runner reads packs through mmap.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+
+MAGIC = b"GTAV"
+FORMAT_VERSION = 1
+RECORD_SIZE = 64
+
+INPUTS_FILE = "test_vectors.bin"
+BUFFER_SET_FILE = "buffer_set.json"
+
+HEADER = struct.Struct("<4sHHI32s")  # magic, version, record size, sections, digest
+INDEX_ENTRY = struct.Struct("<32sQI4x")  # name, offset, record count
+
+
+def expected_outputs_file(puzzle_num):
+    return f"expected_outputs_{puzzle_num}.bin"
+
+
+def buffer_set_digest(sections):
+    """
+    SHA-256 over the section names and records, in section order.
+    """
+    h = hashlib.sha256()
+    for name, records in sections.items():
+        h.update(name.encode('utf-8'))
+        h.update(len(records).to_bytes(4, 'little'))
+        for record in records:
+            h.update(record)
+    return h.digest()
+
+
+def write_pack(path, sections, digest=None):
+    """
+    Write `sections` (dict of name -> list of bytes records) to `path`.
+    `digest` defaults to the digest of the sections themselves.
+    The file is written to a temp name and renamed into place.
+    """
+    with PackWriter(path, {name: len(records) for name, records in sections.items()}, digest) as writer:
+        for name, records in sections.items():
+            writer.write(name, records)
+
+
+class PackWriter:
+    """
+    Streaming pack writer. Section sizes are declared up front (`counts`, dict
+    of name -> record count) and records are then written section by section,
+    in that order, from any iterable; the digest is computed along the way
+    unless one is given. The file appears at `path` only once complete:
+
+        with PackWriter(path, {'visible': 24, 'hidden': 10000}) as writer:
+            writer.write('visible', visible_buffers)
+            writer.write('hidden', generate_hidden())
+    """
+
+    def __init__(self, path, counts, digest=None):
+        self.path = path
+        self.counts = dict(counts)
+        self.digest = digest
+        self._hash = hashlib.sha256() if digest is None else None
+        self._pending = list(self.counts)
+        self._tmp_path = f"{path}.tmp"
+        self._file = open(self._tmp_path, 'wb')
+
+        # Header digest is filled in on close
+        self._file.write(HEADER.pack(MAGIC, FORMAT_VERSION, RECORD_SIZE, len(self.counts), bytes(32)))
+        offset = HEADER.size + INDEX_ENTRY.size * len(self.counts)
+        for name, count in self.counts.items():
+            self._file.write(INDEX_ENTRY.pack(name.encode('utf-8'), offset, count))
+            offset += RECORD_SIZE * count
+
+    def write(self, section, records):
+        """
+        Write all records of the next section.
+        """
+        if not self._pending or self._pending[0] != section:
+            raise ValueError(f"Expected section '{self._pending[0] if self._pending else None}', got '{section}'")
+        self._pending.pop(0)
+        if self._hash is not None:
+            self._hash.update(section.encode('utf-8'))
+            self._hash.update(self.counts[section].to_bytes(4, 'little'))
+
+        written = 0
+        for record in records:
+            if len(record) != RECORD_SIZE:
+                raise ValueError(f"Record in section '{section}' is {len(record)} bytes, expected {RECORD_SIZE}")
+            self._file.write(record)
+            if self._hash is not None:
+                self._hash.update(record)
+            written += 1
+        if written != self.counts[section]:
+            raise ValueError(f"Section '{section}' has {written} records, expected {self.counts[section]}")
+
+    def close(self):
+        """
+        Finish the file and rename it into place. Returns the digest.
+        """
+        if self._pending:
+            raise ValueError(f"Sections not written: {', '.join(self._pending)}")
+        if self.digest is None:
+            self.digest = self._hash.digest()
+        self._file.seek(HEADER.size - 32)
+        self._file.write(self.digest)
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        return self.digest
+
+    def abort(self):
+        self._file.close()
+        os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class TestVectorPack:
+    """
+    Read-only, memory-mapped view of a pack file.
+    Records are returned as memoryview slices into the mapping (no copies).
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        if len(self._mmap) < HEADER.size:
+            raise ValueError(f"{path} is not a test-vector pack")
+        magic, version, record_size, count, digest = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a test-vector pack")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} uses pack format v{version}, expected v{FORMAT_VERSION}")
+
+        self.record_size = record_size
+        self.digest = digest
+        self.sections = {}
+        for i in range(count):
+            name, offset, records = INDEX_ENTRY.unpack_from(self._mmap, HEADER.size + i * INDEX_ENTRY.size)
+            self.sections[name.rstrip(b"\0").decode('utf-8')] = (offset, records)
+
+    def count(self, section):
+        """
+        Number of records in `section`.
+        """
+        if section not in self.sections:
+            raise KeyError(f"Section '{section}' not found in test-vector pack")
+        return self.sections[section][1]
+
+    def record(self, section, index):
+        """
+        Memoryview of record `index` of `section`.
+        """
+        offset, count = self.sections[section]
+        if not 0 <= index < count:
+            raise IndexError(f"Record {index} out of range for section '{section}'")
+        size = self.record_size
+        return self._view[offset + index * size:offset + (index + 1) * size]
+
+    def records(self, section):
+        """
+        List of memoryview slices, one per record in `section`.
+        """
+        if section not in self.sections:
+            raise KeyError(f"Section '{section}' not found in test-vector pack")
+        offset, count = self.sections[section]
+        size = self.record_size
+        return [self._view[offset + i * size:offset + (i + 1) * size] for i in range(count)]
+
+    def close(self):
+        self._view.release()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()